@@ -0,0 +1,71 @@
+"""
+Benchmark: batch planning and execution across many directories.
+
+Creates --dirs shot folders of --files frames each and renumbers them
+all with batch mode, once per process count in --processes, reporting
+planning time (process pool) and execution time (threads per
+filesystem) separately. Planning should scale with cores up to the
+number of directories; execution with the filesystem's queue depth.
+
+    python benchmarks/bench_batch.py [--dirs 64] [--files 5000] [--processes 1,2,4,8] [--dir DIR]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mh_rename.batch import apply_batch, filesystem_limits, filesystem_type, jobs_from_root, plan_batch  # noqa: E402
+from mh_rename.planner import RenameOptions, compile_rules  # noqa: E402
+
+
+def populate(root, dirs, files):
+    for d in range(dirs):
+        directory = os.path.join(root, f"sh{d:04d}")
+        os.mkdir(directory)
+        for i in range(files):
+            open(os.path.join(directory, f"plate.{i + 1001:04d}.exr"), "w").close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dirs", type=int, default=64)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--processes", default="1,2,4,8",
+                        help="Comma separated process counts to compare.")
+    parser.add_argument("--dir", default=None, help="Parent directory for the test data.")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="mh_bench_batch_", dir=args.dir)
+    try:
+        populate(root, args.dirs, args.files)
+        print(f"{args.dirs} directories x {args.files} files on {filesystem_type(root)} "
+              f"{tuple(filesystem_limits(root))}, {os.cpu_count()} CPUs")
+        start = 1001
+        baseline = None
+        for processes in map(int, args.processes.split(",")):
+            # Alternate renumbering up and down so every round renames every file
+            start = 1001 + args.files if start == 1001 else 1001
+            rules = compile_rules(RenameOptions(renumber=True, start_number=start))
+            jobs = jobs_from_root(root, include=["sh*"])
+            t0 = time.perf_counter()
+            plans = list(plan_batch(jobs, rules, processes=processes))
+            planned = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            report = apply_batch(plans, journaled=True)
+            applied = time.perf_counter() - t0
+            assert report.ok and report.renamed == args.dirs * args.files, report.report()
+            baseline = baseline or planned
+            total = args.dirs * args.files
+            print(f"processes={processes:<3} plan={planned:7.3f}s ({baseline / planned:4.1f}x)  "
+                  f"apply={applied:7.3f}s  {total / (planned + applied):10,.0f} files/sec")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
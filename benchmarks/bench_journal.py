@@ -0,0 +1,86 @@
+"""
+Benchmark: rename throughput with and without the crash-recovery journal.
+
+Renumbers --count files twice per round, once with apply_plan alone and
+once writing a Journal, and reports the overhead of journaling (median of
+the rounds). Rounds alternate the order to even out cache effects.
+--latency adds a simulated per-rename delay, as on a network share.
+
+    python benchmarks/bench_journal.py [--count 100000] [--rounds 5] [--workers 1] [--latency 0]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mh_rename.collisions import build_execution_plan  # noqa: E402
+from mh_rename.executor import apply_plan  # noqa: E402
+from mh_rename.journal import Journal, journal_path, load_journal  # noqa: E402
+from mh_rename.planner import RenameOptions, compile_rules, plan_renames  # noqa: E402
+from mh_rename.scan import scan_directory  # noqa: E402
+
+
+def populate(directory, count):
+    for i in range(count):
+        open(os.path.join(directory, f"plate.{i + 1001:06d}.exr"), "w").close()
+
+
+def run(parent, count, workers, journaled, rename=os.rename):
+    """Time one renumber of a fresh directory; returns seconds."""
+    root = tempfile.mkdtemp(prefix="mh_bench_journal_", dir=parent)
+    try:
+        populate(root, count)
+        rules = compile_rules(RenameOptions(renumber=True, start_number=1001 + count))
+        ops = plan_renames(scan_directory(root).names, rules, root)
+        plan = build_execution_plan(ops, workers=workers)
+        journal = Journal(journal_path(root)) if journaled else None
+        t0 = time.perf_counter()
+        result = apply_plan(plan, rename, workers=workers, journal=journal)
+        elapsed = time.perf_counter() - t0
+        assert result.ok, result.report()
+        if journaled:
+            state = load_journal(root)
+            assert not state.needs_recovery and len(state.done) == count
+        return elapsed
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--dir", default=None, help="Parent directory for the test data.")
+    args = parser.parse_args()
+
+    def slow_rename(src, dst):
+        time.sleep(args.latency)
+        os.rename(src, dst)
+
+    rename = slow_rename if args.latency else os.rename
+
+    plain, journaled = [], []
+    for n in range(args.rounds):
+        order = (False, True) if n % 2 == 0 else (True, False)
+        for with_journal in order:
+            elapsed = run(args.dir, args.count, args.workers, with_journal, rename)
+            (journaled if with_journal else plain).append(elapsed)
+
+    plain, journaled = statistics.median(plain), statistics.median(journaled)
+    print(f"{args.count} files, workers={args.workers}, "
+          f"latency={args.latency * 1000:.1f} ms, median of {args.rounds}")
+    for label, elapsed in (("no journal", plain), ("journal", journaled)):
+        print(f"{label:<12} time={elapsed:8.3f}s  {args.count / elapsed:10,.0f} files/sec")
+    print(f"journal overhead: {(journaled / plain - 1) * 100:+.1f}%")
+
+
+if __name__ == "__main__":
+    main()
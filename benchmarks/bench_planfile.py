@@ -0,0 +1,104 @@
+"""
+Benchmark: writing, reading and diffing a saved plan file.
+
+Builds a plan of --count renames (no files on disk: the source sizes and
+dates are made up, and reading skips the source check) and times:
+  write  PlanWriter, op by op
+  read   iterating a PlanFile
+  diff   diff_plans against a second plan with every 100th name changed
+with the peak Python memory of each (tracemalloc, which slows them down;
+--no-memory times without it). Memory stays flat as --count grows.
+
+    python benchmarks/bench_planfile.py [--count 1000000] [--dir DIR] [--no-memory]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mh_rename.planfile import PlanFile, PlanWriter, diff_plans  # noqa: E402
+from mh_rename.planner import RenameOp  # noqa: E402
+
+FakeStat = namedtuple("FakeStat", ["st_size", "st_mtime_ns"])
+
+
+def iter_ops(directory, count, changed_every=0):
+    """Renumber ops of --count frames in 10 sequences; changed_every: rename every n-th differently."""
+    for i in range(count):
+        seq = i % 10
+        src_name = f"sh{seq:03d}_beauty_v003.{i // 10 + 1:07d}.exr"
+        dst_name = f"sh{seq:03d}_beauty_v004.{i // 10 + 1001:07d}.exr"
+        if changed_every and i % changed_every == 0:
+            dst_name = "x" + dst_name
+        yield RenameOp(src_name, dst_name, os.path.join(directory, src_name), os.path.join(directory, dst_name))
+
+
+def write(path, directory, count, changed_every=0):
+    stat = FakeStat(12582912, 1700000000000000000)
+    with PlanWriter(path, directory) as writer:
+        for op in iter_ops(directory, count, changed_every):
+            writer.add(op, stat)
+
+
+def read(path):
+    n = 0
+    for _ in PlanFile(path):
+        n += 1
+    return n
+
+
+def diff(old, new):
+    return sum(1 for _ in diff_plans(PlanFile(old), PlanFile(new)))
+
+
+def measure(memory, fn, *args):
+    """(seconds, peak bytes or None, result) of fn(*args)."""
+    if memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - t0
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--dir", default=None, help="Parent directory for the plan files.")
+    parser.add_argument("--no-memory", action="store_true", help="Do not trace memory.")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="mh_bench_planfile_", dir=args.dir)
+    try:
+        directory = os.path.join(root, "shot")
+        old, new = os.path.join(root, "old.jsonl"), os.path.join(root, "new.jsonl")
+        memory = not args.no_memory
+        write(new, directory, args.count, changed_every=100)
+        rows = [
+            ("write", measure(memory, write, old, directory, args.count)),
+            ("read", measure(memory, read, old)),
+            ("diff", measure(memory, diff, old, new)),
+        ]
+        print(f"{args.count} ops, plan file {os.path.getsize(old) / 2 ** 20:.1f} MiB")
+        for label, (seconds, peak, _) in rows:
+            peak = f"  peak {peak / 2 ** 20:6.1f} MiB" if peak is not None else ""
+            print(f"{label:<6} {seconds:8.3f} s  {seconds / args.count * 1e6:6.2f} us/op{peak}")
+        assert rows[1][1][2] == args.count
+        assert rows[2][1][2] == (args.count + 99) // 100
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
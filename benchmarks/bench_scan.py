@@ -0,0 +1,89 @@
+"""
+Benchmark: directory enumeration, listdir + isdir vs. os.scandir.
+
+Creates a temporary directory with COUNT empty files (plus a few
+sub-directories), then times both approaches and counts the os.stat
+calls made from Python.
+
+    python benchmarks/bench_scan.py [--count 500000] [--dir /mnt/share/tmp]
+
+Use --dir to run against a network share, where every stat is a round-trip.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mh_rename.scan import scan_directory  # noqa: E402
+
+
+class StatCounter:
+    """Context manager that counts calls to os.stat."""
+
+    def __init__(self):
+        self.count = 0
+        self._orig = os.stat
+
+    def __enter__(self):
+        orig = self._orig
+
+        def counting_stat(*args, **kwargs):
+            self.count += 1
+            return orig(*args, **kwargs)
+
+        os.stat = counting_stat
+        return self
+
+    def __exit__(self, *exc):
+        os.stat = self._orig
+
+
+def listdir_isdir(directory):
+    """The original enumeration from preview_renames / rename_files."""
+    return [
+        f for f in sorted(os.listdir(directory))
+        if not os.path.isdir(os.path.join(directory, f))
+    ]
+
+
+def populate(directory, count):
+    for i in range(count):
+        open(os.path.join(directory, f"plate_v001.{i + 1001:07d}.exr"), "wb").close()
+    for i in range(5):
+        os.mkdir(os.path.join(directory, f"subdir_{i}"))
+
+
+def measure(label, func, directory):
+    with StatCounter() as counter:
+        t0 = time.perf_counter()
+        files = func(directory)
+        elapsed = time.perf_counter() - t0
+    print(f"{label:<22} files={len(files):>8}  stat calls={counter.count:>8}  time={elapsed:8.3f}s")
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=500000)
+    parser.add_argument("--dir", default=None, help="Parent directory for the test data.")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="mh_bench_scan_", dir=args.dir)
+    try:
+        print(f"Creating {args.count} files in {root} ...")
+        populate(root, args.count)
+
+        before = measure("listdir + isdir", listdir_isdir, root)
+        after = measure("scandir (ScanResult)", lambda d: scan_directory(d).names, root)
+        assert before == after, "scan results differ"
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
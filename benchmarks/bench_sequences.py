@@ -0,0 +1,90 @@
+"""
+Benchmark: sequence index vs. regex grouping into per-file lists.
+
+Builds --count synthetic names spread over a few sequences (with gaps,
+mixed separators and some unnumbered files) and times, with peak
+memory from tracemalloc:
+
+  regex lists     the previous approach: trailing-digit regex per name,
+                  {pattern: [frame, ...]} with one list entry per file
+  SequenceIndex   one parse per name, frame ranges plus 12 bytes/file
+  plan (index)    a full renumber plan on top of the index
+
+    python benchmarks/bench_sequences.py [--count 1000000] [--sequences 4]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mh_rename.planner import RenameOptions, compile_rules, iter_plan  # noqa: E402
+from mh_rename.sequences import SequenceIndex  # noqa: E402
+
+TRAILING_FRAME_RE = re.compile(r"^(.*?)(\d+)$")
+
+
+def regex_lists(names):
+    """Group names as the previous planner did: one list entry per file."""
+    groups = {}
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        match = TRAILING_FRAME_RE.match(stem)
+        if match:
+            head, digits = match.groups()
+            groups.setdefault((head, ext), []).append(int(digits))
+        else:
+            groups.setdefault((stem, ext), []).append(None)
+    return groups
+
+
+def make_names(count, sequences):
+    names = []
+    per_seq = count // sequences
+    for s in range(sequences):
+        sep = "._"[s % 2]
+        for i in range(per_seq):
+            if i % 997 == 0:
+                continue  # A gap every so often
+            names.append(f"shot010_pass{s}{sep}{i + 1001:07d}.exr")
+    names.extend(f"notes_{i}.txt" for i in range(count - len(names)))
+    names.sort()
+    return names
+
+
+def measure(label, func):
+    # Timed and traced separately: tracemalloc slows every allocation down
+    t0 = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - t0
+    del result
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<16} time={elapsed:8.3f}s  peak={peak / 2**20:8.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--sequences", type=int, default=4)
+    args = parser.parse_args()
+
+    names = make_names(args.count, args.sequences)
+    print(f"{len(names)} names")
+    measure("regex lists", lambda: regex_lists(names))
+    index = measure("SequenceIndex", lambda: SequenceIndex(names))
+    rules = compile_rules(RenameOptions(renumber=True, start_number=1001))
+    measure("plan (index)", lambda: sum(1 for _ in iter_plan(names, rules, "/in", index=index)))
+    for line in index.lines(limit=6):
+        print("  " + line[:100])
+
+
+if __name__ == "__main__":
+    main()
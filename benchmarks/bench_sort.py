@@ -0,0 +1,112 @@
+"""
+Benchmark: file ordering against plain sorted().
+
+Part 1 orders --count synthetic names (unpadded frames, a few sequences,
+some unnumbered files) in every order except mtime and compares with
+sorted(names). The SequenceIndex parse is timed on its own: planning
+builds it anyway, the orders only reuse it.
+
+Part 2 creates --files real files and orders them by modification time,
+once through the scan's DirEntry.stat() (part of the listing on Windows,
+one cached stat per file elsewhere) and once the usual way with
+os.path.getmtime per name after os.listdir.
+
+    python benchmarks/bench_sort.py [--count 1000000] [--files 100000] [--rounds 3] [--dir DIR]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mh_rename.ordering import FRAME, NAME, NATURAL, MTIME, sort_order  # noqa: E402
+from mh_rename.scan import scan_directory  # noqa: E402
+from mh_rename.sequences import SequenceIndex  # noqa: E402
+
+
+def make_names(count):
+    names = []
+    for i in range(count):
+        kind = i % 10
+        if kind == 9:
+            names.append(f"notes_{i}.txt")
+        else:
+            names.append(f"shot010_pass{kind % 3}.{i}.exr")  # Unpadded frames
+    random.Random(1).shuffle(names)
+    return names
+
+
+def best(rounds, func):
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def bench_names(count, rounds):
+    names = make_names(count)
+    baseline = best(rounds, lambda: sorted(names))
+    print(f"{count} names, median of {rounds}")
+    print(f"{'sorted()':<16} time={baseline:8.3f}s")
+    t0 = time.perf_counter()
+    index = SequenceIndex(names)
+    print(f"{'index (parse)':<16} time={time.perf_counter() - t0:8.3f}s  (shared with planning)")
+    for order in (NAME, NATURAL, FRAME):
+        elapsed = best(rounds, lambda: sort_order(index, order))
+        print(f"{order:<16} time={elapsed:8.3f}s  {elapsed / baseline:5.1f}x sorted()")
+
+
+def bench_mtime(parent, files, rounds):
+    root = tempfile.mkdtemp(prefix="mh_bench_sort_", dir=parent)
+    try:
+        for i in range(files):
+            path = os.path.join(root, f"plate.{i}.exr")
+            open(path, "w").close()
+            os.utime(path, ns=(0, (files - i) * 10**9))
+
+        scanned, ordered = [], []
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            scan = scan_directory(root)
+            t1 = time.perf_counter()
+            index = SequenceIndex(scan.names)  # Built by planning anyway
+            t2 = time.perf_counter()
+            sort_order(index, MTIME, scan.entries)
+            scanned.append(t1 - t0)
+            ordered.append(time.perf_counter() - t2)
+
+        def from_stat():
+            names = os.listdir(root)
+            names.sort(key=lambda name: os.path.getmtime(os.path.join(root, name)))
+
+        print(f"{files} files by mtime, median of {rounds}")
+        print(f"{'scan':<16} time={statistics.median(scanned):8.3f}s")
+        print(f"{'+ mtime order':<16} time={statistics.median(ordered):8.3f}s")
+        print(f"{'listdir + stat':<16} time={best(rounds, from_stat):8.3f}s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--dir", default=None, help="Parent directory for the test files.")
+    args = parser.parse_args()
+
+    bench_names(args.count, args.rounds)
+    if args.files:
+        bench_mtime(args.dir, args.files, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
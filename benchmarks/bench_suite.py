@@ -0,0 +1,398 @@
+"""
+Benchmark suite: scan, sort, plan, preview and apply at 10k to 1M files.
+
+Generates synthetic shot folders on tmpfs and on a regular disk and
+times every stage of the rename path on them:
+
+  scan                 scan_directory
+  parse                SequenceIndex of the scanned names
+  sort/<order>         every file order of the window and --sort
+  plan/<options>       plan_renames without options and with each
+                       rename option on its own, then all
+  check                collision check and execution plan (build_execution_plan)
+  preview              the plan pulled in chunks into a PlanSummary, as the
+                       preview window does, without Tk
+  preview/window       the PlanPreview window itself, until the plan is
+                       complete (only with a display)
+  apply                renaming on disk with a journal, as the apply command
+
+Each folder holds several sequences (padded to 4 and 6 digits, unpadded,
+one running past its padding), about 5% missing frames, 1% stray files
+and a few sub-directories, written in random order so file dates do not
+follow the names. The layout only depends on --seed and the size.
+
+Times are the best of --repeat runs (the worst is kept too, for
+compare.py to tell noise from change); peak memory is measured in a
+separate run with tracemalloc (Python allocations only). Disk results
+are warm-cache unless --drop-caches is given (needs root).
+
+    python benchmarks/bench_suite.py [--sizes 10k,100k,1M] [--locations tmpfs,disk]
+                                     [--output results.json] [--baseline baseline.json]
+
+Save a run as the baseline, then compare later runs against it:
+
+    python benchmarks/bench_suite.py --sizes 10k,100k --output benchmarks/baseline.json
+    python benchmarks/bench_suite.py --sizes 10k,100k --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compare import compare, print_comparison  # noqa: E402
+from mh_rename.batch import filesystem_type  # noqa: E402
+from mh_rename.collisions import build_execution_plan, occupied_paths  # noqa: E402
+from mh_rename.executor import apply_plan  # noqa: E402
+from mh_rename.journal import Journal, journal_path  # noqa: E402
+from mh_rename.ordering import ORDERS, sort_scan  # noqa: E402
+from mh_rename.planner import PlanSummary, RenameOptions, compile_rules, iter_plan, plan_renames  # noqa: E402
+from mh_rename.scan import scan_directory  # noqa: E402
+from mh_rename.sequences import SequenceIndex  # noqa: E402
+
+RESULTS_VERSION = 1
+# Default results file, kept out of git (see .gitignore)
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "bench_results.json")
+SEED = 1001
+PREVIEW_CHUNK = 5000  # PlanPreview.CHUNK_SIZE
+
+# (prefix, separator, padding, extension, first frame, share of the frames);
+# padding 0 is unpadded, the comp sequence outgrows its 4 digits
+SEQUENCES = (
+    ("sh010_beauty_v003", ".", 4, ".exr", 1001, 0.30),
+    ("sh010_depth_v003", "_", 6, ".exr", 1, 0.20),
+    ("sh020_plate_v001", ".", 0, ".dpx", 1, 0.20),
+    ("sh020_comp_v012", ".", 4, ".png", 9000, 0.25),
+    ("sh030_thumb_v001", "_", 3, ".jpg", 1, 0.05),
+)
+# No frame number ("-" is not a separator), so they are not sequences
+STRAY_NAMES = ("notes-{}.txt", "render-{}.log", "sh010_beauty_v003-{}.exr.tmp", "Thumbs-{}.db")
+GAP_RATE = 0.05    # Share of missing frames
+STRAY_RATE = 0.01  # Share of stray files
+SUBDIRS = 3
+
+# Each rename option on its own; "all" enables every one
+PLANS = {
+    "none": RenameOptions(),
+    "replace": RenameOptions(replace=True, find_text="_v0", replace_text="_r0"),
+    "renumber": RenameOptions(renumber=True, start_number=1),
+    "renumber_offsets": RenameOptions(renumber=True, start_number=1, keep_offsets=True),
+    "padding": RenameOptions(change_padding=True, padding=5),
+    "extension": RenameOptions(change_extension=True, extension="exr"),
+    "all": RenameOptions(replace=True, find_text="_v0", replace_text="_r0", renumber=True,
+                         start_number=1, keep_offsets=True, change_padding=True, padding=5,
+                         change_extension=True, extension="exr"),
+}
+# Applied on disk: new names never meet the old ones
+APPLY = RenameOptions(replace=True, find_text="_v0", replace_text="_r0", renumber=True, start_number=1)
+
+
+def parse_size(text):
+    """10k -> 10000, 1M -> 1000000."""
+    text = text.strip()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:].lower(), 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def size_label(count):
+    for scale, suffix in ((1000000, "M"), (1000, "k")):
+        if count >= scale and count % scale == 0:
+            return f"{count // scale}{suffix}"
+    return str(count)
+
+
+def layout(count, seed=SEED):
+    """File names (in creation order) and sub-directories of a folder of count entries."""
+    rng = random.Random(f"{seed}:{count}")
+    strays = max(1, int(count * STRAY_RATE))
+    frames = count - strays - SUBDIRS
+    names = []
+    for index, (prefix, sep, padding, ext, frame, share) in enumerate(SEQUENCES):
+        wanted = frames - len(names) if index == len(SEQUENCES) - 1 else int(frames * share)
+        for _ in range(wanted):
+            while rng.random() < GAP_RATE:
+                frame += 1
+            names.append(f"{prefix}{sep}{frame:0{padding}d}{ext}" if padding else f"{prefix}{sep}{frame}{ext}")
+            frame += 1
+    names += [STRAY_NAMES[i % len(STRAY_NAMES)].format(i) for i in range(strays)]
+    rng.shuffle(names)
+    return names, [f"subdir_{i}" for i in range(SUBDIRS)]
+
+
+def populate(directory, count, seed):
+    names, subdirs = layout(count, seed)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL
+    for name in names:
+        os.close(os.open(os.path.join(directory, name), flags, 0o644))
+    for name in subdirs:
+        os.mkdir(os.path.join(directory, name))
+    return len(names)
+
+
+def drop_caches():
+    os.sync()
+    try:
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+    except OSError as err:
+        sys.exit(f"--drop-caches: {err}")
+
+
+def measure(func, repeat, memory, reset=None, before=None):
+    """
+    Run func repeat times. Returns (last value, (best, worst) seconds,
+    peak bytes or None). Untimed: before() runs ahead of every call,
+    reset() after it.
+    """
+    best, worst = math.inf, 0.0
+    value = None
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        gc.collect()
+        start = time.perf_counter()
+        value = func()
+        seconds = time.perf_counter() - start
+        best, worst = min(best, seconds), max(worst, seconds)
+        if reset is not None:
+            reset()
+    peak = None
+    if memory:
+        if before is not None:
+            before()
+        value = None
+        gc.collect()
+        tracemalloc.start()
+        try:
+            value = func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        if reset is not None:
+            reset()
+    return value, (best, worst), peak
+
+
+def open_tk():
+    """A hidden Tk root and the PlanPreview class, or (None, reason)."""
+    try:
+        import tkinter as tk
+
+        from mh_rename.preview import PlanPreview
+        root = tk.Tk()
+    except Exception as err:  # No tkinter, or no display
+        return None, str(err).splitlines()[0] if str(err) else type(err).__name__
+    root.withdraw()
+    return (root, PlanPreview), None
+
+
+def preview_window(tk_state, ops, occupied):
+    root, window_class = tk_state
+    preview = window_class(root, ops, occupied=occupied)
+    while not preview.complete:
+        root.update()
+    root.update_idletasks()
+    preview.window.destroy()
+    return preview.summary.total
+
+
+def run_dataset(directory, args, tk_state, record):
+    """Time every stage on the populated directory; record(stage, seconds, peak)."""
+    before = drop_caches if args.drop_caches else None
+    scan, seconds, peak = measure(lambda: scan_directory(directory), args.repeat, args.memory, before=before)
+    record("scan", seconds, peak)
+
+    index, seconds, peak = measure(lambda: SequenceIndex(scan.names), args.repeat, args.memory)
+    record("parse", seconds, peak)
+    ordered = {}
+    for order in ORDERS:
+        ordered[order], seconds, peak = measure(lambda: sort_scan(scan, order, index), args.repeat, args.memory)
+        record(f"sort/{order}", seconds, peak)
+    natural = ordered[ORDERS[0]]
+
+    for label, options in PLANS.items():
+        rules = compile_rules(options)
+        ops, seconds, peak = measure(
+            lambda: plan_renames(natural.names, rules, directory, directory, natural, scan.entries),
+            args.repeat, args.memory,
+        )
+        record(f"plan/{label}", seconds, peak)
+
+    occupied = occupied_paths(scan, directory)
+    _, seconds, peak = measure(lambda: build_execution_plan(ops, occupied), args.repeat, args.memory)
+    record("check", seconds, peak)
+
+    rules = compile_rules(PLANS["all"])
+
+    def preview():
+        summary = PlanSummary(occupied)
+        plan = iter_plan(natural.names, rules, directory, directory, natural, scan.entries)
+        kept = []
+        while True:
+            chunk = list(itertools.islice(plan, PREVIEW_CHUNK))
+            kept.extend(chunk)
+            summary.update(chunk)
+            if len(chunk) < PREVIEW_CHUNK:
+                break
+        summary.lines()
+        return summary.total
+
+    _, seconds, peak = measure(preview, args.repeat, args.memory)
+    record("preview", seconds, peak)
+    if tk_state is not None:
+        _, seconds, peak = measure(
+            lambda: preview_window(tk_state, iter_plan(natural.names, rules, directory, directory,
+                                                       natural, scan.entries), occupied),
+            args.repeat, args.memory,
+        )
+        record("preview/window", seconds, peak)
+
+    if args.no_apply:
+        return
+    applied = plan_renames(natural.names, compile_rules(APPLY), directory, directory, natural, scan.entries)
+    forward = build_execution_plan(applied, occupied)
+    backward = [op._replace(src_name=op.dst_name, dst_name=op.src_name, src=op.dst, dst=op.src)
+                for op in applied]
+
+    def apply():
+        journal = Journal(journal_path(directory))
+        result = apply_plan(forward, journal=journal)
+        assert result.ok, result.report()
+
+    def reset():
+        os.remove(journal_path(directory))
+        result = apply_plan(backward)
+        assert result.ok, result.report()
+
+    _, seconds, peak = measure(apply, args.repeat, args.memory, reset=reset, before=before)
+    record("apply", seconds, peak)
+
+
+def environment(locations):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "filesystems": {label: filesystem_type(path) for label, path in locations.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10k,100k,1M", help="Entries per folder (default 10k,100k,1M).")
+    parser.add_argument("--locations", default="tmpfs,disk", help="tmpfs and/or disk (default both).")
+    parser.add_argument("--tmpfs", default="/dev/shm", help="Directory on tmpfs (default /dev/shm).")
+    parser.add_argument("--disk", default=tempfile.gettempdir(),
+                        help="Directory on a regular disk (default: the temp directory).")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per stage, the best counts (default 5).")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Skip the tracemalloc runs.")
+    parser.add_argument("--no-apply", action="store_true", help="Do not rename on disk.")
+    parser.add_argument("--no-window", action="store_true", help="Skip the preview window even with a display.")
+    parser.add_argument("--drop-caches", action="store_true",
+                        help="Drop the page cache before every scan and apply (Linux, root).")
+    parser.add_argument("--output", default=RESULTS_PATH,
+                        help="Results file (default benchmarks/results/bench_results.json).")
+    parser.add_argument("--baseline", default=None, help="Compare the results against this results file.")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="With --baseline: relative change reported as a regression (default 0.10).")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    locations = {}
+    for label in args.locations.split(","):
+        path = {"tmpfs": args.tmpfs, "disk": args.disk}.get(label)
+        if path is None:
+            parser.error(f"unknown location {label!r} (use tmpfs and/or disk)")
+        if not os.path.isdir(path):
+            parser.error(f"{label}: not a directory: {path}")
+        locations[label] = path
+    env = environment(locations)
+    if env["filesystems"].get("disk") == "tmpfs":
+        print(f"warning: {args.disk} is on tmpfs, use --disk for a real disk", file=sys.stderr)
+
+    tk_state = None
+    if not args.no_window:
+        tk_state, reason = open_tk()
+        if tk_state is None:
+            print(f"Skipping preview/window: {reason}", file=sys.stderr)
+
+    results = {}
+    datasets = {}
+    print(f"{'stage':<34}{'seconds':>10}{'files/s':>14}{'peak MiB':>10}")
+    for label, parent in locations.items():
+        for count in sizes:
+            prefix = f"{label}/{size_label(count)}"
+            directory = tempfile.mkdtemp(prefix="mh_bench_suite_", dir=parent)
+            try:
+                start = time.perf_counter()
+                try:
+                    files = populate(directory, count, args.seed)
+                except OSError as err:  # E.g. out of inodes on a small tmpfs
+                    print(f"{prefix}: skipped, cannot create the files: {err}", file=sys.stderr)
+                    datasets[prefix] = {"entries": count, "error": str(err)}
+                    continue
+                datasets[prefix] = {"entries": count, "files": files,
+                                    "generate_s": round(time.perf_counter() - start, 3)}
+
+                def record(stage, times, peak):
+                    seconds, worst = times
+                    results[f"{prefix}/{stage}"] = {
+                        "seconds": round(seconds, 6),
+                        "worst_seconds": round(worst, 6),
+                        "files_per_s": round(files / seconds) if seconds else None,
+                        "peak_bytes": peak,
+                    }
+                    memory = f"{peak / 2 ** 20:10.1f}" if peak is not None else f"{'-':>10}"
+                    print(f"{prefix + '/' + stage:<34}{seconds:10.4f}{files / seconds:14,.0f}{memory}",
+                          flush=True)
+
+                run_dataset(directory, args, tk_state, record)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    output = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": env,
+        "params": {"seed": args.seed, "repeat": args.repeat, "memory": args.memory,
+                   "drop_caches": args.drop_caches, "datasets": datasets},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=1)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparison = compare(baseline, output, args.threshold)
+        print_comparison(comparison)
+        sys.exit(1 if comparison.regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
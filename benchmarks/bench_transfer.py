@@ -0,0 +1,113 @@
+"""
+Benchmark: copy throughput of each transfer strategy.
+
+Writes --count files of --size MB into --src and copies them into --dst
+once per strategy, with --workers parallel copies. Put --src and --dst on
+different volumes (e.g. /dev/shm and a disk) to time the cross-device
+path; strategies the filesystems refuse fall through to the next one.
+"python" is a plain read()/write() loop for comparison.
+
+    python benchmarks/bench_transfer.py --src /dev/shm --dst /mnt/store [--count 64] [--size 64] [--workers 1,4]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mh_rename.executor import apply_plan  # noqa: E402
+from mh_rename.planner import RenameOp  # noqa: E402
+from mh_rename.transfer import (  # noqa: E402
+    BUFFERED,
+    COPY_FILE_RANGE,
+    REFLINK,
+    SENDFILE,
+    Transfer,
+)
+
+
+def python_copy(src, dst):
+    """What a naive copy costs: data through Python in 64 KiB reads."""
+    with open(src, "rb") as r, open(dst, "wb") as w:
+        while True:
+            block = r.read(65536)
+            if not block:
+                break
+            w.write(block)
+    shutil.copystat(src, dst)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--src", default=None, help="Parent directory for the source files.")
+    parser.add_argument("--dst", default=None, help="Parent directory for the copies.")
+    parser.add_argument("--count", type=int, default=64)
+    parser.add_argument("--size", type=int, default=64, help="File size in MB.")
+    parser.add_argument("--workers", default="1,4")
+    args = parser.parse_args()
+    if args.count < 1 or args.size < 1:
+        parser.error("--count and --size must be positive")
+
+    # The sources plus one set of copies at a time (both on one volume if so)
+    total = args.count * args.size
+    needed = {}
+    for directory in (args.src, args.dst):
+        directory = directory or tempfile.gettempdir()
+        device = os.stat(directory).st_dev
+        needed[device] = (directory, needed.get(device, (None, 0))[1] + total)
+    for directory, megabytes in needed.values():
+        free = shutil.disk_usage(directory).free // (1024 * 1024)
+        if megabytes > free:
+            parser.error(f"needs {megabytes} MB in {directory}, only {free} MB free "
+                         "(lower --count or --size)")
+
+    src_root = tempfile.mkdtemp(prefix="mh_bench_src_", dir=args.src)
+    names = [f"plate.{i + 1001:04d}.exr" for i in range(args.count)]
+
+    candidates = [
+        ("python", None),
+        (BUFFERED, [BUFFERED]),
+        (SENDFILE, [SENDFILE, BUFFERED]),
+        (COPY_FILE_RANGE, [COPY_FILE_RANGE, SENDFILE, BUFFERED]),
+        (REFLINK, None),
+    ]
+    print(f"{args.count} files x {args.size} MB, {src_root} -> {args.dst or tempfile.gettempdir()}")
+    try:
+        # Inside the try: a full disk or ^C while writing still removes them
+        block = os.urandom(1024 * 1024)
+        for name in names:
+            with open(os.path.join(src_root, name), "wb") as f:
+                for _ in range(args.size):
+                    f.write(block)
+
+        for label, strategies in candidates:
+            for workers in [int(w) for w in args.workers.split(",")]:
+                dst_root = tempfile.mkdtemp(prefix="mh_bench_dst_", dir=args.dst)
+                try:
+                    ops = [
+                        RenameOp(name, name, os.path.join(src_root, name), os.path.join(dst_root, name))
+                        for name in names
+                    ]
+                    if strategies is None and label == "python":
+                        transfer = python_copy
+                    else:
+                        transfer = Transfer(keep_source=True, strategies=strategies)
+                    t0 = time.perf_counter()
+                    result = apply_plan(ops, transfer, workers=workers)
+                    elapsed = time.perf_counter() - t0
+                    assert result.ok, result.report()
+                    used = ", ".join(transfer.counts) if isinstance(transfer, Transfer) else "python"
+                    print(f"{label:<16} workers={workers:>3}  time={elapsed:8.3f}s  "
+                          f"{total / elapsed:10,.0f} MB/s  (used: {used})")
+                finally:
+                    shutil.rmtree(dst_root, ignore_errors=True)
+    finally:
+        shutil.rmtree(src_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: watch mode cost while idle and per new file.
+
+Fills a directory with --existing files, then for inotify and polling:
+  idle   CPU seconds used by a watch over --idle seconds of no changes
+  poll   time of one poll with nothing new (polling: one directory stat)
+  new    time of the poll that finds --new freshly written files, plus
+         renaming them, settle time excluded
+
+With inotify all three stay flat as --existing grows. Polling stays
+flat while idle; a poll that finds new files lists the directory once
+(a full scandir is shown for comparison), and listings are throttled.
+
+    python benchmarks/bench_watch.py [--existing 100000] [--new 100] [--idle 5] [--dir DIR]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mh_rename.planner import RenameOptions, compile_rules  # noqa: E402
+from mh_rename.watch import MTIME_GRANULARITY, Watcher  # noqa: E402
+
+
+def populate(directory, count):
+    for i in range(count):
+        open(os.path.join(directory, f"old.{i:07d}.exr"), "w").close()
+
+
+def measure(directory, polling, args):
+    rules = compile_rules(RenameOptions(renumber=True, start_number=1))
+    watcher = Watcher(directory, rules, os.path.join(directory, "out"), settle=0.0,
+                      interval=0.5, polling=polling, journaled=False)
+    watcher.start()
+    label = watcher.method
+
+    # Idle: CPU time of the watch thread's process while nothing happens
+    thread = threading.Thread(target=watcher.run)
+    cpu = time.process_time()
+    thread.start()
+    time.sleep(args.idle)
+    idle_cpu = time.process_time() - cpu
+    watcher.stop()
+    thread.join()
+
+    watcher.start()
+    source = watcher.source
+    t0 = time.perf_counter()
+    rounds = 20
+    for _ in range(rounds):
+        source.wait(0)
+    poll = (time.perf_counter() - t0) / rounds
+
+    for i in range(args.new):
+        with open(os.path.join(directory, f"new.{i + 1001:04d}.exr"), "w") as f:
+            f.write("x")
+    # Poll until the files show up (polling waits out its listing
+    # throttle), timing only the poll that finds them
+    while True:
+        t0 = time.perf_counter()
+        appeared, _ = source.wait(0)
+        if appeared:
+            break
+        time.sleep(0.05)
+    watcher._add(appeared)
+    watcher.step(time.monotonic())  # Records the files
+    batch = watcher.step(time.monotonic() + 1)  # ...which are settled one check later
+    new = time.perf_counter() - t0
+    source.close()
+    watcher.source = None
+    assert batch is not None and len(batch.renamed) == args.new, batch and batch.lines()[:5]
+    return label, idle_cpu, poll, new
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--existing", type=int, default=100000)
+    parser.add_argument("--new", type=int, default=100)
+    parser.add_argument("--idle", type=float, default=5.0)
+    parser.add_argument("--dir", default=None, help="Parent directory for the test data.")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="mh_bench_watch_", dir=args.dir)
+    try:
+        populate(root, args.existing)
+        t0 = time.perf_counter()
+        with os.scandir(root) as it:
+            sum(1 for _ in it)
+        print(f"{args.existing} existing files; full scandir {1000 * (time.perf_counter() - t0):.2f} ms")
+        for polling in (False, True):
+            directory = os.path.join(root, f"w{int(polling)}")
+            os.mkdir(directory)
+            for name in os.listdir(root):
+                if name.startswith("old."):
+                    os.link(os.path.join(root, name), os.path.join(directory, name))
+            time.sleep(MTIME_GRANULARITY)  # A watch started on a freshly changed folder lists it again
+            label, idle_cpu, poll, new = measure(directory, polling, args)
+            print(f"{label:<8} idle cpu={idle_cpu * 1000:7.2f} ms/{args.idle:g}s  "
+                  f"poll={poll * 1e6:9.1f} us  {args.new} new={new * 1000:8.2f} ms "
+                  f"({new / args.new * 1e6:7.1f} us/file)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Compare two bench_suite.py results files.
+
+Lists every stage both runs measured with its time and peak memory
+before and after, and marks changes beyond --threshold: slower or
+bigger is a regression, faster or smaller an improvement. A time only
+counts as changed if it is also outside the other run's spread (best to
+worst of its repeats), and times below --min-seconds in both runs are
+not judged at all: on a busy machine both are noise. Exits
+with 1 if anything regressed, so it can gate a change to the rename path.
+
+    python benchmarks/compare.py BASELINE RESULTS [--threshold 0.10] [--min-seconds 0.002]
+"""
+
+import argparse
+import json
+import sys
+from collections import namedtuple
+
+MIN_SECONDS = 0.002     # Shorter stages are timer noise
+MIN_BYTES = 1 << 20     # ...and smaller peaks allocator noise
+
+# One stage in both runs; status: "" (within threshold), "slower", "faster", "bigger", "smaller"
+Change = namedtuple("Change", ["key", "seconds", "new_seconds", "peak", "new_peak", "status"])
+
+
+class Comparison:
+    """Result of compare(): changes per stage, plus what only one run measured."""
+
+    def __init__(self):
+        self.changes = []
+        self.missing = []   # Stages of the baseline that the new run lacks
+        self.added = []     # ...and the other way round
+        self.warnings = []  # Differences between the environments
+
+    @property
+    def regressions(self):
+        return [c for c in self.changes if c.status in ("slower", "bigger")]
+
+
+def _changed(old, new, threshold, floor, old_worst=None, new_worst=None):
+    """
+    +1 if new is worse than old beyond threshold, -1 if better, else 0.
+    old_worst/new_worst: the far end of each value's spread, which a
+    change has to clear as well.
+    """
+    if old is None or new is None or max(old, new) < floor:
+        return 0
+    if new > old * (1 + threshold) and new > (old_worst or old):
+        return 1
+    if new < old * (1 - threshold) and (new_worst or new) < old:
+        return -1
+    return 0
+
+
+def compare(baseline, results, threshold=0.10, min_seconds=MIN_SECONDS, min_bytes=MIN_BYTES):
+    """Compare two results dicts (as written by bench_suite.py)."""
+    comparison = Comparison()
+    old_env, new_env = baseline.get("environment", {}), results.get("environment", {})
+    for key in ("python", "implementation", "machine", "cpus", "filesystems"):
+        if old_env.get(key) != new_env.get(key):
+            comparison.warnings.append(f"{key} differs: {old_env.get(key)} -> {new_env.get(key)}")
+    old_params, new_params = baseline.get("params", {}), results.get("params", {})
+    for key in ("seed", "repeat", "drop_caches"):
+        if old_params.get(key) != new_params.get(key):
+            comparison.warnings.append(f"{key} differs: {old_params.get(key)} -> {new_params.get(key)}")
+
+    old, new = baseline["results"], results["results"]
+    for key, before in old.items():
+        after = new.get(key)
+        if after is None:
+            comparison.missing.append(key)
+            continue
+        time_change = _changed(before["seconds"], after["seconds"], threshold, min_seconds,
+                               before.get("worst_seconds"), after.get("worst_seconds"))
+        memory_change = _changed(before.get("peak_bytes"), after.get("peak_bytes"), threshold, min_bytes)
+        if time_change > 0:
+            status = "slower"
+        elif memory_change > 0:
+            status = "bigger"
+        elif time_change < 0:
+            status = "faster"
+        elif memory_change < 0:
+            status = "smaller"
+        else:
+            status = ""
+        comparison.changes.append(Change(key, before["seconds"], after["seconds"],
+                                         before.get("peak_bytes"), after.get("peak_bytes"), status))
+    comparison.added = [key for key in new if key not in old]
+    return comparison
+
+
+def _ratio(old, new):
+    return f"{(new / old - 1) * 100:+7.1f}%" if old else f"{'-':>8}"
+
+
+def _mib(value):
+    return f"{value / 2 ** 20:8.1f}" if value is not None else f"{'-':>8}"
+
+
+def print_comparison(comparison, out=sys.stdout):
+    for warning in comparison.warnings:
+        print(f"warning: {warning}", file=out)
+    print(f"{'stage':<34}{'before s':>10}{'after s':>10}{'':>9}{'MiB':>9}{'MiB':>9}{'':>9}", file=out)
+    for c in comparison.changes:
+        memory = _ratio(c.peak, c.new_peak) if c.peak is not None and c.new_peak is not None else f"{'':>8}"
+        print(f"{c.key:<34}{c.seconds:10.4f}{c.new_seconds:10.4f} {_ratio(c.seconds, c.new_seconds)}"
+              f" {_mib(c.peak)} {_mib(c.new_peak)} {memory}  {c.status.upper()}", file=out)
+    for key in comparison.missing:
+        print(f"{key:<34} not measured in the new run", file=out)
+    for key in comparison.added:
+        print(f"{key:<34} new, not in the baseline", file=out)
+    regressions = comparison.regressions
+    improved = sum(1 for c in comparison.changes if c.status in ("faster", "smaller"))
+    print(f"{len(comparison.changes)} stages compared: {len(regressions)} regressed, "
+          f"{improved} improved.", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("results")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative change reported as a regression (default 0.10).")
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS,
+                        help=f"Only compare the times of stages taking this long (default {MIN_SECONDS}).")
+    args = parser.parse_args()
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.results, encoding="utf-8") as f:
+        results = json.load(f)
+    comparison = compare(baseline, results, args.threshold, args.min_seconds)
+    print_comparison(comparison)
+    return 1 if comparison.regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+mh_tools - File Sequence Renamer
+--------------------------------
+Batch renaming of numbered file sequences: replace text sections,
+renumber sequences with padding and change file extensions, or run a
+pipeline of regex, template, case and slice rules.
+
+The GUI lives in mh_rename.gui; the planner and CLI do not import Tk.
+"""
+
+from mh_rename.planner import (
+    PlanSummary,
+    RenameOp,
+    RenameOptions,
+    RenameRules,
+    compile_rules,
+    iter_plan,
+    plan_renames,
+)
+from mh_rename.batch import BatchJob, BatchReport, apply_batch, jobs_from_root, plan_batch, read_manifest
+from mh_rename.collisions import (
+    CollisionError,
+    CollisionReport,
+    ExecutionPlan,
+    build_execution_plan,
+    check_plan,
+    two_phase_plan,
+)
+from mh_rename.executor import ApplyResult, apply_plan
+from mh_rename.journal import Journal, JournalState, load_journal, recovery_plan
+from mh_rename.metrics import Histogram, Metrics, send_record
+from mh_rename.ordering import ORDERS, natural_key, sort_order, sort_scan
+from mh_rename.planfile import (
+    PlanFile,
+    PlanFileError,
+    PlanWriter,
+    StalePlanError,
+    approve_plan,
+    diff_plans,
+    read_plan,
+    write_plan,
+)
+from mh_rename.presets import list_presets, load_preset, save_preset
+from mh_rename.rules import Pipeline, Step, format_steps, parse_steps
+from mh_rename.scan import ScanResult, iter_files, scan_directory
+from mh_rename.sequences import FrameSet, Sequence, SequenceIndex, parse_name
+from mh_rename.transfer import Transfer
+from mh_rename.watch import WatchBatch, Watcher
+
+__all__ = [
+    "PlanSummary", "RenameOp", "RenameOptions", "RenameRules", "compile_rules", "iter_plan",
+    "plan_renames",
+    "BatchJob", "BatchReport", "apply_batch", "jobs_from_root", "plan_batch", "read_manifest",
+    "CollisionError", "CollisionReport", "ExecutionPlan", "build_execution_plan", "check_plan",
+    "two_phase_plan",
+    "ApplyResult", "apply_plan",
+    "Journal", "JournalState", "load_journal", "recovery_plan",
+    "Histogram", "Metrics", "send_record",
+    "ORDERS", "natural_key", "sort_order", "sort_scan",
+    "PlanFile", "PlanFileError", "PlanWriter", "StalePlanError", "approve_plan", "diff_plans",
+    "read_plan", "write_plan",
+    "list_presets", "load_preset", "save_preset",
+    "Pipeline", "Step", "format_steps", "parse_steps",
+    "ScanResult", "iter_files", "scan_directory",
+    "FrameSet", "Sequence", "SequenceIndex", "parse_name",
+    "Transfer",
+    "WatchBatch", "Watcher",
+]
+
+__version__ = "1.2.0"
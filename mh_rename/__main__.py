@@ -0,0 +1,21 @@
+"""
+Entry point for ``python -m mh_rename``.
+With no arguments the GUI is started; otherwise the headless CLI runs.
+"""
+
+import multiprocessing
+import sys
+
+
+def main():
+    # Batch mode plans in spawned processes; needed in a frozen executable
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        from mh_rename.cli import main as cli_main
+        sys.exit(cli_main())
+    from mh_rename.gui import main as gui_main
+    gui_main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+"""
+mh_tools - Batch Mode
+---------------------
+Applies one set of rename options to many directories at once, e.g. a
+delivery of a few hundred shot folders.
+
+Directories come from a root, walked recursively and filtered with
+include/exclude globs, or from a manifest file. Every directory is
+planned on its own (scan, sort, plan, collision check) in a process
+pool, so the CPU-bound part runs on every core. Plans are executed on
+threads as they arrive, grouped per filesystem: each filesystem gets its
+own limit of directories in flight and of renames per directory, high
+for network shares where each rename is a round-trip and lower for local
+disks. A directory with collisions or errors is skipped and reported;
+the others still run. Each directory gets its own journal, so resume
+and undo work per directory as after a single apply.
+"""
+
+import functools
+import multiprocessing
+import os
+import re
+import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from mh_rename.collisions import chain_limit, check_plan, occupied_paths, two_phase_plan
+from mh_rename.executor import DEFAULT_RETRIES, apply_plan
+from mh_rename.journal import Journal, journal_path, load_journal
+from mh_rename.metrics import Metrics
+from mh_rename.ordering import DEFAULT_ORDER, sort_scan
+from mh_rename.planner import plan_renames
+from mh_rename.scan import RESERVED_PREFIX, _compile_pattern, scan_directory
+from mh_rename.sequences import SequenceIndex
+from mh_rename.transfer import Transfer
+
+# One directory of a batch; output_dir None renames in place
+BatchJob = namedtuple("BatchJob", ["directory", "output_dir"])
+
+# Execution limits for one filesystem: directories in flight, renames per directory
+FilesystemLimits = namedtuple("FilesystemLimits", ["directories", "workers"])
+
+LOCAL_LIMITS = FilesystemLimits(directories=min(8, os.cpu_count() or 1), workers=1)
+NETWORK_LIMITS = FilesystemLimits(directories=8, workers=8)
+
+NETWORK_FILESYSTEMS = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "afs", "9p", "ceph", "glusterfs", "lustre",
+    "beegfs", "gpfs", "wekafs", "fuse.sshfs", "fuse.rclone", "fuse.s3fs", "fuse.glusterfs",
+}
+REMOTE = "remote"  # Windows network drive or UNC path; the type is not known
+
+
+# --- Finding directories --------------------------------------------------
+
+def find_directories(root, include=(), exclude=(), depth=None, skip=()):
+    """
+    Directories under root, root included, in sorted order.
+    A directory is taken if its path relative to root matches one of the
+    include globs (every directory if none) and none of the exclude
+    globs; an excluded directory is not descended into. A pattern with a
+    "/" matches the relative path ("seq*/sh*"), otherwise the folder name.
+    depth: how many levels below root to look (None: no limit).
+    skip: directories left out with everything below them, e.g. an
+    output tree inside root.
+    """
+    def matcher(patterns):
+        compiled = [(("/" in p), _compile_pattern(p.strip("/"))) for p in patterns]
+        return lambda rel, name: any(match(rel if by_path else name) for by_path, match in compiled)
+
+    included = matcher(include) if include else None
+    excluded = matcher(exclude)
+    skip = {os.path.normcase(os.path.abspath(path)) for path in skip}
+    found = []
+    stack = [("", 0)]
+    while stack:
+        rel, level = stack.pop()
+        path = os.path.join(root, *rel.split("/")) if rel else root
+        if included is None or (rel and included(rel, rel.rsplit("/", 1)[-1])):
+            found.append(path)
+        if depth is not None and level >= depth:
+            continue
+        try:
+            with os.scandir(path) as it:
+                children = [
+                    entry.name for entry in it
+                    if entry.is_dir(follow_symlinks=False) and not entry.name.startswith(RESERVED_PREFIX)
+                ]
+        except OSError:
+            continue  # Reported by its scan if the directory itself was included
+        for name in children:
+            child = f"{rel}/{name}" if rel else name
+            if skip and os.path.normcase(os.path.abspath(os.path.join(path, name))) in skip:
+                continue
+            if not excluded(child, name):
+                stack.append((child, level + 1))
+    found.sort()
+    return found
+
+
+def jobs_from_root(root, output_root=None, include=(), exclude=(), depth=None):
+    """
+    BatchJobs for find_directories(root, ...); output_root mirrors the tree.
+    An output_root inside root is not renamed itself.
+    """
+    jobs = []
+    skip = [output_root] if output_root else ()
+    for directory in find_directories(root, include, exclude, depth, skip):
+        output_dir = None
+        if output_root:
+            output_dir = os.path.normpath(os.path.join(output_root, os.path.relpath(directory, root)))
+        jobs.append(BatchJob(directory, output_dir))
+    return jobs
+
+
+def read_manifest(path):
+    """
+    BatchJobs from a manifest: one input directory per line, optionally
+    followed by a tab and its output directory. Blank lines and lines
+    starting with # are skipped; relative paths are relative to the
+    manifest file. Raises ValueError if two lines rename into the same
+    directory: their journals and renames would clash.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    lines = {}  # Output directory (normcased) -> line number
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            directory, _, output_dir = (part.strip() for part in line.partition("\t"))
+            job = BatchJob(
+                os.path.normpath(os.path.join(base, directory)),
+                os.path.normpath(os.path.join(base, output_dir)) if output_dir else None,
+            )
+            key = os.path.normcase(job.output_dir or job.directory)
+            if key in lines:
+                raise ValueError(f"{path}, line {number}: renames into {job.output_dir or job.directory}, "
+                                 f"like line {lines[key]}")
+            lines[key] = number
+            jobs.append(job)
+    return jobs
+
+
+# --- Filesystems ------------------------------------------------------------
+
+def _unescape_mount(field):
+    # /proc/mounts writes spaces and tabs in paths as octal escapes (\040)
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), field)
+
+
+@functools.lru_cache(maxsize=1)
+def _mount_table():
+    """[(mount point, type)] on Linux, longest mount point first; [] elsewhere."""
+    try:
+        with open("/proc/self/mounts", encoding="utf-8", errors="replace") as f:
+            mounts = [line.split()[1:3] for line in f if line.count(" ") >= 3]
+    except OSError:
+        return []
+    mounts = [(_unescape_mount(point), fstype) for point, fstype in mounts]
+    mounts.sort(key=lambda mount: -len(mount[0]))
+    return mounts
+
+
+def _existing(path):
+    """path, or its nearest parent that exists (an output dir may be new)."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def filesystem_type(path):
+    """Type of the filesystem holding path ("ext4", "nfs4", REMOTE...) or None if unknown."""
+    path = _existing(path)
+    if sys.platform == "win32":
+        if path.startswith("\\\\"):
+            return REMOTE
+        import ctypes
+        DRIVE_REMOTE = 4
+        drive = os.path.splitdrive(path)[0] + "\\"
+        return REMOTE if ctypes.windll.kernel32.GetDriveTypeW(drive) == DRIVE_REMOTE else None
+    path = os.path.realpath(path)
+    for point, fstype in _mount_table():
+        if path == point or path.startswith(point.rstrip("/") + "/"):
+            return fstype
+    return None
+
+
+def filesystem_limits(path):
+    """FilesystemLimits for renames into path."""
+    fstype = filesystem_type(path)
+    if fstype == REMOTE or fstype in NETWORK_FILESYSTEMS:
+        return NETWORK_LIMITS
+    return LOCAL_LIMITS
+
+
+# --- Planning ---------------------------------------------------------------
+
+class DirectoryPlan:
+    """
+    Plan of one directory of a batch, built in a pool process.
+    files: files planned; execution: ExecutionPlan, or None if the
+    directory has collisions (CollisionReport in collisions) or could
+    not be planned (message in error). device/limits/workers: filesystem
+    of the output directory and the concurrency to run it with.
+    metrics: metrics.Metrics of the planning phases, sent back with the plan.
+    """
+
+    def __init__(self, job):
+        self.directory = job.directory
+        self.output_dir = job.output_dir or job.directory
+        self.files = 0
+        self.execution = None
+        self.collisions = None
+        self.error = None
+        self.device = None
+        self.limits = LOCAL_LIMITS
+        self.workers = 1
+        self.metrics = Metrics("plan_directory", directory=self.directory)
+
+    @property
+    def runnable(self):
+        return self.execution is not None and self.files > 0
+
+
+def plan_directory(job, rules, extensions=None, pattern=None, order=DEFAULT_ORDER, workers=None):
+    """
+    Plan one BatchJob; never raises for problems of the directory itself.
+    workers: renames per directory (default: from the filesystem).
+    """
+    plan = DirectoryPlan(job)
+    output_dir = plan.output_dir
+    metrics = plan.metrics
+    try:
+        state = load_journal(output_dir) if os.path.isdir(output_dir) else None
+        if state is not None and state.needs_recovery:
+            plan.error = "holds an interrupted rename, run resume first"
+            return plan
+        plan.device = os.stat(_existing(output_dir)).st_dev
+        plan.limits = filesystem_limits(output_dir)
+        plan.workers = workers or plan.limits.workers
+
+        with metrics.phase("scan"):
+            scan = scan_directory(job.directory, extensions, pattern)
+        metrics.count_scan(scan)
+        with metrics.phase("parse"):
+            index = SequenceIndex(scan.names)
+        with metrics.phase("sort"):
+            index = sort_scan(scan, order, index)
+        with metrics.phase("plan"):
+            ops = plan_renames(index.names, rules, job.directory, output_dir, index, scan.entries)
+        plan.files = len(ops)
+        metrics.count("files_planned", len(ops))
+        with metrics.phase("check"):
+            report = check_plan(ops, occupied_paths(scan, output_dir))
+            if report.ok:
+                plan.execution = two_phase_plan(ops, chain_limit(len(ops), plan.workers))
+        if not report.ok:
+            plan.collisions = report
+    except (OSError, ValueError, KeyError) as err:
+        plan.error = str(err)
+    return plan
+
+
+def plan_batch(jobs, rules, extensions=None, pattern=None, order=DEFAULT_ORDER,
+               workers=None, processes=None):
+    """
+    Yield a DirectoryPlan for every job, in the order they finish.
+    processes: size of the process pool (default: CPU count); 1 plans
+    in this process. The pool uses "spawn" so it is safe to start from
+    the GUI's threads, at a fraction of a second of start-up.
+    """
+    task = functools.partial(plan_directory, rules=rules, extensions=extensions,
+                             pattern=pattern, order=order, workers=workers)
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+    if processes <= 1:
+        yield from map(task, jobs)
+        return
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        for future in as_completed([pool.submit(task, job) for job in jobs]):
+            yield future.result()
+
+
+# --- Execution and report ---------------------------------------------------
+
+ERROR = "error"
+COLLISIONS = "collisions"
+EMPTY = "empty"
+PLANNED = "planned"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class DirectoryResult:
+    """One row of a BatchReport: a DirectoryPlan and its ApplyResult (None if not run)."""
+
+    def __init__(self, plan, result=None, error=None, cancelled=False):
+        self.plan = plan
+        self.result = result
+        self.error = error or plan.error
+        self.cancelled = cancelled
+
+    @property
+    def status(self):
+        if self.error:
+            return ERROR
+        if self.plan.collisions is not None:
+            return COLLISIONS
+        if not self.plan.files:
+            return EMPTY
+        if self.cancelled or (self.result is not None and self.result.cancelled):
+            return CANCELLED
+        if self.result is None:
+            return PLANNED
+        return DONE if self.result.ok else FAILED
+
+    @property
+    def renamed(self):
+        return self.result.renamed if self.result is not None else 0
+
+    @property
+    def failed(self):
+        return len(self.result.failed) if self.result is not None else 0
+
+    def line(self, root=None):
+        """One line: status, directory and counts."""
+        plan = self.plan
+        name = os.path.relpath(plan.directory, root) if root else plan.directory
+        status = self.status
+        if status == ERROR:
+            detail = self.error
+        elif status == COLLISIONS:
+            detail = f"{plan.collisions.count} collisions in {plan.files} files, nothing renamed"
+        elif status == PLANNED:
+            detail = f"{plan.files} files"
+        else:
+            detail = f"{self.renamed} of {plan.files} renamed"
+            if self.failed:
+                detail += f", {self.failed} failed"
+        return f"{status:<10} {name}  {detail}"
+
+
+class BatchReport:
+    """
+    Aggregated outcome of a batch, one DirectoryResult per directory.
+    Has ok/renamed/report() like executor.ApplyResult, so front ends can
+    show either. Safe to add to from several threads.
+    """
+
+    def __init__(self, root=None):
+        self.root = root
+        self.rows = []
+        self.lock = threading.Lock()
+
+    def add(self, row):
+        with self.lock:
+            self.rows.append(row)
+
+    def count(self, status):
+        return sum(1 for row in self.rows if row.status == status)
+
+    @property
+    def ok(self):
+        return not any(row.status in (ERROR, COLLISIONS, FAILED, CANCELLED) for row in self.rows)
+
+    @property
+    def files(self):
+        return sum(row.plan.files for row in self.rows)
+
+    @property
+    def renamed(self):
+        return sum(row.renamed for row in self.rows)
+
+    @property
+    def failed(self):
+        return sum(row.failed for row in self.rows)
+
+    def lines(self, limit=None):
+        """Row per directory (empty ones left out), problems first, then totals."""
+        rank = {ERROR: 0, COLLISIONS: 1, FAILED: 2, CANCELLED: 3}
+        rows = sorted(
+            (row for row in self.rows if row.status != EMPTY),
+            key=lambda row: (rank.get(row.status, 4), row.plan.directory),
+        )
+        lines = [row.line(self.root) for row in rows[:limit]]
+        if limit is not None and len(rows) > limit:
+            lines.append(f"... and {len(rows) - limit} more directories")
+        return lines + [self.summary()]
+
+    def summary(self):
+        """One line of totals."""
+        parts = [f"{len(self.rows)} directories"]
+        for status in (EMPTY, ERROR, COLLISIONS, FAILED, CANCELLED):
+            n = self.count(status)
+            if n:
+                parts.append(f"{n} {'without files' if status == EMPTY else status}")
+        if any(row.result is not None for row in self.rows):
+            totals = f"renamed {self.renamed} of {self.files} files"
+            if self.failed:
+                totals += f", {self.failed} failed"
+        else:
+            totals = f"{self.files} files planned"
+        return f"Batch: {', '.join(parts)}; {totals}."
+
+    def report(self, limit=20):
+        """Multi-line, user-facing description."""
+        return "\n".join(self.lines(limit))
+
+
+def apply_batch(plans, rename=os.rename, journaled=True, directories=None, retries=DEFAULT_RETRIES,
+                cancel=None, progress=None, finished=None, root=None, metrics=None):
+    """
+    Execute DirectoryPlans (a list, or the plan_batch generator to start
+    each directory as soon as it is planned) and return a BatchReport.
+    rename: callable(src, dst), e.g. a transfer.Transfer shared by all
+    directories; with keep_source every directory needs a separate output.
+    journaled: write a journal into every output directory.
+    directories: directories in flight per filesystem (default: from the
+    filesystem, see FilesystemLimits).
+    cancel: optional threading.Event; running directories stop between
+    files, the rest are not started.
+    progress: optional callable(done, failed) with file totals over the batch.
+    finished: optional callable(DirectoryResult) per directory, from any thread.
+    Only the first plan per output directory runs; later ones are errors.
+    metrics: optional metrics.Metrics summing the execution of every directory.
+    """
+    report = BatchReport(root)
+    keep_source = isinstance(rename, Transfer) and rename.keep_source
+    totals = [0, 0]  # Files done, failed over every directory
+
+    def record(row):
+        report.add(row)
+        if finished is not None:
+            finished(row)
+
+    def run(plan):
+        if cancel is not None and cancel.is_set():
+            record(DirectoryResult(plan, cancelled=True))
+            return
+        if keep_source and os.path.normcase(os.path.abspath(plan.directory)) == \
+                os.path.normcase(os.path.abspath(plan.output_dir)):
+            record(DirectoryResult(plan, error="keeping the source files needs a separate output directory"))
+            return
+        seen = [0, 0]
+
+        def directory_progress(done, failed):
+            with report.lock:
+                totals[0] += done - seen[0]
+                totals[1] += failed - seen[1]
+                seen[:] = done, failed
+                batch_done, batch_failed = totals
+            if progress is not None:
+                progress(batch_done, batch_failed)
+
+        try:
+            os.makedirs(plan.output_dir, exist_ok=True)
+            journal = Journal(journal_path(plan.output_dir), keep_source=keep_source) if journaled else None
+            result = apply_plan(plan.execution, rename, workers=plan.workers, retries=retries,
+                                cancel=cancel, progress=directory_progress, journal=journal,
+                                metrics=metrics)
+        except OSError as err:
+            record(DirectoryResult(plan, error=str(err)))
+            return
+        record(DirectoryResult(plan, result))
+
+    pools = {}  # Filesystem (st_dev) -> ThreadPoolExecutor
+    futures = []
+    outputs = set()
+    try:
+        for plan in plans:
+            if not plan.runnable:
+                record(DirectoryResult(plan))
+                continue
+            output_key = os.path.normcase(os.path.abspath(plan.output_dir))
+            if output_key in outputs:
+                record(DirectoryResult(plan, error="another directory of the batch renames into "
+                                                   f"{plan.output_dir}"))
+                continue
+            outputs.add(output_key)
+            pool = pools.get(plan.device)
+            if pool is None:
+                pool = pools[plan.device] = ThreadPoolExecutor(
+                    max_workers=directories or plan.limits.directories,
+                    thread_name_prefix="mh_rename-batch",
+                )
+            futures.append(pool.submit(run, plan))
+        for future in futures:
+            future.result()
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+    return report
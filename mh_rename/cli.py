@@ -0,0 +1,725 @@
+"""
+mh_tools - Command Line Interface
+---------------------------------
+Headless front end to the rename planner, for machines without a display.
+
+    python -m mh_rename sequences INPUT_DIR
+    python -m mh_rename plan  INPUT_DIR [options] [--save-plan FILE]
+    python -m mh_rename apply INPUT_DIR [options] [--yes]
+    python -m mh_rename resume DIR
+    python -m mh_rename undo   DIR
+    python -m mh_rename batch-plan  ROOT|--manifest FILE [options]
+    python -m mh_rename batch-apply ROOT|--manifest FILE [options] [--yes]
+    python -m mh_rename watch INPUT_DIR [options] [--yes]
+    python -m mh_rename plan-show FILE [--list]
+    python -m mh_rename plan-diff OLD NEW
+    python -m mh_rename plan-approve FILE
+    python -m mh_rename apply-plan FILE [--input-dir DIR] [--output-dir DIR] [--yes]
+    python -m mh_rename presets
+"""
+
+import argparse
+import os
+import queue
+import sys
+import time
+from dataclasses import asdict, replace
+
+from mh_rename.planner import (
+    DEFAULT_PADDING,
+    PlanSummary,
+    RenameOptions,
+    compile_rules,
+    iter_plan,
+    plan_renames,
+)
+from mh_rename.batch import (
+    EMPTY,
+    BatchReport,
+    DirectoryResult,
+    apply_batch,
+    jobs_from_root,
+    plan_batch,
+    read_manifest,
+)
+from mh_rename.collisions import CollisionError, build_execution_plan, check_plan, occupied_paths
+from mh_rename.executor import DEFAULT_RETRIES, apply_plan
+from mh_rename.journal import (
+    ROLLED_BACK,
+    Journal,
+    journal_path,
+    load_journal,
+    occupied_on_disk,
+    recovery_plan,
+    recovery_transfer,
+)
+from mh_rename.metrics import METRICS_ENV, Metrics, profiled, send_record
+from mh_rename.ordering import DEFAULT_ORDER, ORDERS, sort_scan
+from mh_rename.planfile import (
+    PlanFile,
+    PlanFileError,
+    PlanWriter,
+    StalePlanError,
+    approve_plan,
+    diff_plans,
+    read_plan,
+)
+from mh_rename.presets import list_presets, load_preset, preset_dir, save_preset
+from mh_rename.rules import Step, parse_step, parse_steps
+from mh_rename.scan import scan_directory
+from mh_rename.sequences import SequenceIndex
+from mh_rename.transfer import Transfer
+from mh_rename.watch import DEFAULT_INTERVAL, Watcher
+from mh_rename.worker import ERROR, WATCHED, WatchWorker
+
+
+def build_parser():
+    """Create the argument parser for the sub-commands."""
+    parser = argparse.ArgumentParser(
+        prog="mh_rename",
+        description="mh_tools - File Sequence Renamer (headless)."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("--only-ext", default=None,
+                         help="Only include files with these extensions (comma separated).")
+    filters.add_argument("--match", default=None,
+                         help="Only include file names matching this glob pattern.")
+
+    source = argparse.ArgumentParser(add_help=False, parents=[filters])
+    source.add_argument("input_dir", help="Directory containing the files to rename.")
+
+    rename = argparse.ArgumentParser(add_help=False)
+    rename.add_argument("--find", default="", help="Text to replace.")
+    rename.add_argument("--replace-with", default="", help="Replacement text.")
+    rename.add_argument("--start", type=int, default=None,
+                        help="Renumber each sequence starting at this number.")
+    rename.add_argument("--keep-offsets", action="store_true",
+                        help="When renumbering, keep the gaps between frames.")
+    rename.add_argument("--padding", type=int, default=None,
+                        help=f"Frame padding when renumbering (default {DEFAULT_PADDING}).")
+    rename.add_argument("--ext", default=None, help="New extension (without dot).")
+    rename.add_argument("--rule", action="append", default=[],
+                        help="Rule pipeline step, e.g. 'regex: (\\w+)_v(\\d+) => \\2_\\1', 'case: upper', "
+                             "'slice: 0:-2' or 'template: {prefix}.{frame:04d}{ext}' (repeatable).")
+    rename.add_argument("--rules-file", default=None,
+                        help="File with rule pipeline steps, one per line.")
+    rename.add_argument("--preset", default=None,
+                        help="Start from a saved preset (name or .json file); other options override it.")
+    rename.add_argument("--save-preset", default=None, metavar="NAME",
+                        help="Save the resulting options as a preset.")
+    rename.add_argument("--sort", choices=ORDERS, default=DEFAULT_ORDER,
+                        help="File order, which renumbering follows: natural (f.9 before f.10), "
+                             "frame (sequence by sequence), name (alphabetical) or mtime "
+                             f"(oldest first). Default {DEFAULT_ORDER}.")
+
+    report = argparse.ArgumentParser(add_help=False)
+    report.add_argument("--metrics", default=None, metavar="TARGET",
+                        help="Send the run's metrics as a JSON line to a file, tcp://HOST:PORT, "
+                             f"udp://HOST:PORT or unix:PATH (default: ${METRICS_ENV}).")
+    report.add_argument("--timings", action="store_true",
+                        help="Print the time of every phase and the per-file latencies.")
+    report.add_argument("--profile", default=None, metavar="FILE",
+                        help="Profile the run with cProfile and write the stats to FILE.")
+
+    common = argparse.ArgumentParser(add_help=False, parents=[source, rename, report])
+    common.add_argument("-o", "--output", dest="output_dir", default="",
+                        help="Output directory (files are moved there). Default: rename in place.")
+
+    batch = argparse.ArgumentParser(add_help=False, parents=[filters, rename, report])
+    batch.add_argument("root", nargs="?", default=None,
+                       help="Root directory; it and every directory below it is renamed.")
+    batch.add_argument("--manifest", default=None,
+                       help="File listing the directories instead, one per line "
+                            "(optionally a tab and the output directory).")
+    batch.add_argument("--include", action="append", default=[],
+                       help="Only directories matching this glob (repeatable); with a '/' the "
+                            "pattern matches the path below root, otherwise the folder name.")
+    batch.add_argument("--exclude", action="append", default=[],
+                       help="Skip directories matching this glob, and everything below them.")
+    batch.add_argument("--depth", type=int, default=None,
+                       help="Only look this many levels below root.")
+    batch.add_argument("--output-root", default="",
+                       help="Mirror the directory tree into this directory. Default: rename in place.")
+    batch.add_argument("--processes", type=int, default=None,
+                       help="Processes planning directories in parallel (default: CPU count).")
+
+    def execution(workers, workers_help):
+        # Built per default: parents share their actions, so set_defaults
+        # on one sub-command would change the default of all of them
+        execute = argparse.ArgumentParser(add_help=False)
+        execute.add_argument("-y", "--yes", action="store_true", help="Do not ask for confirmation.")
+        execute.add_argument("-j", "--workers", type=int, default=workers,
+                             help=f"Parallel renames, useful on network shares ({workers_help}).")
+        execute.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                             help=f"Retries for transient errors (default {DEFAULT_RETRIES}).")
+        return execute
+
+    execute = execution(1, "default 1")
+
+    transfer = argparse.ArgumentParser(add_help=False)
+    transfer.add_argument("--no-journal", action="store_true",
+                          help="Do not write a journal (no resume or undo for this batch).")
+    transfer.add_argument("--copy", action="store_true",
+                          help="Keep the source files and copy into the output directory.")
+    transfer.add_argument("--hardlink", action="store_true",
+                          help="With --copy, hard link instead of copying where possible.")
+    transfer.add_argument("--no-verify", action="store_true",
+                          help="Skip the size/mtime check after copying a file.")
+
+    sub.add_parser("presets", help="List the saved presets with their settings.")
+    sub.add_parser("sequences", parents=[source],
+                   help="List the frame sequences with their frame ranges and gaps.")
+    plan = sub.add_parser("plan", parents=[common], help="Print the rename plan without touching disk.")
+    plan.add_argument("--save-plan", default=None, metavar="FILE",
+                      help="Write the plan to FILE (for plan-diff, plan-approve and apply-plan) "
+                           "instead of printing it.")
+    sub.add_parser("apply", parents=[common, execute, transfer], help="Rename the files on disk.")
+    sub.add_parser("batch-plan", parents=[batch],
+                   help="Plan every directory of a batch and report counts and collisions.")
+    batch_apply = sub.add_parser("batch-apply", parents=[batch, execution(None, "default: by filesystem"),
+                                                         transfer],
+                                 help="Rename the files of every directory of a batch.")
+    batch_apply.add_argument("--parallel-dirs", type=int, default=None,
+                             help="Directories renamed at once per filesystem "
+                                  "(default: by filesystem type).")
+
+    watch = sub.add_parser("watch", parents=[common, execute, transfer],
+                           help="Keep renaming new files as they are written, until Ctrl+C.")
+    watch.add_argument("--settle", type=float, default=None,
+                       help="Seconds a file's size and date must hold still before it is renamed "
+                            "(default 2, 10 on network shares).")
+    watch.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                       help=f"Seconds between polls (default {DEFAULT_INTERVAL:g}).")
+    watch.add_argument("--existing", action="store_true",
+                       help="Also rename the files already in the directory.")
+    watch.add_argument("--first-frame", type=int, default=None,
+                       help="Frame that gets the start number (default: the lowest frame of the "
+                            "first files of each sequence; lower frames finishing later are left "
+                            "unrenamed).")
+    watch.add_argument("--polling", action="store_true",
+                       help="Poll the directory even where inotify is available.")
+
+    recover = argparse.ArgumentParser(add_help=False, parents=[execute, report])
+    recover.add_argument("directory", help="Directory the batch renamed into (holds the journal).")
+    resume_parser = sub.add_parser("resume", parents=[recover],
+                                   help="Finish an interrupted batch from its journal.")
+    resume_parser.add_argument("--rollback", action="store_true",
+                               help="Roll the interrupted batch back instead of finishing it.")
+    sub.add_parser("undo", parents=[recover],
+                   help="Rename the last batch back to its original names.")
+
+    show = sub.add_parser("plan-show", help="Describe a plan file and check that it is intact.")
+    show.add_argument("plan", help="Plan file written by plan --save-plan or the preview.")
+    show.add_argument("--list", action="store_true", help="Also print every rename.")
+    diff = sub.add_parser("plan-diff", help="Show how two plan files differ, by source file.")
+    diff.add_argument("old", help="Plan file.")
+    diff.add_argument("new", help="Plan file to compare with it.")
+    approve = sub.add_parser("plan-approve", help="Record the approval of a plan file in it.")
+    approve.add_argument("plan", help="Plan file.")
+    approve.add_argument("--by", default=None, help="Who approves (default: the user name).")
+    apply_file = sub.add_parser("apply-plan", parents=[execute, transfer, report],
+                                help="Rename exactly as a plan file says, if its files are unchanged.")
+    apply_file.add_argument("plan", help="Plan file.")
+    apply_file.add_argument("--input-dir", default=None,
+                            help="Directory holding the files, if not where the plan was made.")
+    apply_file.add_argument("--output-dir", default=None,
+                            help="Output directory, if not the plan's (an in-place plan follows --input-dir).")
+    apply_file.add_argument("--require-approval", action="store_true",
+                            help="Refuse a plan that was not approved with plan-approve.")
+    apply_file.add_argument("--size-only", action="store_true",
+                            help="Only check the sizes of the files, not their dates "
+                                 "(e.g. after copying them without their dates).")
+    return parser
+
+
+def options_from_args(args):
+    """
+    Map parsed arguments onto RenameOptions (a flag enables its section).
+    With --preset, the preset is the starting point and the flags given
+    override it; --rules-file and --rule steps are added after its steps.
+    Raises ValueError (or OSError for unreadable files).
+    """
+    changes = {}
+    if args.find:
+        changes.update(replace=True, find_text=args.find, replace_text=args.replace_with)
+    if args.start is not None:
+        changes.update(renumber=True, start_number=args.start)
+    if args.keep_offsets:
+        changes.update(keep_offsets=True)
+    if args.padding is not None:
+        changes.update(change_padding=True, padding=args.padding)
+    if args.ext is not None:
+        changes.update(change_extension=True, extension=args.ext)
+
+    steps = ()
+    if args.rules_file:
+        with open(args.rules_file, encoding="utf-8") as f:
+            steps += parse_steps(f.read())
+    steps += tuple(parse_step(rule) for rule in args.rule)
+
+    if args.preset:
+        options = load_preset(args.preset)
+        return replace(options, steps=options.steps + steps, **changes)
+    return RenameOptions(steps=steps, **changes)
+
+
+def show_presets():
+    """Print every saved preset with its options and steps."""
+    names = list_presets()
+    if not names:
+        print(f"No presets in {preset_dir()}", file=sys.stderr)
+    for name in names:
+        try:
+            options = load_preset(name)
+        except (OSError, ValueError) as err:
+            print(f"{name}: {err}")
+            continue
+        default = RenameOptions()
+        changed = {
+            key: value for key, value in asdict(options).items()
+            if key != "steps" and value != getattr(default, key)
+        }
+        print(f"{name}:", ", ".join(f"{key}={value!r}" for key, value in changed.items()) or "(defaults)")
+        for step in options.steps:
+            print(f"    {step}")
+    return 0
+
+
+def rules_from_args(parser, args):
+    """Compile the rename options of args, saving them first with --save-preset."""
+    try:
+        options = options_from_args(args)
+        rules = compile_rules(options)
+        if args.save_preset:
+            print(f"Saved preset {save_preset(args.save_preset, options)}", file=sys.stderr)
+    except (OSError, ValueError) as err:
+        parser.error(str(err))
+    return rules
+
+
+def confirm(args, question):
+    """Ask question on the terminal unless --yes was given."""
+    if args.yes:
+        return True
+    answer = input(f"{question} [y/N] ")
+    return answer.strip().lower() in ("y", "yes")
+
+
+def recover(parser, args, metrics):
+    """Run the resume/undo sub-commands from the journal in args.directory."""
+    directory = os.path.normpath(args.directory)
+    state = load_journal(directory)
+    if state is None:
+        parser.error(f"no rename journal in {directory}")
+    print(state.describe())
+
+    if args.command == "resume":
+        if not state.needs_recovery:
+            print("Nothing to resume.", file=sys.stderr)
+            return 0
+        rollback = args.rollback
+    else:
+        if state.status == ROLLED_BACK:
+            print("Nothing to undo.", file=sys.stderr)
+            return 0
+        rollback = True
+
+    try:
+        with metrics.phase("plan"):
+            execution, journal = recovery_plan(state, rollback, args.workers)
+    except CollisionError as err:
+        print(f"The directory no longer matches the journal: {err}", file=sys.stderr)
+        return 1
+    action = "Roll back" if rollback else "Finish"
+    if not confirm(args, f"{action} {execution.file_count} renames?"):
+        return 1
+    transfer = recovery_transfer(state, rollback)
+    result = apply_plan(execution, transfer, workers=args.workers, retries=args.retries,
+                        journal=journal, metrics=metrics)
+    if isinstance(transfer, Transfer):
+        metrics.add_transfer(transfer)
+    print(result.report(limit=len(result.failed)))
+    return 0 if result.ok else 1
+
+
+def run_batch(parser, args, metrics):
+    """
+    Run the batch-plan/batch-apply sub-commands. The phases of metrics
+    add up the directories, so with parallel planning or renaming they
+    can exceed the wall time; "batch" is the wall time of the whole batch.
+    """
+    if bool(args.root) == bool(args.manifest):
+        parser.error("give either a root directory or --manifest")
+    if args.manifest:
+        try:
+            jobs = read_manifest(args.manifest)
+        except (OSError, ValueError) as err:
+            parser.error(f"cannot use the manifest: {err}")
+        root = None
+    else:
+        root = os.path.normpath(args.root)
+        if not os.path.isdir(root):
+            parser.error(f"not a directory: {root}")
+        output_root = os.path.normpath(args.output_root) if args.output_root else None
+        jobs = jobs_from_root(root, output_root, args.include, args.exclude, args.depth)
+    if not jobs:
+        print("No directories to rename.", file=sys.stderr)
+        return 0
+
+    applying = args.command == "batch-apply"
+    if applying and args.copy and not args.manifest and not args.output_root:
+        parser.error("--copy needs a separate output directory (--output-root)")
+
+    rules = rules_from_args(parser, args)
+    metrics.info["directories"] = len(jobs)
+    started = metrics.elapsed
+    plans = plan_batch(jobs, rules, args.only_ext, args.match, args.sort,
+                       workers=args.workers if applying else None, processes=args.processes)
+    if not applying or not args.yes:
+        plans = list(plans)
+        for plan in plans:
+            metrics.merge(plan.metrics)
+        preview = BatchReport(root)
+        for plan in plans:
+            preview.add(DirectoryResult(plan))
+        for line in preview.lines():
+            print(line)
+        if not applying:
+            metrics.add_phase("batch", metrics.elapsed - started)
+            return 0 if preview.ok else 1
+        runnable = sum(plan.files for plan in plans if plan.runnable)
+        if not runnable:
+            print("No files to rename.", file=sys.stderr)
+            return 0 if preview.ok else 1
+        if not confirm(args, f"{'Copy' if args.copy else 'Rename'} {runnable} files?"):
+            return 1
+
+    def finished(row):
+        if args.yes:
+            # Planned in this run, so not merged above
+            metrics.merge(row.plan.metrics)
+            if row.status != EMPTY:
+                print(row.line(root), flush=True)
+
+    transfer = Transfer(keep_source=args.copy, hardlink=args.hardlink, verify=not args.no_verify)
+    report = apply_batch(plans, transfer, journaled=not args.no_journal, directories=args.parallel_dirs,
+                         retries=args.retries, finished=finished, root=root, metrics=metrics)
+    metrics.add_phase("batch", metrics.elapsed - started)
+    metrics.add_transfer(transfer)
+    # With --yes the rows were printed as they finished
+    print(report.summary() if args.yes else report.report(limit=None))
+    for line in transfer.lines():
+        print(line)
+    return 0 if report.ok else 1
+
+
+def run_watch(parser, args, metrics):
+    """Run the watch sub-command until interrupted."""
+    input_dir = os.path.normpath(args.input_dir)
+    if not os.path.isdir(input_dir):
+        parser.error(f"not a directory: {input_dir}")
+    output_dir = os.path.normpath(args.output_dir) if args.output_dir else input_dir
+    if args.copy and output_dir == input_dir:
+        parser.error("--copy needs a separate output directory (-o)")
+    rules = rules_from_args(parser, args)
+    if args.sort != DEFAULT_ORDER:
+        print("Watch mode renames files in the order they are finished; --sort is ignored.",
+              file=sys.stderr)
+
+    if not args.no_journal and os.path.isdir(output_dir):
+        state = load_journal(output_dir)
+        if state is not None and state.needs_recovery:
+            print(f"{state.describe()}\n"
+                  f"Run 'resume {output_dir}' (or 'resume --rollback') first.", file=sys.stderr)
+            return 1
+    if not confirm(args, f"Watch {input_dir} and {'copy' if args.copy else 'rename'} new files?"):
+        return 1
+
+    transfer = Transfer(keep_source=args.copy, hardlink=args.hardlink, verify=not args.no_verify)
+    watcher = Watcher(
+        input_dir, rules, output_dir, args.only_ext, args.match,
+        existing=args.existing, first_frame=args.first_frame, settle=args.settle,
+        interval=args.interval, rename=transfer, journaled=not args.no_journal,
+        workers=args.workers, retries=args.retries, polling=True if args.polling else None,
+        metrics=metrics,
+    )
+    try:
+        watcher.start()
+    except OSError as err:
+        print(f"Cannot watch {input_dir}: {err}", file=sys.stderr)
+        return 1
+    print(f"Watching {input_dir} ({watcher.method}, Ctrl+C to stop)...", file=sys.stderr)
+    worker = WatchWorker(watcher)
+    worker.start()
+    failed = False
+    while True:
+        try:
+            event = worker.events.get(timeout=1.0)
+        except queue.Empty:
+            continue
+        except KeyboardInterrupt:
+            # Let the current round finish, so no batch is left half done
+            print("Stopping...", file=sys.stderr)
+            worker.cancel()
+            continue
+        if event[0] == WATCHED:
+            for line in event[1].lines():
+                print(line, flush=True)
+            failed = failed or bool(event[1].failed)
+        elif event[0] == ERROR:
+            print(f"Watching stopped: {event[1]}", file=sys.stderr)
+            failed = True
+        else:
+            break
+    print(f"Renamed {watcher.renamed} files, {watcher.failed} failed, {watcher.skipped} skipped.",
+          file=sys.stderr)
+    metrics.add_transfer(transfer)
+    return 1 if failed else 0
+
+
+def execute(args, ops, occupied, output_dir, metrics):
+    """Check ops for collisions, ask, then rename them as the apply sub-commands do."""
+    try:
+        with metrics.phase("check"):
+            execution = build_execution_plan(ops, occupied, args.workers)
+    except CollisionError as err:
+        print(err, file=sys.stderr)
+        return 1
+
+    journal = None
+    if not args.no_journal:
+        state = load_journal(output_dir) if os.path.isdir(output_dir) else None
+        if state is not None and state.needs_recovery:
+            print(f"{state.describe()}\n"
+                  f"Run 'resume {output_dir}' (or 'resume --rollback') first.", file=sys.stderr)
+            return 1
+        journal = Journal(journal_path(output_dir), keep_source=args.copy)
+
+    if not confirm(args, f"{'Copy' if args.copy else 'Rename'} {len(ops)} files?"):
+        return 1
+
+    transfer = Transfer(keep_source=args.copy, hardlink=args.hardlink, verify=not args.no_verify)
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        result = apply_plan(execution, transfer, workers=args.workers, retries=args.retries,
+                            journal=journal, metrics=metrics)
+    except OSError as err:
+        # The output directory or the journal cannot be written
+        print(f"Cannot rename into {output_dir}: {err}", file=sys.stderr)
+        return 1
+    metrics.add_transfer(transfer)
+    print(result.report(limit=len(result.failed)))
+    for line in transfer.lines():
+        print(line)
+    return 0 if result.ok else 1
+
+
+def save_plan(args, scan, index, rules, output_dir, metrics):
+    """
+    Stream the plan into the --save-plan file, checking it for collisions
+    on the way; nothing is saved if it has any.
+    """
+    input_dir = scan.directory
+    summary = PlanSummary(occupied_paths(scan, output_dir))
+    writer = PlanWriter(args.save_plan, input_dir, output_dir, options_from_args(args), args.sort)
+    try:
+        with metrics.phase("plan"):
+            for op in iter_plan(index.names, rules, input_dir, output_dir, index, scan.entries):
+                summary.add(op)
+                writer.add(op)
+    except BaseException:
+        writer.abort()
+        raise
+    metrics.count("files_planned", writer.count)
+    for line in summary.lines():
+        print(line, file=sys.stderr)
+    if summary.collisions:
+        writer.abort()
+        print(f"{summary.collisions} collisions; the plan was not saved.", file=sys.stderr)
+        return 1
+    digest = writer.close()
+    print(f"Saved the plan of {writer.count} files to {args.save_plan}\nsha256 {digest}", file=sys.stderr)
+    return 0
+
+
+def show_plan(args):
+    """Run the plan-show sub-command."""
+    plan = PlanFile(args.plan)
+    out = sys.stdout
+    for op in plan.ops:
+        if args.list:
+            out.write(f"{op.src_name}  ->  {op.dst_name}\n")
+    # After a listing, the summary goes to stderr like that of plan
+    info = sys.stderr if args.list else sys.stdout
+    print(plan.describe(), file=info)
+    header = plan.header
+    print(f"Order: {header.get('order') or '?'}", file=info)
+    if header.get("options") is not None:
+        default = asdict(RenameOptions())
+        changed = {key: value for key, value in header["options"].items()
+                   if key != "steps" and value != default.get(key)}
+        print("Options:", ", ".join(f"{key}={value!r}" for key, value in changed.items()) or "(defaults)",
+              file=info)
+        for step in header["options"].get("steps", ()):
+            print(f"    {Step(**step)}", file=info)
+    print(f"sha256 {plan.digest}", file=info)
+    approvals = plan.approved()
+    for approval in approvals:
+        print(f"Approved by {approval.get('by')} on {approval.get('host')}, "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(approval.get('at', 0)))}", file=info)
+    if not approvals:
+        print("Not approved.", file=info)
+    return 0
+
+
+def show_diff(args):
+    """Run the plan-diff sub-command; exits with 1 if the plans differ, as diff does."""
+    old, new = PlanFile(args.old), PlanFile(args.new)
+    differences = 0
+    for key in ("input_dir", "output_dir", "order"):
+        if old.header.get(key) != new.header.get(key):
+            print(f"{key}: {old.header.get(key)!r} -> {new.header.get(key)!r}")
+            differences += 1
+    old_options, new_options = old.header.get("options") or {}, new.header.get("options") or {}
+    for key in sorted(set(old_options) | set(new_options)):
+        if old_options.get(key) != new_options.get(key):
+            print(f"{key}: {old_options.get(key)!r} -> {new_options.get(key)!r}")
+            differences += 1
+    out = sys.stdout
+    for kind, a, b in diff_plans(old, new):
+        differences += 1
+        if kind == "changed":
+            out.write(f"~ {a.src_name}  ->  {a.dst_name} | {b.dst_name}\n")
+        elif kind == "removed":
+            out.write(f"- {a.src_name}  ->  {a.dst_name}\n")
+        else:
+            out.write(f"+ {b.src_name}  ->  {b.dst_name}\n")
+    print(f"{old.count} -> {new.count} files, {differences} differences.", file=sys.stderr)
+    return 1 if differences else 0
+
+
+def run_plan_file(parser, args, metrics):
+    """Run the apply-plan sub-command."""
+    try:
+        plan = PlanFile(args.plan, args.input_dir, args.output_dir)
+    except (OSError, PlanFileError) as err:
+        parser.error(str(err))
+    metrics.info["plan"] = os.path.abspath(args.plan)
+    metrics.info["directory"] = plan.input_dir
+    if args.copy and plan.output_dir == plan.input_dir:
+        parser.error("--copy needs a separate output directory (--output-dir)")
+    try:
+        with metrics.phase("read"):
+            ops = read_plan(plan, size_only=args.size_only)
+    except (OSError, PlanFileError, StalePlanError) as err:
+        print(err, file=sys.stderr)
+        return 1
+    metrics.count("files_planned", len(ops))
+    print(plan.describe(), file=sys.stderr)
+    approvals = plan.approved()
+    for approval in approvals:
+        print(f"Approved by {approval.get('by')}.", file=sys.stderr)
+    if args.require_approval and not approvals:
+        print("The plan is not approved (see plan-approve).", file=sys.stderr)
+        return 1
+    if not ops:
+        print("No files to rename.", file=sys.stderr)
+        return 0
+    return execute(args, ops, occupied_on_disk(ops), plan.output_dir, metrics)
+
+
+def report_metrics(args, metrics, code):
+    """Print (--timings) and send (--metrics) the metrics of a finished run."""
+    metrics.ok = code == 0
+    if args.timings:
+        for line in metrics.lines():
+            print(line, file=sys.stderr)
+    try:
+        send_record(metrics.record(), args.metrics)
+    except (OSError, ValueError) as err:
+        print(f"Could not send the metrics to {args.metrics or os.environ.get(METRICS_ENV)}: {err}",
+              file=sys.stderr)
+
+
+def main(argv=None):
+    """CLI entry point. Returns a process exit code."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not hasattr(args, "metrics"):
+        return run(parser, args, None)
+    metrics = Metrics(args.command)
+    with profiled(args.profile):
+        code = run(parser, args, metrics)
+    report_metrics(args, metrics, code)
+    return code
+
+
+def run(parser, args, metrics):
+    """Run the sub-command of args; metrics is None for presets and sequences."""
+    if args.command in ("resume", "undo"):
+        return recover(parser, args, metrics)
+    if args.command.startswith("batch-"):
+        return run_batch(parser, args, metrics)
+    if args.command == "presets":
+        return show_presets()
+    if args.command == "watch":
+        return run_watch(parser, args, metrics)
+    if args.command == "apply-plan":
+        return run_plan_file(parser, args, metrics)
+    if args.command in ("plan-show", "plan-diff", "plan-approve"):
+        try:
+            if args.command == "plan-show":
+                return show_plan(args)
+            if args.command == "plan-diff":
+                return show_diff(args)
+            print(f"Approved sha256 {approve_plan(args.plan, args.by)}")
+            return 0
+        except (OSError, PlanFileError) as err:
+            print(err, file=sys.stderr)
+            return 2
+
+    input_dir = os.path.normpath(args.input_dir)
+    if not os.path.isdir(input_dir):
+        parser.error(f"not a directory: {input_dir}")
+    if args.command == "sequences":
+        scan = scan_directory(input_dir, args.only_ext, args.match)
+        for line in SequenceIndex(scan.names).lines():
+            print(line)
+        return 0
+
+    metrics.info["directory"] = input_dir
+    output_dir = os.path.normpath(args.output_dir) if args.output_dir else input_dir
+    rules = rules_from_args(parser, args)
+    with metrics.phase("scan"):
+        scan = scan_directory(input_dir, args.only_ext, args.match)
+    metrics.count_scan(scan)
+    with metrics.phase("parse"):
+        index = SequenceIndex(scan.names)
+    with metrics.phase("sort"):
+        index = sort_scan(scan, args.sort, index)
+    if args.command == "plan" and args.save_plan:
+        return save_plan(args, scan, index, rules, output_dir, metrics)
+    with metrics.phase("plan"):
+        ops = plan_renames(index.names, rules, input_dir, output_dir, index, scan.entries)
+    metrics.count("files_planned", len(ops))
+    if not ops:
+        print("No files to rename.", file=sys.stderr)
+        return 0
+
+    if args.command == "apply" and args.copy and output_dir == input_dir:
+        parser.error("--copy needs a separate output directory (-o)")
+
+    occupied = occupied_paths(scan, output_dir)
+    if args.command == "plan":
+        out = sys.stdout
+        for op in ops:
+            out.write(f"{op.src_name}  ->  {op.dst_name}\n")
+        with metrics.phase("check"):
+            report = check_plan(ops, occupied)
+        for line in report.lines():
+            print(line, file=sys.stderr)
+        return 0 if report.ok else 1
+
+    return execute(args, ops, occupied, output_dir, metrics)
@@ -0,0 +1,257 @@
+"""
+mh_tools - Collision Check and Two-Phase Ordering
+-------------------------------------------------
+Validates a rename plan before anything touches disk and turns it into a
+safe execution order.
+
+check_plan() builds a hash index of sources and destinations in O(n) and
+reports destinations that are written twice or would overwrite a file
+that is not part of the plan. two_phase_plan() then orders the plan into
+dependency chains and breaks rename cycles (a -> b, b -> a) by parking a
+file under a temporary name, so an overlapping renumber runs in close to
+one rename per file: plain chains are executed back to front, only
+cycles cost an extra rename.
+"""
+
+import math
+import os
+import secrets
+
+from mh_rename.planner import RenameOp
+
+TEMP_PREFIX = ".mh_rename_tmp_"
+
+
+class CollisionReport:
+    """
+    Result of check_plan.
+    duplicates: {dst path: [ops]} for destinations written more than once.
+    clobbers: ops whose destination already exists and is not moved away.
+    cycles: number of rename cycles (resolved with temporary names, not an error).
+    """
+
+    def __init__(self):
+        self.duplicates = {}
+        self.clobbers = []
+        self.cycles = 0
+
+    @property
+    def ok(self):
+        return not self.duplicates and not self.clobbers
+
+    @property
+    def count(self):
+        return sum(len(ops) for ops in self.duplicates.values()) + len(self.clobbers)
+
+    def lines(self, limit=20):
+        """User-facing description of every problem (up to limit rows)."""
+        rows = []
+        for ops in self.duplicates.values():
+            sources = ", ".join(op.src_name for op in ops)
+            rows.append(f"{ops[0].dst_name} would be written by: {sources}")
+        for op in self.clobbers:
+            rows.append(f"{op.src_name} -> {op.dst_name} would overwrite an existing file")
+        if len(rows) > limit:
+            rows = rows[:limit] + [f"... and {len(rows) - limit} more"]
+        return rows
+
+
+class CollisionError(Exception):
+    """Raised when a plan cannot be applied without overwriting files."""
+
+    def __init__(self, report):
+        self.report = report
+        super().__init__(
+            f"{report.count} collisions, nothing was renamed:\n" + "\n".join(report.lines())
+        )
+
+
+def occupied_paths(scan, output_dir):
+    """
+    Paths in output_dir that exist on disk but are not sources of the plan.
+    For an in-place rename these come from the scan itself (sub-directories
+    and filtered files); a separate output directory is listed once.
+    """
+    if os.path.normcase(os.path.abspath(output_dir)) == os.path.normcase(os.path.abspath(scan.directory)):
+        names = scan.others
+    elif os.path.isdir(output_dir):
+        names = os.listdir(output_dir)
+    else:
+        names = []
+    return [os.path.join(output_dir, name) for name in names]
+
+
+def check_plan(ops, occupied=()):
+    """
+    Detect collisions in ops before execution.
+    occupied: paths already on disk that the plan does not move away.
+    """
+    key = os.path.normcase
+    report = CollisionReport()
+    sources = {key(op.src) for op in ops}
+    occupied = {key(path) for path in occupied} - sources
+
+    first_writer = {}
+    for op in ops:
+        dst = key(op.dst)
+        if dst in occupied:
+            report.clobbers.append(op)
+        prev = first_writer.setdefault(dst, op)
+        if prev is not op:
+            report.duplicates.setdefault(dst, [prev]).append(op)
+
+    report.cycles = len(_cycles(ops, _waiters(ops)[0]))
+    return report
+
+
+def _waiters(ops):
+    """
+    waiter[j] = i when ops[i] has to wait for ops[j] to move its source away.
+    Returns (waiter, blocked) where blocked[i] is true if ops[i] waits.
+    """
+    key = os.path.normcase
+    src_index = {key(op.src): i for i, op in enumerate(ops)}
+    waiter = {}
+    blocked = bytearray(len(ops))
+    for i, op in enumerate(ops):
+        j = src_index.get(key(op.dst))
+        if j is not None and j != i:
+            waiter[j] = i
+            blocked[i] = 1
+    return waiter, blocked
+
+
+def _cycles(ops, waiter):
+    """Return each rename cycle as a list of op indices in execution order."""
+    state = bytearray(len(ops))  # 0 new, 1 on current walk, 2 done
+    cycles = []
+    for start in range(len(ops)):
+        if state[start]:
+            continue
+        walk = []
+        i = start
+        while i is not None and not state[i]:
+            state[i] = 1
+            walk.append(i)
+            i = waiter.get(i)
+        if i is not None and state[i] == 1:
+            cycles.append(walk[walk.index(i):])
+        for j in walk:
+            state[j] = 2
+    return cycles
+
+
+def chain_limit(total, workers):
+    """Longest chain worth keeping whole when running with workers threads."""
+    if workers <= 1:
+        return None
+    return max(64, math.ceil(total / workers))
+
+
+class ExecutionPlan:
+    """
+    Safe execution order for a plan.
+    temp_moves: phase 1, files moved to a temporary name to break a cycle
+    or cut a long chain; they are independent and can run in any order.
+    chains: phase 2, lists of ops that must each run in order; separate
+    chains are independent of each other.
+    """
+
+    def __init__(self):
+        self.temp_moves = []
+        self.chains = []
+
+    def __len__(self):
+        return len(self.temp_moves) + self.file_count
+
+    @property
+    def file_count(self):
+        """Number of files being renamed (temporary moves not counted)."""
+        return sum(map(len, self.chains))
+
+    def __iter__(self):
+        yield from self.temp_moves
+        for chain in self.chains:
+            yield from chain
+
+
+def is_temp_move(op):
+    """True for a phase 1 op that parks a file under a temporary name."""
+    return op.dst_name.startswith(TEMP_PREFIX)
+
+
+def two_phase_plan(ops, max_chain=None):
+    """
+    Turn ops into an ExecutionPlan.
+    Chains (the destination of one op is the source of the next) are run
+    back to front, so they need no temporary names. Cycles are broken by
+    parking one file under a temporary name in phase 1. With max_chain
+    set, long chains are also cut every max_chain ops so parallel workers
+    can run the pieces concurrently, at one extra rename per cut.
+    Expects a plan that passed check_plan.
+    """
+    waiter, blocked = _waiters(ops)
+    token = secrets.token_hex(4)
+    plan = ExecutionPlan()
+
+    def split(op):
+        tmp_name = f"{TEMP_PREFIX}{token}_{len(plan.temp_moves)}"
+        tmp = os.path.join(os.path.dirname(op.src), tmp_name)
+        plan.temp_moves.append(RenameOp(op.src_name, tmp_name, op.src, tmp))
+        return RenameOp(tmp_name, op.dst_name, tmp, op.dst)
+
+    def emit(order, cyclic):
+        chain = []
+        tail = None
+        for position, i in enumerate(order):
+            op = ops[i]
+            if cyclic and position == 0:
+                # The parked file lands after the rest of the cycle has moved
+                tail = split(op)
+            elif max_chain and position and position % max_chain == 0:
+                # Finish this piece with the parked file; the next piece
+                # can start as soon as phase 1 has freed its source
+                chain.append(split(op))
+                plan.chains.append(chain)
+                chain = []
+            else:
+                chain.append(op)
+        if tail is not None:
+            chain.append(tail)
+        if chain:
+            plan.chains.append(chain)
+
+    for head in range(len(ops)):
+        if blocked[head]:
+            continue
+        order = [head]
+        i = waiter.get(head)
+        while i is not None:
+            order.append(i)
+            i = waiter.get(i)
+        emit(order, cyclic=False)
+
+    for cycle in _cycles(ops, waiter):
+        emit(cycle, cyclic=True)
+    return plan
+
+
+def build_execution_plan(ops, occupied=(), workers=1):
+    """
+    Check ops for collisions and return their ExecutionPlan, with long
+    chains cut up for the given number of workers.
+    Raises CollisionError if the plan would overwrite anything.
+    """
+    ensure_no_collisions(ops, occupied)
+    return two_phase_plan(ops, chain_limit(len(ops), workers))
+
+
+def ensure_no_collisions(ops, occupied=()):
+    """
+    Check ops and raise CollisionError if the plan would overwrite
+    anything. Returns the CollisionReport otherwise.
+    """
+    report = check_plan(ops, occupied)
+    if not report.ok:
+        raise CollisionError(report)
+    return report
@@ -0,0 +1,234 @@
+"""
+mh_tools - Rename Executor
+--------------------------
+Executes a rename plan, serially or spread across a thread pool.
+
+The plan is ordered by collisions.two_phase_plan first: phase 1 parks the
+few files that break a cycle under temporary names, phase 2 runs the
+dependency chains. Each chain runs in order on one thread, independent
+chains run concurrently, so overlapping renumbers never clobber a file.
+Transient errors (busy files, network hiccups) are retried with backoff.
+"""
+
+import errno
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mh_rename.collisions import ExecutionPlan, chain_limit, is_temp_move, two_phase_plan
+from mh_rename.metrics import Histogram
+from mh_rename.planner import RenameOp
+
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.05  # Seconds, doubled on every retry
+
+TRANSIENT_ERRNOS = {
+    getattr(errno, name) for name in (
+        "EAGAIN", "EBUSY", "EINTR", "ETIMEDOUT", "ESTALE",
+        "ECONNRESET", "ECONNABORTED", "ENETRESET",
+    )
+    if hasattr(errno, name)
+}
+# Windows sharing/lock violations, e.g. a virus scanner holding the file
+TRANSIENT_WINERRORS = {32, 33}
+
+
+class SkippedError(Exception):
+    """An op was not attempted because an op it depends on failed."""
+
+
+class ApplyResult:
+    """
+    Outcome of applying a plan: completed ops, (op, error) failures and
+    the ops that were never attempted because the run was cancelled.
+    parked: phase 1 moves whose file could not be put back after phase 1
+    failed; those files keep their temporary names until recovery.
+    """
+
+    def __init__(self):
+        self.done = []
+        self.failed = []
+        self.skipped = []
+        self.parked = []
+        self.cancelled = False
+        self.rolled_back = False
+
+    @property
+    def ok(self):
+        return not self.failed and not self.cancelled
+
+    @property
+    def renamed(self):
+        """Files that reached their destination (temporary moves not counted)."""
+        return sum(1 for op in self.done if not is_temp_move(op))
+
+    def report(self, limit=20):
+        """Multi-line, user-facing description of what was done."""
+        # Temporary parking moves are bookkeeping, not files in their own right
+        done = self.renamed
+        failed = sum(1 for op, _ in self.failed if not is_temp_move(op))
+        skipped = sum(1 for op in self.skipped if not is_temp_move(op))
+        lines = [f"Renamed {done} of {done + failed + skipped} files."]
+        if self.cancelled:
+            lines.append(f"Cancelled: {skipped} files were not processed.")
+        elif skipped:
+            lines.append(f"{skipped} files were not processed.")
+        if self.failed:
+            lines.append(f"{len(self.failed)} renames failed:")
+            for op, err in self.failed[:limit]:
+                lines.append(f"  {op.src_name} -> {op.dst_name}: {err}")
+            if len(self.failed) > limit:
+                lines.append(f"  ... and {len(self.failed) - limit} more")
+        if self.parked:
+            lines.append(f"{len(self.parked)} files could not be put back and keep a temporary name; "
+                         "resume or roll back the batch.")
+        return "\n".join(lines)
+
+
+def is_transient(err):
+    """True if err is worth retrying."""
+    if getattr(err, "winerror", None) in TRANSIENT_WINERRORS:
+        return True
+    return err.errno in TRANSIENT_ERRNOS
+
+
+def apply_plan(ops, rename=os.rename, workers=1, retries=DEFAULT_RETRIES,
+               backoff=DEFAULT_BACKOFF, cancel=None, progress=None, journal=None, metrics=None):
+    """
+    Execute the plan, collecting failures instead of stopping.
+    ops: list of RenameOp (ordered with two_phase_plan) or an ExecutionPlan.
+    rename: callable(src, dst) doing the actual move.
+    workers: number of threads; 1 runs everything on the calling thread.
+    retries/backoff: retry transient OSErrors, sleeping backoff * 2**n.
+    cancel: optional threading.Event checked between files.
+    progress: optional callable(done, failed), may be called from any worker.
+    journal: optional journal.Journal recording every op for crash recovery.
+    metrics: optional metrics.Metrics receiving the "journal" (writing
+    intents and outcome) and "execute" phases, per-file latencies, rename
+    calls, retries, errors and journal fsyncs.
+    """
+    clock = time.perf_counter
+    if not isinstance(ops, ExecutionPlan):
+        ops = two_phase_plan(ops, chain_limit(len(ops), workers))
+    plan = ops
+    if journal is not None:
+        started = clock()
+        journal.begin(plan)
+        if metrics is not None:
+            metrics.add_phase("journal", clock() - started)
+
+    result = ApplyResult()
+    lock = threading.Lock()
+    moved = 0  # Files that reached their destination (temp moves excluded)
+    attempted = 0  # Ops tried
+    retried = 0  # ...and retries of them
+    latency = Histogram() if metrics is not None else None
+
+    def run_op(op):
+        """Rename op, retrying transient errors. Returns the error or None."""
+        nonlocal retried
+        attempt = 0
+        while True:
+            try:
+                rename(op.src, op.dst)
+                return None
+            except OSError as err:
+                if attempt >= retries or not is_transient(err):
+                    return err
+                with lock:
+                    retried += 1
+                time.sleep(backoff * (2 ** attempt))
+                attempt += 1
+
+    def run_chains(chains):
+        nonlocal moved, attempted
+        while True:
+            with lock:
+                start, chain = next(chains, (0, None))
+            if chain is None:
+                return
+            for index, op in enumerate(chain):
+                if cancel is not None and cancel.is_set():
+                    with lock:
+                        result.cancelled = True
+                        result.skipped.extend(chain[index:])
+                    break
+                started = clock()
+                err = run_op(op)
+                elapsed = clock() - started
+                if journal is not None:
+                    journal.record(start + index, err)
+                with lock:
+                    attempted += 1
+                    if latency is not None:
+                        latency.add(elapsed)
+                    if err is None:
+                        result.done.append(op)
+                        if not is_temp_move(op):
+                            moved += 1
+                    else:
+                        # The rest of the chain would overwrite files that never moved
+                        result.failed.append((op, err))
+                        for later in chain[index + 1:]:
+                            result.failed.append(
+                                (later, SkippedError(f"not renamed, {op.src_name} failed"))
+                            )
+                    done, failed = moved, len(result.failed)
+                if progress is not None:
+                    progress(done, failed)
+                if err is not None:
+                    break
+
+    def run_phase(chains, first=0):
+        # Pair every chain with the plan index of its first op, for the journal
+        starts = itertools.accumulate(map(len, chains), initial=first)
+        chains = zip(starts, chains)
+        if workers <= 1:
+            run_chains(chains)
+            return
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mh_rename") as pool:
+            for future in [pool.submit(run_chains, chains) for _ in range(workers)]:
+                future.result()
+
+    # Phase 1: park files under temporary names
+    execute_started = clock()
+    run_phase([[op] for op in plan.temp_moves])
+    if result.failed or result.cancelled:
+        # Put parked files back; phase 2 depends on every one of them. One
+        # that cannot be put back stays parked, for recovery to find
+        for op in result.done:
+            err = run_op(RenameOp(op.dst_name, op.src_name, op.dst, op.src))
+            if err is not None:
+                result.failed.append((op, err))
+                result.parked.append(op)
+        result.done = []
+        result.skipped = [op for chain in plan.chains for op in chain]
+        result.rolled_back = not result.parked
+    else:
+        # Phase 2: dependency chains
+        if journal is not None:
+            journal.phase(2)
+        run_phase(plan.chains, len(plan.temp_moves))
+
+    if metrics is not None:
+        metrics.add_phase("execute", clock() - execute_started)
+    if journal is not None:
+        started = clock()
+        journal.end(result)
+        if metrics is not None:
+            metrics.add_phase("journal", clock() - started)
+    if metrics is not None:
+        metrics.add_latency(latency)
+        metrics.count("rename_calls", attempted + retried)
+        metrics.count("retries", retried)
+        metrics.count("temp_moves", len(plan.temp_moves))
+        for _, err in result.failed:
+            if isinstance(err, SkippedError):
+                metrics.count("skipped_after_failure")
+            else:
+                metrics.error(err)
+        if journal is not None:
+            metrics.count("journal_fsyncs", journal.fsyncs)
+    return result
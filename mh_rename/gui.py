@@ -0,0 +1,1105 @@
+import collections
+import functools
+import os
+import queue
+import tkinter as tk
+from tkinter import filedialog, messagebox, simpledialog, ttk
+
+from mh_rename.planner import (
+    DEFAULT_PADDING,
+    DEFAULT_START_NUMBER,
+    RenameOptions,
+    compile_rules,
+    plan_renames,
+)
+from mh_rename.batch import apply_batch, jobs_from_root, plan_batch
+from mh_rename.collisions import build_execution_plan, occupied_paths
+from mh_rename.journal import (
+    ROLLED_BACK,
+    Journal,
+    journal_path,
+    load_journal,
+    occupied_on_disk,
+    recovery_plan,
+    recovery_transfer,
+)
+from mh_rename.metrics import Metrics, send_record
+from mh_rename.ordering import DEFAULT_ORDER, FRAME, MTIME, NAME, NATURAL, sort_scan
+from mh_rename.planfile import PLAN_SUFFIX, PlanFile, PlanFileError, read_plan, write_plan
+from mh_rename.presets import list_presets, load_preset, save_preset
+from mh_rename.preview import PlanPreview
+from mh_rename.progress import ProgressWindow
+from mh_rename.rules import format_steps, parse_steps
+from mh_rename.scan import scan_directory
+from mh_rename.transfer import Transfer
+from mh_rename.watch import Watcher
+from mh_rename.worker import ERROR, FINISHED, WATCHED, BatchWorker, PlanWorker, RenameWorker, WatchWorker
+
+"""
+mh_tools - File Sequence Renamer
+--------------------------------
+A Tkinter-based GUI tool for batch renaming numbered file sequences.
+Supports: replace text sections, renumber sequences with padding,
+change file extensions, and preview renames before execution.
+"""
+
+# File order choices, as shown in the UI
+ORDER_LABELS = {
+    NATURAL: "Natural (f.9 before f.10)",
+    FRAME: "Frame number, sequence by sequence",
+    NAME: "Alphabetical",
+    MTIME: "Modification time",
+}
+
+WATCH_POLL_MS = 500  # How often the window shows what a watch did
+
+WINDOW_WIDTH = 640
+SCREEN_MARGIN = 80  # Taskbar and title bar: a 1080p screen leaves about 1000 px
+
+# What the Tk thread reads from the UI before a worker scans and plans
+PlanJob = collections.namedtuple("PlanJob", "options rules input_dir output_dir order")
+
+
+class FileRenamerGUI:
+    """
+    Main application class for the file renamer GUI.
+    """
+    def __init__(self, root):
+        """
+        Initialize the main window and all UI components.
+        """
+        self.root = root
+        self.root.title("mh_tools - File Sequence Renamer")
+
+        # Scrollable body, for screens too short for every section
+        outer = tk.Frame(root)
+        outer.pack(fill="both", expand=True)
+        self.canvas = tk.Canvas(outer, highlightthickness=0)
+        scrollbar = tk.Scrollbar(outer, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.body = tk.Frame(self.canvas)
+        body_id = self.canvas.create_window((0, 0), window=self.body, anchor="nw")
+        self.body.bind(
+            "<Configure>",
+            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        )
+        self.canvas.bind("<Configure>", lambda e: self.canvas.itemconfigure(body_id, width=e.width))
+        root.bind("<MouseWheel>", self.on_mousewheel)
+        root.bind("<Button-4>", lambda e: self.scroll_body(e, -1))
+        root.bind("<Button-5>", lambda e: self.scroll_body(e, 1))
+
+        # Main container frame
+        self.container = tk.LabelFrame(
+            self.body,
+            text="mh_tools",
+            padx=10,
+            pady=10
+        )
+        self.container.pack(
+            fill="both",
+            expand=True,
+            padx=10,
+            pady=10
+        )
+
+        # Input and output directory selection
+        self.setup_directory_selection()
+
+        # Replace / Renumber / Padding / Extension sections
+        self.setup_feature_toggles()
+        self.setup_replace_section()
+        self.setup_renumber_section()
+        self.setup_padding_section()
+        self.setup_extension_section()
+        self.setup_rules_section()
+
+        # Action buttons: preview and rename
+        self.setup_action_buttons()
+
+        # Internal state
+        self.input_dir = ""
+        self.output_dir = ""
+        self.scan = None  # Last ScanResult, shared by preview and rename
+        self.ordered = None  # (scan, order, SequenceIndex) of the last sort
+        self.worker = None  # Running RenameWorker, if any
+        self.job_dir = ""  # Directory the running worker renames into
+        self.job_transfer = None  # Transfer used by the running worker
+        self.watch_worker = None  # Running WatchWorker, if any
+        self.watch_last = ""  # Last rename of the watch, for the status line
+
+        self.fit_to_screen()
+
+    def fit_to_screen(self):
+        """
+        Size the window to its content, at most the screen height less
+        SCREEN_MARGIN (the rest scrolls), and center it.
+        """
+        root = self.root
+        root.update_idletasks()
+        screen_w, screen_h = root.winfo_screenwidth(), root.winfo_screenheight()
+        height = min(self.body.winfo_reqheight(), screen_h - SCREEN_MARGIN)
+        x = max(0, (screen_w - WINDOW_WIDTH) // 2)
+        y = max(0, (screen_h - SCREEN_MARGIN - height) // 2)
+        root.geometry(f"{WINDOW_WIDTH}x{height}+{x}+{y}")
+
+    def scroll_body(self, event, units):
+        """Scroll the main window, unless the pointer is over a text box that scrolls itself."""
+        if isinstance(event.widget, tk.Text):
+            return
+        self.canvas.yview_scroll(units, "units")
+
+    def on_mousewheel(self, event):
+        self.scroll_body(event, -1 if event.delta > 0 else 1)
+
+    def setup_directory_selection(self):
+        """Create input/output directory browse controls."""
+        dir_frame = tk.Frame(self.container)
+        dir_frame.pack(fill="x", pady=(0, 10))
+
+        # Input
+        self.input_dir_label = tk.Label(
+            self.container,
+            text="No input directory selected"
+        )
+        self.input_dir_label.pack(pady=5)
+        tk.Button(
+            self.container,
+            text="Select Input Directory",
+            command=self.select_input_directory,
+            bg="light grey"
+        ).pack(pady=5)
+
+        # Output
+        self.output_dir_label = tk.Label(
+            self.container,
+            text="No output directory selected (rename in place)"
+        )
+        self.output_dir_label.pack(pady=5)
+        tk.Button(
+            self.container,
+            text="Select Output Directory (Optional)",
+            command=self.select_output_directory,
+            bg="light grey"
+        ).pack(pady=5)
+
+        # Copy instead of move (e.g. scratch -> project store on another volume)
+        self.keep_source_var = tk.BooleanVar()
+        tk.Checkbutton(
+            self.container,
+            text="Keep source files (copy to the output directory)",
+            variable=self.keep_source_var
+        ).pack(pady=5)
+
+    def setup_feature_toggles(self):
+        """Create section headers and checkboxes for each feature."""
+        # Replace Section
+        self.replace_var = tk.BooleanVar()
+        replace_frame = tk.LabelFrame(
+            self.container,
+            text="Replace Section",
+            padx  = 10,
+            pady  = 10
+        )
+        replace_frame.pack(fill="x", padx=10, pady=5)
+        tk.Checkbutton(
+            replace_frame,
+            text="Enable",
+            variable=self.replace_var
+        ).pack(anchor="w")
+
+        # We'll populate specific controls in setup_replace_section
+        self.replace_frame = replace_frame
+
+        # Renumber Section
+        self.renumber_var = tk.BooleanVar()
+        renumber_frame = tk.LabelFrame(
+            self.container,
+            text="Renumber Sequence",
+            padx=10,
+            pady=10
+        )
+        renumber_frame.pack(fill="x", padx=10, pady=5)
+        tk.Checkbutton(
+            renumber_frame,
+            text="Enable",
+            variable=self.renumber_var
+        ).pack(anchor="w")
+
+        self.renumber_frame = renumber_frame
+
+        # Padding Section
+        self.padding_var = tk.BooleanVar()
+        padding_frame = tk.LabelFrame(
+            self.container,
+            text="Change Padding",
+            padx=10,
+            pady=10
+        )
+        padding_frame.pack(fill="x", padx=10, pady=5)
+        tk.Checkbutton(
+            padding_frame,
+            text="Enable",
+            variable=self.padding_var
+        ).pack(anchor="w")
+        tk.Label(padding_frame, text="Padding:").pack(anchor="w")
+        self.padding_entry = tk.Entry(padding_frame)
+        self.padding_entry.insert(0, "4")  # Default padding value
+        self.padding_entry.pack(fill="x", pady=2)
+
+        self.padding_frame = padding_frame
+
+        # Extension Section
+        self.ext_var = tk.BooleanVar()
+        ext_frame = tk.LabelFrame(
+            self.container,
+            text="Change Extension",
+            padx=10,
+            pady=10
+        )
+        ext_frame.pack(fill="x", padx=10, pady=5)
+        tk.Checkbutton(
+            ext_frame,
+            text="Enable",
+            variable=self.ext_var
+        ).pack(anchor="w")
+        tk.Label(ext_frame, text="New extension (without dot):").pack(anchor="w")
+        self.ext_entry = tk.Entry(ext_frame)
+        self.ext_entry.insert(0, "exr")
+        self.ext_entry.pack(fill="x", pady=2)
+
+        self.ext_frame = ext_frame
+
+    def setup_replace_section(self):
+        """Create controls for text replace feature."""
+        tk.Label(self.replace_frame, text="Text to replace:").pack(anchor="w")
+        self.find_entry = tk.Entry(self.replace_frame)
+        self.find_entry.pack(fill="x", pady=2)
+
+        tk.Label(self.replace_frame, text="Replace with:").pack(anchor="w")
+        self.replace_entry = tk.Entry(self.replace_frame)
+        self.replace_entry.pack(fill="x", pady=2)
+
+    def setup_renumber_section(self):
+        """Create controls for renumbering sequence."""
+        tk.Label(self.renumber_frame, text="Start number:").pack(anchor="w")
+        self.start_entry = tk.Entry(self.renumber_frame)
+        self.start_entry.insert(0, "1001")  # Default start number
+        self.start_entry.pack(fill="x", pady=2)
+
+        tk.Label(
+            self.renumber_frame,
+            text="(Each frame sequence is renumbered on its own; the existing frame number is replaced)"
+        ).pack(anchor="w")
+
+        self.keep_offsets_var = tk.BooleanVar()
+        tk.Checkbutton(
+            self.renumber_frame,
+            text="Keep frame offsets (missing frames stay missing)",
+            variable=self.keep_offsets_var
+        ).pack(anchor="w")
+
+    def setup_padding_section(self):
+        """Create controls for changing padding."""
+        # Already created in setup_feature_toggles; this method kept for clarity/extension.
+        pass
+
+    def setup_extension_section(self):
+        """Additional configuration for extension changes (already prepared)."""
+        # Already created in setup_feature_toggles; this method kept for clarity/extension.
+        pass
+
+    def setup_rules_section(self):
+        """Create the rule pipeline editor and the preset controls."""
+        self.rules_var = tk.BooleanVar()
+        rules_frame = tk.LabelFrame(
+            self.container,
+            text="Rule Pipeline",
+            padx=10,
+            pady=10
+        )
+        rules_frame.pack(fill="x", padx=10, pady=5)
+        tk.Checkbutton(
+            rules_frame,
+            text="Enable",
+            variable=self.rules_var
+        ).pack(anchor="w")
+        tk.Label(
+            rules_frame,
+            text="One step per line, e.g.  regex: (\\w+)_v(\\d+) => \\2_\\1   case: upper   slice: 0:-2\n"
+                 "template: {prefix}_{mtime:%Y%m%d}.{frame:04d}{ext}   (also {seq_index}, {sep}, {name})",
+            justify="left"
+        ).pack(anchor="w")
+        self.rules_text = tk.Text(rules_frame, height=3, width=60)
+        self.rules_text.pack(fill="x", pady=2)
+
+        preset_frame = tk.Frame(rules_frame)
+        preset_frame.pack(fill="x", pady=(5, 0))
+        tk.Label(preset_frame, text="Preset:").pack(side="left")
+        self.preset_combo = ttk.Combobox(preset_frame, values=list_presets(), width=24)
+        self.preset_combo.pack(side="left", padx=5)
+        tk.Button(preset_frame, text="Load", command=self.load_preset, bg="light grey").pack(side="left", padx=2)
+        tk.Button(preset_frame, text="Save", command=self.save_preset, bg="light grey").pack(side="left", padx=2)
+
+    def load_preset(self):
+        """Fill every section from the preset named in the preset box."""
+        name = self.preset_combo.get().strip()
+        if not name:
+            messagebox.showerror("Error", "Please choose a preset.")
+            return
+        try:
+            options = load_preset(name)
+        except (OSError, ValueError) as err:
+            messagebox.showerror("Error", f"Could not load preset {name}:\n{err}")
+            return
+        self.set_options(options)
+
+    def save_preset(self):
+        """Save the current settings under the name in the preset box."""
+        name = self.preset_combo.get().strip()
+        if not name:
+            messagebox.showerror("Error", "Please type a name for the preset.")
+            return
+        try:
+            save_preset(name, self.read_options())
+        except (OSError, ValueError) as err:
+            messagebox.showerror("Error", f"Could not save preset {name}:\n{err}")
+            return
+        self.preset_combo.config(values=list_presets())
+
+    def set_options(self, options):
+        """Show RenameOptions in the UI (the reverse of read_options)."""
+        def set_entry(entry, value):
+            entry.delete(0, "end")
+            entry.insert(0, str(value))
+
+        self.replace_var.set(options.replace)
+        set_entry(self.find_entry, options.find_text)
+        set_entry(self.replace_entry, options.replace_text)
+        self.renumber_var.set(options.renumber)
+        set_entry(self.start_entry, options.start_number)
+        self.keep_offsets_var.set(options.keep_offsets)
+        self.padding_var.set(options.change_padding)
+        set_entry(self.padding_entry, options.padding)
+        self.ext_var.set(options.change_extension)
+        set_entry(self.ext_entry, options.extension)
+        self.rules_var.set(bool(options.steps))
+        self.rules_text.delete("1.0", "end")
+        self.rules_text.insert("1.0", format_steps(options.steps))
+
+    def setup_action_buttons(self):
+        """Create Preview and Rename buttons."""
+        order_frame = tk.Frame(self.container)
+        order_frame.pack(fill="x", pady=(10, 0))
+        tk.Label(order_frame, text="File order:").pack(side="left")
+        self.order_var = tk.StringVar(value=ORDER_LABELS[DEFAULT_ORDER])
+        tk.OptionMenu(order_frame, self.order_var, *ORDER_LABELS.values()).pack(side="left", padx=5)
+
+        workers_frame = tk.Frame(self.container)
+        workers_frame.pack(fill="x", pady=(10, 0))
+        tk.Label(workers_frame, text="Parallel renames (network shares):").pack(side="left")
+        self.workers_spin = tk.Spinbox(workers_frame, from_=1, to=64, width=5)
+        self.workers_spin.pack(side="left", padx=5)
+
+        btn_frame = tk.Frame(self.container)
+        btn_frame.pack(fill="x", pady=10)
+
+        tk.Button(
+            btn_frame,
+            text="Preview Rename",
+            command=self.preview_renames,
+            bg="light grey"
+        ).pack(side="left", expand=True, padx=5)
+
+        self.rename_button = tk.Button(
+            btn_frame,
+            text="Rename Files",
+            command=self.rename_files,
+            bg="light grey"
+        )
+        self.rename_button.pack(side="left", expand=True, padx=5)
+
+        self.undo_button = tk.Button(
+            btn_frame,
+            text="Undo Last Rename",
+            command=self.undo_last_rename,
+            bg="light grey"
+        )
+        self.undo_button.pack(side="left", expand=True, padx=5)
+
+        self.plan_button = tk.Button(
+            self.container,
+            text="Apply Plan File...",
+            command=self.apply_plan_file,
+            bg="light grey"
+        )
+        self.plan_button.pack(pady=(0, 5))
+
+        self.batch_button = tk.Button(
+            self.container,
+            text="Batch: Rename Every Sub-folder...",
+            command=self.batch_rename,
+            bg="light grey"
+        )
+        self.batch_button.pack(pady=(0, 5))
+
+        self.watch_button = tk.Button(
+            self.container,
+            text="Watch: Rename New Frames as They Arrive",
+            command=self.toggle_watch,
+            bg="light grey"
+        )
+        self.watch_button.pack(pady=(0, 5))
+        self.watch_label = tk.Label(self.container, text="", anchor="w", justify="left")
+        self.watch_label.pack(fill="x")
+
+    def select_input_directory(self):
+        """Open a dialog to select the input directory."""
+        directory = filedialog.askdirectory(title="Select Input Directory")
+        if directory:
+            self.input_dir = os.path.normpath(directory)
+            self.input_dir_label.config(text=f"Input: {self.input_dir}")
+            self.offer_recovery(self.target_directory())
+
+    def select_output_directory(self):
+        """Open a dialog to select the output directory (optional)."""
+        directory = filedialog.askdirectory(title="Select Output Directory")
+        if directory:
+            self.output_dir = os.path.normpath(directory)
+            self.output_dir_label.config(text=f"Output: {self.output_dir}")
+            self.offer_recovery(self.output_dir)
+        else:
+            self.output_dir = ""
+            self.output_dir_label.config(text="No output directory selected (rename in place)")
+
+    def target_directory(self):
+        """Directory the files are renamed into (and where the journal lives)."""
+        return self.output_dir or self.input_dir
+
+    def read_workers(self):
+        """Parallel renames from the UI, or None after showing an error."""
+        try:
+            return max(1, int(self.workers_spin.get()))
+        except ValueError:
+            messagebox.showerror("Error", "Parallel renames must be an integer.")
+            return None
+
+    def read_options(self):
+        """
+        Read every option from the UI once and return a RenameOptions.
+        Numeric fields are only parsed when their section is enabled;
+        raises ValueError with a user-facing message otherwise.
+        """
+        renumber = self.renumber_var.get()
+        change_padding = self.padding_var.get()
+
+        start_number = DEFAULT_START_NUMBER
+        if renumber:
+            try:
+                start_number = int(self.start_entry.get())
+            except ValueError:
+                raise ValueError("Start number must be an integer.")
+
+        padding = DEFAULT_PADDING
+        if change_padding:
+            try:
+                padding = int(self.padding_entry.get())
+            except ValueError:
+                raise ValueError("Padding must be an integer.")
+
+        steps = ()
+        if self.rules_var.get():
+            steps = parse_steps(self.rules_text.get("1.0", "end"))
+
+        return RenameOptions(
+            replace=self.replace_var.get(),
+            find_text=self.find_entry.get(),
+            replace_text=self.replace_entry.get(),
+            renumber=renumber,
+            start_number=start_number,
+            keep_offsets=self.keep_offsets_var.get(),
+            change_padding=change_padding,
+            padding=padding,
+            change_extension=self.ext_var.get(),
+            extension=self.ext_entry.get(),
+            steps=steps
+        )
+
+    def get_scan(self, input_dir, metrics=None):
+        """
+        Return the scan of input_dir, reusing the previous one while the
+        directory is unchanged. Runs on the worker thread. metrics:
+        optional Metrics timing the scan, if one is needed.
+        """
+        scan = self.scan
+        if scan is None or not scan.is_current(input_dir):
+            if metrics is None:
+                scan = scan_directory(input_dir)
+            else:
+                with metrics.phase("scan"):
+                    scan = scan_directory(input_dir)
+                metrics.count_scan(scan)
+            self.scan = scan
+        return scan
+
+    def read_order(self):
+        """File order selected in the UI (one of ordering.ORDERS)."""
+        return next(o for o, label in ORDER_LABELS.items() if label == self.order_var.get())
+
+    def get_ordered(self, scan, order, metrics=None):
+        """
+        Return the parsed files of scan as a SequenceIndex in the given
+        order, reusing the last sort while neither changed. Runs on the
+        worker thread. metrics: optional Metrics timing the sort (parsing
+        included).
+        """
+        ordered = self.ordered
+        if ordered is None or ordered[0] is not scan or ordered[1] != order:
+            if metrics is None:
+                ordered = (scan, order, sort_scan(scan, order))
+            else:
+                with metrics.phase("sort"):
+                    ordered = (scan, order, sort_scan(scan, order))
+            self.ordered = ordered
+        return ordered[2]
+
+    def read_job(self):
+        """
+        Validate the UI state and read everything planning needs, on the
+        Tk thread. Returns a PlanJob, or None after showing an error
+        dialog if something is wrong.
+        """
+        input_dir = self.input_dir
+        if not input_dir or not os.path.isdir(input_dir):
+            messagebox.showerror("Error", "Please select a valid input directory.")
+            return None
+
+        try:
+            options = self.read_options()
+            rules = compile_rules(options)
+        except ValueError as err:
+            messagebox.showerror("Error", str(err))
+            return None
+
+        output_dir = self.output_dir if self.output_dir else self.input_dir
+        return PlanJob(options, rules, input_dir, output_dir, self.read_order())
+
+    def prepare_plan(self, job, metrics=None):
+        """
+        Scan and sort the input directory of job, on the worker thread.
+        Returns (scan, prepared), prepared being the plan_renames arguments
+        (files, rules, input_dir, output_dir, index, entries), or None if
+        the directory has no files.
+        """
+        scan = self.get_scan(job.input_dir, metrics)
+        index = self.get_ordered(scan, job.order, metrics)
+        if not index.names:
+            return None
+        return scan, (index.names, job.rules, job.input_dir, job.output_dir, index, scan.entries)
+
+    def preview_renames(self):
+        """
+        Show a preview of the renaming operations in a separate window.
+        Scanning, sorting and planning run on a worker thread; the preview
+        opens once the plan is ready. Collisions are highlighted and block
+        the Rename button. Does not perform any actual file operations.
+        """
+        if self.is_busy():
+            return
+        job = self.read_job()
+        if job is None:
+            return
+
+        def plan():
+            prepared = self.prepare_plan(job)
+            if prepared is None:
+                return None
+            scan, prepared = prepared
+            return scan, prepared, plan_renames(*prepared)
+
+        self.job_dir = ""
+        self.job_transfer = None
+        self.worker = PlanWorker(plan)
+        self.set_busy(True)
+        self.worker.start()
+        ProgressWindow(self.root, self.worker, functools.partial(self.preview_ready, job),
+                       self.preview_failed, title="Planning Renames")
+
+    def preview_ready(self, job, planned):
+        """Called on the Tk thread with the plan of preview_renames."""
+        cancelled = self.worker.cancelled
+        self.worker = None
+        self.set_busy(False)
+        if cancelled:
+            return
+        if planned is None:
+            messagebox.showwarning("No Files", "The selected directory is empty.")
+            return
+        scan, prepared, ops = planned
+        PlanPreview(
+            self.root,
+            ops,
+            occupied=occupied_paths(scan, job.output_dir),
+            on_apply=lambda ops: self.rename_files((ops, scan, job)),
+            on_export=functools.partial(self.export_plan, prepared=prepared,
+                                        options=job.options, order=job.order)
+        )
+
+    def preview_failed(self, error):
+        """Called on the Tk thread if scanning or planning the preview raised."""
+        self.worker = None
+        self.set_busy(False)
+        messagebox.showerror("Error", f"The preview failed:\n{error}")
+
+    def export_plan(self, ops, prepared, options, order):
+        """
+        Save previewed ops as a plan file, to be reviewed, approved and
+        applied later (Apply Plan File, or mh_rename apply-plan).
+        """
+        path = filedialog.asksaveasfilename(
+            title="Export Plan",
+            defaultextension=PLAN_SUFFIX,
+            filetypes=[("Rename plans", "*" + PLAN_SUFFIX), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            count, digest = write_plan(path, ops, prepared[2], prepared[3], options, order)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not write the plan:\n{e}")
+            return
+        messagebox.showinfo("Plan Exported", f"Saved the plan of {count} files to\n{path}\n\nsha256 {digest}")
+
+    def rename_files(self, previewed=None):
+        """
+        Execute the renaming operations on disk.
+        Scanning, sorting, planning, the collision check and renaming run
+        on a worker thread; progress is shown in a separate window that can
+        cancel the job between files. Nothing is renamed if the plan has
+        collisions.
+        previewed: (ops, scan, job) of the preview window, to rename
+        exactly what it showed; refused if the folder changed since.
+        """
+        if self.is_busy():
+            return
+
+        metrics = Metrics("gui-rename")
+        if previewed is None:
+            previewed_ops = previewed_scan = None
+            job = self.read_job()
+            if job is None:
+                return
+        else:
+            previewed_ops, previewed_scan, job = previewed
+
+        # An interrupted batch has to be resumed or rolled back first
+        if self.offer_recovery(job.output_dir):
+            return
+
+        workers = self.read_workers()
+        if workers is None:
+            return
+
+        keep_source = self.keep_source_var.get()
+        src_key, dst_key = (os.path.normcase(os.path.abspath(d)) for d in (job.input_dir, job.output_dir))
+        if keep_source and src_key == dst_key:
+            messagebox.showerror("Error", "Keeping the source files needs a separate output directory.")
+            return
+
+        # Confirm action
+        proceed = messagebox.askyesno(
+            "Confirm Rename",
+            "Are you sure you want to copy the files?" if keep_source
+            else "Are you sure you want to rename the files?"
+        )
+        if not proceed:
+            return
+
+        output_dir = job.output_dir
+        if not os.path.isdir(output_dir):
+            try:
+                os.makedirs(output_dir, exist_ok=True)
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not create output directory:\n{e}")
+                return
+
+        def plan():
+            if previewed_ops is None:
+                prepared = self.prepare_plan(job, metrics)
+                if prepared is None:
+                    raise ValueError("The selected directory is empty.")
+                scan, prepared = prepared
+                with metrics.phase("plan"):
+                    ops = plan_renames(*prepared)
+            else:
+                scan, ops = previewed_scan, previewed_ops
+                if not scan.is_current(job.input_dir):
+                    raise ValueError("The input folder changed since the preview. Please preview again.")
+            metrics.count("files_planned", len(ops))
+            with metrics.phase("check"):
+                execution = build_execution_plan(ops, occupied_paths(scan, output_dir), workers)
+            return execution, Journal(journal_path(output_dir), keep_source=keep_source)
+
+        metrics.info["directory"] = job.input_dir
+        self.start_worker(plan, workers, output_dir, Transfer(keep_source=keep_source), metrics)
+
+    def apply_plan_file(self):
+        """
+        Apply a plan file exactly as it was written. Reading it and checking
+        that no source changed since run on the worker thread; a damaged,
+        modified or stale plan renames nothing.
+        """
+        if self.is_busy():
+            return
+        path = filedialog.askopenfilename(
+            title="Apply Plan File",
+            filetypes=[("Rename plans", "*" + PLAN_SUFFIX), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            plan_file = PlanFile(path)
+        except (OSError, PlanFileError) as e:
+            messagebox.showerror("Error", f"Could not read the plan:\n{e}")
+            return
+
+        output_dir = plan_file.output_dir
+        if self.offer_recovery(output_dir):
+            return
+        workers = self.read_workers()
+        if workers is None:
+            return
+        if not messagebox.askyesno("Confirm Rename", f"Apply this plan?\n\n{plan_file.describe()}"):
+            return
+        if not os.path.isdir(output_dir):
+            try:
+                os.makedirs(output_dir, exist_ok=True)
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not create output directory:\n{e}")
+                return
+
+        metrics = Metrics("gui-apply-plan", plan=os.path.abspath(path), directory=plan_file.input_dir)
+
+        def plan():
+            with metrics.phase("read"):
+                ops = read_plan(plan_file)
+            metrics.count("files_planned", len(ops))
+            with metrics.phase("check"):
+                execution = build_execution_plan(ops, occupied_on_disk(ops), workers)
+            return execution, Journal(journal_path(output_dir))
+
+        self.start_worker(plan, workers, output_dir, Transfer(), metrics)
+
+    def batch_rename(self):
+        """
+        Apply the current options to every sub-folder of a root directory.
+        Folders are planned in parallel processes and renamed on a worker
+        thread; a folder with collisions is skipped and listed in the
+        report. With an output directory set, the folder tree is mirrored
+        there. Parallel renames above 1 override the per-filesystem default.
+        """
+        if self.is_busy():
+            return
+        root_dir = filedialog.askdirectory(title="Select Root Directory (every sub-folder is renamed)")
+        if not root_dir:
+            return
+        root_dir = os.path.normpath(root_dir)
+        include = simpledialog.askstring(
+            "Batch Rename",
+            "Only folders matching (comma separated, e.g. sh*; empty for all):",
+            parent=self.root
+        )
+        if include is None:
+            return
+        include = [p.strip() for p in include.split(",") if p.strip()]
+
+        try:
+            rules = compile_rules(self.read_options())
+        except ValueError as err:
+            messagebox.showerror("Error", str(err))
+            return
+        workers = self.read_workers()
+        if workers is None:
+            return
+        keep_source = self.keep_source_var.get()
+        output_root = self.output_dir or None
+        if keep_source and not output_root:
+            messagebox.showerror("Error", "Keeping the source files needs a separate output directory.")
+            return
+        if not messagebox.askyesno(
+            "Confirm Batch Rename",
+            f"{'Copy' if keep_source else 'Rename'} the files in every matching folder under\n{root_dir}?"
+        ):
+            return
+
+        order = self.read_order()
+        transfer = Transfer(keep_source=keep_source)
+
+        def plan():
+            jobs = jobs_from_root(root_dir, output_root, include)
+            return list(plan_batch(jobs, rules, order=order, workers=workers if workers > 1 else None))
+
+        apply = functools.partial(apply_batch, rename=transfer, root=root_dir)
+        self.run_worker(BatchWorker(plan, apply, Metrics("gui-batch", root=root_dir)), "", transfer)
+
+    def toggle_watch(self):
+        """
+        Start watching the input directory, or stop the running watch.
+        While watching, every new file is renamed with the current options
+        once it has stopped growing; the renderer can keep writing.
+        """
+        if self.watch_worker is not None:
+            self.watch_worker.cancel()
+            self.watch_button.config(text="Stopping...", state="disabled")
+            return
+        if self.is_busy():
+            return
+        input_dir = self.input_dir
+        if not input_dir or not os.path.isdir(input_dir):
+            messagebox.showerror("Error", "Please select a valid input directory.")
+            return
+        try:
+            rules = compile_rules(self.read_options())
+        except ValueError as err:
+            messagebox.showerror("Error", str(err))
+            return
+        output_dir = self.target_directory()
+        if self.offer_recovery(output_dir):
+            return
+        workers = self.read_workers()
+        if workers is None:
+            return
+        keep_source = self.keep_source_var.get()
+        if keep_source and not self.output_dir:
+            messagebox.showerror("Error", "Keeping the source files needs a separate output directory.")
+            return
+
+        first_frame = None
+        if rules.renumber:
+            answer = simpledialog.askstring(
+                "Watch",
+                "Frame that gets the start number (empty: the first frame that arrives;\n"
+                "lower frames finishing later are then left unrenamed):",
+                parent=self.root
+            )
+            if answer is None:
+                return
+            if answer.strip():
+                try:
+                    first_frame = int(answer)
+                except ValueError:
+                    messagebox.showerror("Error", "The first frame must be an integer.")
+                    return
+        existing = messagebox.askyesnocancel(
+            "Watch",
+            f"Watch {input_dir} and rename every new file?\n\n"
+            "Yes: also rename the files already there\n"
+            "No: only new files"
+        )
+        if existing is None:
+            return
+
+        watcher = Watcher(input_dir, rules, output_dir, existing=existing, first_frame=first_frame,
+                          rename=Transfer(keep_source=keep_source), workers=workers,
+                          metrics=Metrics("gui-watch"))
+        try:
+            watcher.start()
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not watch the directory:\n{e}")
+            return
+        self.watch_worker = WatchWorker(watcher)
+        self.watch_worker.start()
+        self.watch_last = ""
+        self.set_busy(True)
+        self.watch_button.config(text="Stop Watching")
+        self.watch_label.config(text=f"Watching {input_dir} ({watcher.method})...")
+        self.root.after(WATCH_POLL_MS, self.poll_watch)
+
+    def poll_watch(self):
+        """Show what the watch did since the last call (runs on the Tk thread)."""
+        worker = self.watch_worker
+        watcher = worker.watcher
+        while True:
+            try:
+                event = worker.events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == WATCHED:
+                batch = event[1]
+                if batch.renamed:
+                    op = batch.renamed[-1]
+                    self.watch_last = f"{op.src_name} -> {op.dst_name}"
+                if batch.failed or batch.skipped:
+                    messagebox.showwarning("Watch", "\n".join(batch.lines()[-20:]))
+            elif event[0] == ERROR:
+                messagebox.showerror("Error", f"Watching stopped:\n{event[1]}")
+            elif event[0] == FINISHED:
+                self.watch_finished()
+                return
+        status = (f"Watching {watcher.directory} ({watcher.method}): {watcher.renamed} renamed, "
+                  f"{watcher.failed} failed, {watcher.skipped} skipped")
+        if self.watch_last:
+            status += f"\nLast: {self.watch_last}"
+        self.watch_label.config(text=status)
+        self.root.after(WATCH_POLL_MS, self.poll_watch)
+
+    def watch_finished(self):
+        """Called on the Tk thread once the watch has stopped."""
+        watcher = self.watch_worker.watcher
+        self.watch_worker = None
+        self.scan = None
+        self.set_busy(False)
+        self.watch_button.config(text="Watch: Rename New Frames as They Arrive", state="normal")
+        lines = self.finish_metrics(watcher.metrics, watcher.rename, not watcher.failed)
+        self.watch_label.config(
+            text="\n".join([f"Stopped watching: {watcher.renamed} renamed, {watcher.failed} failed, "
+                            f"{watcher.skipped} skipped"] + lines)
+        )
+
+    def is_busy(self):
+        """True (after warning the user) if a rename or a watch is still running."""
+        if self.worker is not None and self.worker.is_alive():
+            messagebox.showwarning("Busy", "A rename is already running.")
+            return True
+        if self.watch_worker is not None:
+            messagebox.showwarning("Busy", "A folder is being watched; stop watching first.")
+            return True
+        return False
+
+    def set_busy(self, busy):
+        """Disable the buttons that start a job while one runs, or enable them again."""
+        state = "disabled" if busy else "normal"
+        for button in (self.rename_button, self.undo_button, self.batch_button, self.plan_button):
+            button.config(state=state)
+
+    def start_worker(self, plan, workers, directory, rename, metrics=None):
+        """
+        Run plan() -> (ExecutionPlan, Journal) on the worker thread,
+        moving each file with rename (a Transfer, or discard_copy).
+        """
+        metrics = metrics if metrics is not None else Metrics("gui-recover", directory=directory)
+        self.run_worker(RenameWorker(plan, rename, workers=workers, metrics=metrics), directory, rename)
+
+    def run_worker(self, worker, directory, rename):
+        """
+        Start worker with a progress window. directory: where the job
+        writes its journal (offered for recovery if it fails), or "".
+        """
+        self.job_dir = directory
+        self.job_transfer = rename if isinstance(rename, Transfer) else None
+        self.worker = worker
+        self.set_busy(True)
+        self.worker.start()
+        ProgressWindow(self.root, self.worker, self.rename_finished, self.rename_failed)
+
+    def offer_recovery(self, directory):
+        """
+        If directory holds the journal of an interrupted batch, ask whether
+        to resume or roll it back. Returns True if the batch still needs
+        attention (a recovery was started or the user chose to wait).
+        """
+        if not directory or not os.path.isdir(directory):
+            return False
+        try:
+            state = load_journal(directory)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Error", f"Could not read the rename journal:\n{e}")
+            return True
+        if state is None or not state.needs_recovery:
+            return False
+        if self.worker is not None and self.worker.is_alive():
+            return True
+
+        answer = messagebox.askyesnocancel(
+            "Interrupted Rename",
+            f"{state.describe()}\n\n"
+            "Yes: finish the remaining renames\n"
+            "No: roll back to the original names\n"
+            "Cancel: decide later"
+        )
+        if answer is None:
+            return True
+        workers = self.read_workers()
+        if workers is None:
+            return True
+        rollback = not answer
+        self.start_worker(lambda: recovery_plan(state, rollback, workers), workers, directory,
+                          recovery_transfer(state, rollback))
+        return True
+
+    def undo_last_rename(self):
+        """Rename the last batch in the target directory back, from its journal."""
+        if self.is_busy():
+            return
+        directory = self.target_directory()
+        if not directory:
+            messagebox.showerror("Error", "Please select an input directory.")
+            return
+        try:
+            state = load_journal(directory)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Error", f"Could not read the rename journal:\n{e}")
+            return
+        if state is None or state.status == ROLLED_BACK:
+            messagebox.showinfo("Undo", "There is no rename to undo in this directory.")
+            return
+        if state.needs_recovery:
+            self.offer_recovery(directory)
+            return
+
+        workers = self.read_workers()
+        if workers is None:
+            return
+        if not messagebox.askyesno("Confirm Undo", f"Undo the last rename of {state.count} files?"):
+            return
+        self.start_worker(lambda: recovery_plan(state, True, workers), workers, directory,
+                          recovery_transfer(state, True))
+
+    def finish_metrics(self, metrics, rename, ok):
+        """
+        Close the metrics of a finished job and send them to $MH_RENAME_METRICS
+        if it is set. Returns the summary lines to show.
+        """
+        if isinstance(rename, Transfer):
+            metrics.add_transfer(rename)
+        metrics.ok = ok
+        lines = [""] + metrics.lines()
+        try:
+            send_record(metrics.record())
+        except (OSError, ValueError) as e:
+            lines.append(f"Metrics not sent: {e}")
+        return lines
+
+    def rename_finished(self, result):
+        """Called on the Tk thread once the worker has finished."""
+        metrics = self.worker.metrics
+        self.worker = None
+        self.scan = None
+        self.set_busy(False)
+        report = [result.report()]
+        if self.job_transfer is not None:
+            report += self.job_transfer.lines()
+        report = "\n".join(report + self.finish_metrics(metrics, self.job_transfer, result.ok))
+        if result.ok:
+            messagebox.showinfo("Done", report)
+        else:
+            messagebox.showwarning("Rename Incomplete", report)
+            self.offer_recovery(self.job_dir)
+
+    def rename_failed(self, error):
+        """Called on the Tk thread if planning or renaming raised on the worker."""
+        self.finish_metrics(self.worker.metrics, None, False)
+        self.worker = None
+        self.set_busy(False)
+        messagebox.showerror("Error", f"The rename failed:\n{error}")
+        self.offer_recovery(self.job_dir)
+
+def main():
+    """Application entry point (no splash, no custom icon)."""
+    root = tk.Tk()
+    FileRenamerGUI(root)  # Sizes and centers the window
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+mh_tools - Rename Journal
+-------------------------
+Append-only JSONL journal written next to the renamed files, so a batch
+that dies halfway (crash, dropped share) can be resumed or rolled back,
+and a finished batch can be undone.
+
+Records, one JSON object per line:
+
+    {"t": "begin", "version": 1, "input_dir": ..., "output_dir": ..., "count": n,
+     "keep_source": false}
+    {"t": "prior", "ops": [src, dst, src, dst, ...]}    done by an earlier run
+    {"t": "temp", "ops": [src, dst, ...]}               phase 1 parking moves
+    {"t": "chains", "ops": [src, dst, ...], "lens": [chain length, ...]}
+    {"t": "phase", "n": 2}
+    {"t": "done", "i": [op index, ...]}
+    {"t": "fail", "i": op index, "e": message}
+    {"t": "end", "status": "complete" | "cancelled" | "failed" | "rolled_back"}
+
+All intents are written in large blocks and fsynced once before the
+first rename; completions are group-committed (one fsync per
+GROUP_SIZE ops or GROUP_INTERVAL seconds), not one fsync per file.
+Paths are stored relative to input_dir/output_dir where possible, in
+flat lists that encode several times faster than nested pairs.
+
+Whatever was not yet committed when a run died is recovered from the
+filesystem: ops inside a chain run in order, so the first op whose
+destination does not exist marks where the chain stopped.
+"""
+
+import bisect
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from operator import add, eq, itemgetter
+
+from mh_rename.collisions import build_execution_plan, is_temp_move
+from mh_rename.planner import RenameOp
+from mh_rename.transfer import Transfer, discard_copy
+
+JOURNAL_NAME = ".mh_rename_journal.jsonl"
+JOURNAL_VERSION = 1
+
+COMPLETE = "complete"
+CANCELLED = "cancelled"
+FAILED = "failed"
+ROLLED_BACK = "rolled_back"
+
+
+def journal_path(directory):
+    """Location of the journal for renames into directory."""
+    return os.path.join(directory, JOURNAL_NAME)
+
+
+def _encode_column(ops, name_field, path_field, prefix):
+    """Names of one side of ops, or absolute paths where not under prefix."""
+    names = list(map(itemgetter(name_field), ops))
+    paths = list(map(itemgetter(path_field), ops))
+    # Whole-column compare at C speed; the per-op loop only runs for a
+    # column that mixes directories (e.g. parking moves into the input dir)
+    if not all(map(eq, paths, map(add, itertools.repeat(prefix), names))):
+        abspath = os.path.abspath
+        names = [name if path == prefix + name else abspath(path)
+                 for name, path in zip(names, paths)]
+    return names
+
+
+def _encode(ops, src_prefix, dst_prefix):
+    """Flat [src, dst, src, dst, ...] list for a journal record."""
+    flat = [None] * (2 * len(ops))
+    flat[0::2] = _encode_column(ops, 0, 2, src_prefix)
+    flat[1::2] = _encode_column(ops, 1, 3, dst_prefix)
+    return flat
+
+
+def _fsync_directory(directory):
+    """Make a rename inside directory durable (no-op where unsupported)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """
+    Journal writer, driven by executor.apply_plan.
+    begin(plan) -> record(index, err) for every op -> phase(2) -> end(result).
+    """
+    BLOCK_SIZE = 10000      # Ops per intent record
+    GROUP_SIZE = 4096       # Completions per fsync
+    GROUP_INTERVAL = 0.5    # ...or at least this often, in seconds
+
+    def __init__(self, path, prior=(), keep_source=False):
+        """
+        prior: ops an earlier, interrupted run of the same batch already
+        completed; recorded so the whole batch can still be undone.
+        keep_source: the batch copies instead of moving (transfer.Transfer).
+        """
+        self.path = path
+        self.prior = list(prior)
+        self.keep_source = keep_source
+        self.lock = threading.Lock()
+        self._file = None
+        self._done = deque()
+        self._last_commit = 0.0
+        self.fsyncs = 0  # For metrics; updated under the lock
+
+    def begin(self, plan):
+        """Write every intent of the ExecutionPlan and make it durable."""
+        if plan.chains:
+            first = plan.chains[0][0]
+        else:
+            first = next(iter(plan.temp_moves or self.prior), None)
+        input_dir = os.path.dirname(first.src) if first else ""
+        output_dir = os.path.dirname(first.dst) if first else ""
+        src_prefix = os.path.join(input_dir, "")
+        dst_prefix = os.path.join(output_dir, "")
+
+        def write(record):
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+        # Written under a temporary name, so an older journal survives until
+        # the new one is complete
+        new_path = self.path + ".new"
+        with open(new_path, "w", encoding="utf-8") as f:
+            write({
+                "t": "begin",
+                "version": JOURNAL_VERSION,
+                "created": time.time(),
+                "input_dir": os.path.abspath(input_dir),
+                "output_dir": os.path.abspath(output_dir),
+                # Files of the whole batch: those an earlier run moved, too
+                "count": plan.file_count + sum(1 for op in self.prior if not is_temp_move(op)),
+                "keep_source": self.keep_source,
+            })
+
+            for kind, ops in (("prior", self.prior), ("temp", plan.temp_moves)):
+                for start in range(0, len(ops), self.BLOCK_SIZE):
+                    block = ops[start:start + self.BLOCK_SIZE]
+                    write({"t": kind, "ops": _encode(block, src_prefix, dst_prefix)})
+
+            # Blocks of whole chains holding about BLOCK_SIZE ops each
+            chains = plan.chains
+            lens = list(map(len, chains))
+            ends = list(itertools.accumulate(lens))
+            start = 0
+            while start < len(chains):
+                offset = ends[start - 1] if start else 0
+                end = bisect.bisect_left(ends, offset + self.BLOCK_SIZE, start) + 1
+                block = list(itertools.chain.from_iterable(chains[start:end]))
+                write({
+                    "t": "chains",
+                    "ops": _encode(block, src_prefix, dst_prefix),
+                    "lens": lens[start:end],
+                })
+                start = end
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(new_path, self.path)
+        _fsync_directory(os.path.dirname(self.path) or ".")
+        self.fsyncs += 2
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._last_commit = time.monotonic()
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + "\n")
+
+    def _write_done(self):
+        # popleft, not swapping the deque: record() appends without the lock
+        done = self._done
+        if done:
+            popleft = done.popleft
+            self._write({"t": "done", "i": [popleft() for _ in range(len(done))]})
+
+    def _commit(self):
+        self._write_done()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsyncs += 1
+        self._last_commit = time.monotonic()
+
+    def record(self, index, err=None):
+        """
+        Note the outcome of op number index (in ExecutionPlan iteration
+        order); fsyncs once per group.
+        """
+        if err is None:
+            # Hot path, once per file: deque.append is atomic, no lock needed
+            done = self._done
+            done.append(index)
+            if (
+                len(done) < self.GROUP_SIZE
+                and time.monotonic() - self._last_commit < self.GROUP_INTERVAL
+            ):
+                return
+        with self.lock:
+            if err is not None:
+                # Keep completion order: flush earlier completions first
+                self._write_done()
+                self._write({"t": "fail", "i": index, "e": str(err)})
+            if (
+                len(self._done) >= self.GROUP_SIZE
+                or time.monotonic() - self._last_commit >= self.GROUP_INTERVAL
+            ):
+                self._commit()
+
+    def phase(self, number):
+        """Mark the start of an execution phase (durable)."""
+        with self.lock:
+            self._write_done()
+            self._write({"t": "phase", "n": number})
+            self._commit()
+
+    def end(self, result):
+        """Write the final status and close the journal."""
+        if result.rolled_back:
+            status = ROLLED_BACK
+        elif result.cancelled:
+            status = CANCELLED
+        elif result.failed:
+            status = FAILED
+        else:
+            status = COMPLETE
+        with self.lock:
+            # Completions still pending go first: nothing follows the end record
+            self._write_done()
+            self._write({"t": "end", "status": status})
+            self._commit()
+            self._file.close()
+            self._file = None
+
+
+class JournalState:
+    """
+    Parsed journal plus the state of each op, recovered from the journal
+    and, for anything not yet committed, from the filesystem.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header = {}
+        self.prior = []
+        self.temp_moves = []
+        self.chains = []
+        self.done = set()
+        self.failed = {}
+        self.phase2 = False
+        self.status = None
+        self._load()
+
+    def _load(self):
+        def decode(flat):
+            join, isabs, basename = os.path.join, os.path.isabs, os.path.basename
+            input_dir, output_dir = self.header["input_dir"], self.header["output_dir"]
+            ops = []
+            for k in range(0, len(flat), 2):
+                src, dst = flat[k], flat[k + 1]
+                src = src if isabs(src) else join(input_dir, src)
+                dst = dst if isabs(dst) else join(output_dir, dst)
+                ops.append(RenameOp(basename(src), basename(dst), src, dst))
+            return ops
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn last line from a crash
+                kind = record.get("t")
+                if kind == "begin":
+                    self.header = record
+                elif kind == "prior":
+                    self.prior.extend(decode(record["ops"]))
+                elif kind == "temp":
+                    self.temp_moves.extend(decode(record["ops"]))
+                elif kind == "chains":
+                    ops = decode(record["ops"])
+                    start = 0
+                    for length in record["lens"]:
+                        self.chains.append(ops[start:start + length])
+                        start += length
+                elif kind == "phase" and record["n"] == 2:
+                    self.phase2 = True
+                elif kind == "done":
+                    self.done.update(record["i"])
+                elif kind == "fail":
+                    self.failed[record["i"]] = record["e"]
+                elif kind == "end":
+                    self.status = record["status"]
+
+    @property
+    def count(self):
+        return self.header.get("count", 0)
+
+    @property
+    def keep_source(self):
+        """True for a copy-mode batch: the sources were left in place."""
+        return self.header.get("keep_source", False)
+
+    @property
+    def needs_recovery(self):
+        """True if the journal describes a batch that did not finish cleanly."""
+        return self.status not in (COMPLETE, ROLLED_BACK)
+
+    def describe(self):
+        status = self.status or "interrupted"
+        action = "Copy" if self.keep_source else "Rename"
+        return (f"{action} of {self.count} files into {self.header.get('output_dir', '?')}: "
+                f"{status}")
+
+    def _chain_done(self):
+        """Per chain, a flag for every op telling whether it happened."""
+        lexists = os.path.lexists
+        chain_done = []
+        index = len(self.temp_moves)
+        for chain in self.chains:
+            flags = [False] * len(chain)
+            if self.phase2:
+                for k, op in enumerate(chain):
+                    i = index + k
+                    if i in self.failed:
+                        break
+                    if i in self.done or lexists(op.dst):
+                        # A chain runs in order: an existing destination means
+                        # the op ran, even if it was not committed yet; the
+                        # first missing one is where the chain stopped
+                        flags[k] = True
+                    else:
+                        break
+            chain_done.append(flags)
+            index += len(chain)
+        return chain_done
+
+    def net_moves(self):
+        """
+        Net effect of the batch so far, including any run it resumed.
+        Returns (moves, parked): whole-file src -> dst renames that
+        happened, and parking moves whose file still sits under its
+        temporary name.
+        """
+        # Temporary names are unique, so the filesystem tells which are parked
+        parking = {op.dst: op for op in self.prior if is_temp_move(op)}
+        parking.update((op.dst, op) for op in self.temp_moves)
+
+        def from_origin(op):
+            # A file may have been parked more than once across resumed runs
+            origin = parking.get(op.src)
+            while origin is not None:
+                op = RenameOp(origin.src_name, op.dst_name, origin.src, op.dst)
+                origin = parking.get(op.src)
+            return op
+
+        moves = [op for op in self.prior if not is_temp_move(op)]
+        for chain, flags in zip(self.chains, self._chain_done()):
+            moves.extend(from_origin(op) for op, done in zip(chain, flags) if done)
+        parked = [from_origin(op) for op in parking.values() if os.path.lexists(op.dst)]
+        return moves, parked
+
+    def remaining_ops(self):
+        """Ops still needed to finish the batch, as one plain plan."""
+        parking = {op.dst: op for op in self.temp_moves}
+        ops = []
+        for chain, flags in zip(self.chains, self._chain_done()):
+            for op, done in zip(chain, flags):
+                if done:
+                    continue
+                origin = parking.get(op.src)
+                if origin is not None and not os.path.lexists(op.src):
+                    # File was never parked: move it straight from its origin
+                    op = RenameOp(origin.src_name, op.dst_name, origin.src, op.dst)
+                ops.append(op)
+        return ops
+
+    def rollback_ops(self):
+        """Ops that put every renamed file back where it came from."""
+        moves, parked = self.net_moves()
+        return [RenameOp(op.dst_name, op.src_name, op.dst, op.src) for op in moves + parked]
+
+
+def load_journal(directory):
+    """Return the JournalState for directory, or None if there is none."""
+    path = journal_path(directory)
+    if not os.path.isfile(path):
+        return None
+    return JournalState(path)
+
+
+def occupied_on_disk(ops):
+    """Destinations of ops that currently exist (check_plan drops sources)."""
+    return [op.dst for op in ops if os.path.lexists(op.dst)]
+
+
+def recovery_plan(state, rollback=False, workers=1):
+    """
+    Plan that resumes (or rolls back) the batch in state.
+    Returns (ExecutionPlan, Journal): the journal for the recovery run
+    replaces the old one and carries the progress made so far, so a later
+    undo still covers the whole batch. Run it with recovery_transfer().
+    Rolling back a copy only removes the copies that still exist, so it
+    needs no journal of its own (None) and can simply be run again.
+    Raises CollisionError if the disk no longer matches the journal.
+    """
+    if rollback and state.keep_source:
+        # The originals are the destinations here and still exist
+        ops = [op for op in state.rollback_ops() if os.path.lexists(op.src)]
+        return build_execution_plan(ops, (), workers), None
+    if rollback:
+        ops = state.rollback_ops()
+        journal = Journal(state.path)
+    else:
+        ops = state.remaining_ops()
+        moves, parked = state.net_moves()
+        journal = Journal(state.path, prior=moves + parked, keep_source=state.keep_source)
+    return build_execution_plan(ops, occupied_on_disk(ops), workers), journal
+
+
+def recovery_transfer(state, rollback=False):
+    """The rename callable to run recovery_plan(state, rollback) with."""
+    if rollback and state.keep_source:
+        return discard_copy
+    return Transfer(keep_source=state.keep_source and not rollback)
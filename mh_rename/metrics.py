@@ -0,0 +1,290 @@
+"""
+mh_tools - Run Metrics
+----------------------
+Timings and counters of one run (apply, batch, watch, ...), cheap enough
+to be always on:
+
+    phases    wall seconds per phase: scan, parse, sort, plan, read (of a
+              plan file), check, execute
+    counters  system calls and events: files listed, renames, retries, fsyncs
+    errors    failed files per errno name (ENOENT, EACCES, ...)
+    latency   per-file time of the execute phase, as a histogram of
+              power-of-two microsecond buckets
+    transfer  files, bytes and seconds per transfer strategy
+
+A run ends with record(), one JSON-able dict. send_record() appends it
+as a JSON line to a file or sends it to a local socket, for dashboards:
+
+    /var/log/mh_rename.jsonl     file, one record per line
+    tcp://127.0.0.1:8094         TCP, one line per connection
+    udp://127.0.0.1:8094         UDP, one datagram per record
+    unix:/run/metrics.sock       Unix stream socket
+
+lines() is the same for people. profiled() wraps a run in cProfile.
+"""
+
+import contextlib
+import cProfile
+import errno
+import json
+import math
+import os
+import socket
+import threading
+import time
+
+METRICS_VERSION = 1
+METRICS_ENV = "MH_RENAME_METRICS"  # Default target of send_record
+SEND_TIMEOUT = 2.0                 # Seconds before a socket target is given up
+
+# Phases in the order a run goes through them, for display
+PHASE_ORDER = ("scan", "parse", "sort", "plan", "read", "check", "journal", "execute")
+
+
+class Histogram:
+    """
+    Durations in power-of-two microsecond buckets: bucket k counts the
+    durations of at most 2**k us (bucket 0: up to 1 us). add() does not
+    lock; callers that share one between threads hold their own lock.
+    """
+    BUCKETS = 40  # 2**39 us is about six days
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        micros = math.ceil(seconds * 1e6)
+        k = (micros - 1).bit_length() if micros > 1 else 0
+        self.counts[min(k, self.BUCKETS - 1)] += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, fraction):
+        """Upper bound in seconds of the bucket holding the given fraction, or 0.0."""
+        rank = fraction * self.count
+        seen = 0
+        for k, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(2 ** k / 1e6, self.max)
+        return 0.0
+
+    def record(self):
+        count = self.count
+        return {
+            "count": count,
+            "mean_us": round(self.total / count * 1e6, 1) if count else 0.0,
+            "p50_us": round(self.percentile(0.50) * 1e6, 1),
+            "p90_us": round(self.percentile(0.90) * 1e6, 1),
+            "p99_us": round(self.percentile(0.99) * 1e6, 1),
+            "max_us": round(self.max * 1e6, 1),
+            # [upper bound in us, count] of every bucket in use
+            "buckets": [[2 ** k, n] for k, n in enumerate(self.counts) if n],
+        }
+
+
+class Metrics:
+    """
+    Metrics of one run. Safe to update from several threads; picklable,
+    so batch planning processes can send theirs back to be merged.
+    command: what ran ("apply", "batch-apply", ...); info: extra fields
+    for the record, e.g. directory=...
+    """
+
+    def __init__(self, command, **info):
+        self.command = command
+        self.info = info
+        self.started = time.time()
+        self._clock = time.perf_counter()
+        self.phases = {}
+        self.counters = {}
+        self.errors = {}
+        self.latency = Histogram()
+        self.transfer = {}
+        self.ok = None
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time the with-block as (part of) phase name."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def count_scan(self, scan):
+        """Count the directory listing of a scan.ScanResult."""
+        self.count("scandir_calls")
+        self.count("entries_listed", len(scan) + len(scan.others))
+
+    def error(self, err):
+        """Count a failed file by its errno name (or exception type)."""
+        name = errno.errorcode.get(getattr(err, "errno", None)) or type(err).__name__
+        with self.lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def add_latency(self, histogram):
+        with self.lock:
+            self.latency.merge(histogram)
+
+    def add_transfer(self, transfer):
+        """Per-strategy files, bytes and seconds of a transfer.Transfer."""
+        with transfer.lock:
+            counts = dict(transfer.counts)
+            seconds = dict(transfer.seconds)
+            size = transfer.bytes
+        with self.lock:
+            for strategy, n in counts.items():
+                entry = self.transfer.setdefault(strategy, {"files": 0, "seconds": 0.0})
+                entry["files"] += n
+                entry["seconds"] += seconds.get(strategy, 0.0)
+            self.counters["bytes_copied"] = self.counters.get("bytes_copied", 0) + size
+
+    def merge(self, other):
+        """Add another run's phases, counters, errors and latencies (e.g. one batch directory)."""
+        with self.lock:
+            for mine, theirs in ((self.phases, other.phases), (self.counters, other.counters),
+                                 (self.errors, other.errors)):
+                for key, value in theirs.items():
+                    mine[key] = mine.get(key, 0) + value
+            self.latency.merge(other.latency)
+            for strategy, entry in other.transfer.items():
+                total = self.transfer.setdefault(strategy, {"files": 0, "seconds": 0.0})
+                total["files"] += entry["files"]
+                total["seconds"] += entry["seconds"]
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self._clock
+
+    def record(self):
+        """The run as one JSON-able dict."""
+        with self.lock:
+            return {
+                "version": METRICS_VERSION,
+                "command": self.command,
+                "started": self.started,
+                "host": socket.gethostname(),
+                "pid": os.getpid(),
+                "ok": self.ok,
+                "wall_s": round(self.elapsed, 6),
+                **self.info,
+                "phases_s": {name: round(s, 6) for name, s in self.phases.items()},
+                "counters": dict(self.counters),
+                "errors": dict(self.errors),
+                "latency": self.latency.record(),
+                "transfer": {name: {"files": e["files"], "seconds": round(e["seconds"], 6)}
+                             for name, e in self.transfer.items()},
+            }
+
+    def lines(self):
+        """User-facing summary: time per phase, then latency and counters."""
+        with self.lock:
+            phases = dict(self.phases)
+            counters = dict(self.counters)
+            errors = dict(self.errors)
+        ordered = [p for p in PHASE_ORDER if p in phases] + sorted(set(phases) - set(PHASE_ORDER))
+        rows = [f"Time: {self.elapsed:.3f} s in total"]
+        rows += [f"  {name:<10} {phases[name]:9.3f} s" for name in ordered]
+        latency = self.latency
+        if latency.count:
+            rows.append(
+                f"Per file: mean {latency.total / latency.count * 1e6:.0f} us, "
+                f"p50 {_us(latency.percentile(0.5))}, p99 {_us(latency.percentile(0.99))}, "
+                f"max {_us(latency.max)}"
+            )
+        if counters:
+            rows.append("Counts: " + ", ".join(f"{k} {v}" for k, v in sorted(counters.items())))
+        if errors:
+            rows.append("Errors: " + ", ".join(f"{k} {v}" for k, v in sorted(errors.items())))
+        return rows
+
+
+def _us(seconds):
+    """Short duration for people: 850 us, 12.5 ms, 2.1 s."""
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f} ms"
+    return f"{seconds:.1f} s"
+
+
+def send_record(record, target=None):
+    """
+    Write record as one JSON line to target (see the module docstring);
+    target None uses $MH_RENAME_METRICS and does nothing if it is unset.
+    Raises OSError if the target cannot be written.
+    """
+    target = target or os.environ.get(METRICS_ENV)
+    if not target:
+        return
+    line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+    scheme, sep, address = target.partition("://")
+    if sep and scheme in ("tcp", "udp"):
+        host, _, port = address.rpartition(":")
+        host = host.strip("[]") or "127.0.0.1"
+        if scheme == "tcp":
+            with socket.create_connection((host, int(port)), timeout=SEND_TIMEOUT) as sock:
+                sock.sendall(line)
+        else:
+            family = socket.getaddrinfo(host, int(port), type=socket.SOCK_DGRAM)[0][0]
+            with socket.socket(family, socket.SOCK_DGRAM) as sock:
+                sock.sendto(line, (host, int(port)))
+    elif target.startswith("unix:"):
+        path = target[len("unix:"):]
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(SEND_TIMEOUT)
+            sock.connect(path)
+            sock.sendall(line)
+    else:
+        with open(target, "ab") as f:
+            f.write(line)
+
+
+@contextlib.contextmanager
+def profiled(path=None):
+    """
+    Run the with-block under cProfile and write the stats to path
+    (read with python -m pstats or snakeviz). Only the calling thread is
+    profiled. A no-op without a path.
+    """
+    if not path:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
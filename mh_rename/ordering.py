@@ -0,0 +1,115 @@
+"""
+mh_tools - File Order
+---------------------
+Orders the files of a scan before planning. Renumbering numbers the
+files of a sequence in this order, so it decides which file becomes the
+first frame:
+
+    natural  digit runs compare as numbers: f.9, f.10, f.100
+    frame    sequence by sequence, by frame number within each
+    name     plain alphabetical (code point) order: f.10, f.100, f.9
+    mtime    oldest first, modification time taken from the scan entries
+
+No key is built by comparing names. The sequence parse of planning
+(sequences.SequenceIndex) already holds every frame number, so only the
+distinct name heads, one per sequence, go through the digit regex. The
+sort itself is a few stable sorts of file positions on precomputed
+per-file keys, least significant key first.
+"""
+
+import re
+from itertools import compress
+
+from mh_rename.sequences import NO_FRAME, SequenceIndex, split_extension
+
+NATURAL = "natural"
+FRAME = "frame"
+NAME = "name"
+MTIME = "mtime"
+
+ORDERS = (NATURAL, FRAME, NAME, MTIME)
+DEFAULT_ORDER = NATURAL
+
+_DIGIT_RUN = re.compile(r"([0-9]+)")
+
+
+def natural_key(text):
+    """Sort key of text with every run of digits compared as a number."""
+    parts = _DIGIT_RUN.split(text)
+    parts[1::2] = map(int, parts[1::2])
+    return parts
+
+
+def _ranks(values, key=None):
+    """Per value: rank among the distinct values, sorted by key."""
+    ranks = {value: rank for rank, value in enumerate(sorted(set(values), key=key))}
+    return list(map(ranks.__getitem__, values))
+
+
+def _file_heads(index):
+    """Per file: the name up to its frame number, or the stem if it has none."""
+    heads = [seq.prefix + seq.sep if seq.numbered else None for seq in index.sequences]
+    file_heads = list(map(heads.__getitem__, index.seq_ids))
+    if None in heads:
+        names = index.names
+        for i in compress(range(len(file_heads)), map(NO_FRAME.__eq__, index.frames)):
+            file_heads[i] = split_extension(names[i])[0]
+    return file_heads
+
+
+def _mtime(entry):
+    try:
+        # DirEntry caches its stat; on Windows it comes with the listing
+        return entry.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def sort_order(index, order=DEFAULT_ORDER, entries=None):
+    """
+    Positions of index.names (a SequenceIndex) in the given order.
+    entries: os.DirEntry per name (ScanResult.entries), needed for mtime.
+    Ties fall back to natural order, then to the name.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown file order: {order!r} (use one of {', '.join(ORDERS)})")
+    if order == MTIME and entries is None:
+        raise ValueError("Sorting by modification time needs the scanned directory entries.")
+
+    names = index.names
+    positions = sorted(range(len(names)), key=names.__getitem__)
+    if order == NAME:
+        return positions
+
+    # Natural order: by head, frame number, extension
+    sequences = index.sequences
+    exts = [seq.ext for seq in sequences]
+    positions.sort(key=list(map(exts.__getitem__, index.seq_ids)).__getitem__)
+    positions.sort(key=index.frames.__getitem__)
+    positions.sort(key=_ranks(_file_heads(index), natural_key).__getitem__)
+
+    if order == FRAME:
+        # Whole sequences one after the other; files without a frame last
+        seq_ranks = _ranks(range(len(sequences)), lambda sid: (
+            not sequences[sid].numbered,
+            natural_key(sequences[sid].prefix or ""),
+            sequences[sid].sep,
+            sequences[sid].ext,
+        ))
+        positions.sort(key=index.frames.__getitem__)
+        positions.sort(key=list(map(seq_ranks.__getitem__, index.seq_ids)).__getitem__)
+    elif order == MTIME:
+        positions.sort(key=list(map(_mtime, entries)).__getitem__)
+    return positions
+
+
+def sort_scan(scan, order=DEFAULT_ORDER, index=None):
+    """
+    Parse and order the files of a ScanResult for planning.
+    Returns a SequenceIndex whose names are in the given order, to pass
+    on as plan_renames(index.names, ..., index=index).
+    index: optional SequenceIndex of scan.names to reuse.
+    """
+    if index is None:
+        index = SequenceIndex(scan.names)
+    return index.reordered(sort_order(index, order, scan.entries))
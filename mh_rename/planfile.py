@@ -0,0 +1,397 @@
+"""
+mh_tools - Plan Files
+---------------------
+A rename plan saved to disk, so it can be reviewed, diffed, approved and
+then applied exactly as it was, later or on another machine.
+
+JSONL, written and read one block at a time so writing, verifying,
+approving and diffing a 1M-file plan never hold it in memory as a whole.
+Applying does: read_plan() returns every op in a list, since the
+collision check and the execution plan need all of them at once, like
+the ops of a plain apply (about 450 bytes per op). Records:
+
+    {"t": "plan", "version": 1, "created": ..., "host": ..., "input_dir": ...,
+     "output_dir": ..., "order": "natural", "options": {...}}
+    {"t": "str", "s": [string, ...]}                 strings 0, 1, ... in order
+    {"t": "ops", "ops": [src dir, src key, src rest, dst dir, dst key, dst rest,
+                         size, mtime_ns, ...]}
+    {"t": "end", "count": n, "sha256": hex}
+    {"t": "approve", "sha256": hex, "by": ..., "at": ..., "host": ...}
+
+Directories and name keys (a name up to its frame number, e.g.
+"sh010_beauty_v003.") are interned: an op refers to them by number and
+only spells out the rest of the name ("1001.exr"). Strings 0 and 1 are
+the input and output directories, which a reader can point elsewhere.
+"str" records come before the first block that uses their strings.
+
+size and mtime_ns are the source's when the plan was written; applying
+refuses to start if any source has changed since. sha256 covers every
+line before "end", so an edited file is refused too; approvals after it
+name the digest they approve.
+"""
+
+import getpass
+import hashlib
+import json
+import os
+import socket
+import time
+from collections import namedtuple
+from dataclasses import asdict
+from itertools import zip_longest
+
+from mh_rename.planner import RenameOp
+
+PLAN_VERSION = 1
+PLAN_SUFFIX = ".jsonl"
+STRIDE = 8  # Fields per op in an "ops" record
+
+# One op of a plan file and the state of its source when it was written
+# (size and mtime_ns are None for a plan written without them)
+PlanEntry = namedtuple("PlanEntry", ["op", "size", "mtime_ns"])
+
+_DIGITS = "0123456789"
+
+
+class PlanFileError(ValueError):
+    """The file is not a plan, is truncated or was modified."""
+
+
+class StalePlanError(Exception):
+    """
+    Sources of the plan changed since it was written.
+    problems: (path, reason) for the first few; count: all of them.
+    """
+    LIMIT = 20
+
+    def __init__(self, problems, count):
+        self.problems = problems
+        self.count = count
+        lines = [f"{path}: {reason}" for path, reason in problems]
+        if count > len(problems):
+            lines.append(f"... and {count - len(problems)} more")
+        super().__init__(f"{count} source files changed since the plan was written:\n" + "\n".join(lines))
+
+
+def _split(name):
+    """name -> (key, rest): the name up to its frame number, and the rest."""
+    stem, dot, _ = name.rpartition(".")
+    if not dot:
+        stem = name
+    key = stem.rstrip(_DIGITS)
+    return key, name[len(key):]
+
+
+class PlanWriter:
+    """
+    Writes a plan file op by op; use as a context manager or call close().
+    The file appears under path only once it is complete.
+    options: RenameOptions recorded for review; order: the file order.
+    """
+    BLOCK_SIZE = 10000  # Ops per record
+
+    def __init__(self, path, input_dir, output_dir=None, options=None, order=None):
+        self.path = path
+        self.count = 0
+        self.digest = None
+        self._hash = hashlib.sha256()
+        self._block = []
+        self._file = open(path + ".new", "wb")
+        input_dir = os.path.abspath(input_dir)
+        output_dir = os.path.abspath(output_dir) if output_dir else input_dir
+        self._bases = (input_dir, output_dir)
+        self._strings = {}
+        self._new = [input_dir, output_dir]  # Strings 0 and 1, even if equal
+        self._dirs = ({}, {})  # Per side: directory of an op as given -> string number
+        self._write({
+            "t": "plan",
+            "version": PLAN_VERSION,
+            "created": time.time(),
+            "host": socket.gethostname(),
+            "input_dir": input_dir,
+            "output_dir": output_dir,
+            "order": order,
+            "options": asdict(options) if options is not None else None,
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write(self, record):
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self._hash.update(line)
+        self._file.write(line)
+
+    def _intern(self, text):
+        number = self._strings.get(text)
+        if number is None:
+            number = self._strings[text] = len(self._strings) + 2
+            self._new.append(text)
+        return number
+
+    def _dir(self, path, name, side):
+        """
+        String number of the directory of path (which ends in name);
+        side 0 for sources, 1 for destinations.
+        """
+        # path minus name, cheaper than dirname and the same for every
+        # op in a directory
+        directory = path[:len(path) - len(name)]
+        number = self._dirs[side].get(directory)
+        if number is None:
+            absolute = os.path.abspath(directory or ".")
+            bases = self._bases
+            if absolute == bases[side]:
+                number = side
+            elif absolute == bases[1 - side]:
+                number = 1 - side
+            else:
+                number = self._intern(absolute)
+            self._dirs[side][directory] = number
+        return number
+
+    def add(self, op, stat=None):
+        """
+        Add a RenameOp. stat: the source's os.stat_result if at hand;
+        by default the source is stat'ed here.
+        """
+        if stat is None:
+            stat = os.stat(op.src)
+        intern = self._intern
+        src_key, src_rest = _split(op.src_name)
+        dst_key, dst_rest = _split(op.dst_name)
+        self._block += (
+            self._dir(op.src, op.src_name, 0), intern(src_key), src_rest,
+            self._dir(op.dst, op.dst_name, 1), intern(dst_key), dst_rest,
+            stat.st_size, stat.st_mtime_ns,
+        )
+        self.count += 1
+        if len(self._block) >= self.BLOCK_SIZE * STRIDE:
+            self._flush()
+
+    def _flush(self):
+        if self._new:
+            self._write({"t": "str", "s": self._new})
+            self._new = []
+        if self._block:
+            self._write({"t": "ops", "ops": self._block})
+            self._block = []
+
+    def close(self):
+        """Finish the file and move it into place. Returns the sha256 hex digest."""
+        self._flush()
+        self.digest = self._hash.hexdigest()
+        self._write({"t": "end", "count": self.count, "sha256": self.digest})
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.path + ".new", self.path)
+        return self.digest
+
+    def abort(self):
+        """Drop the unfinished file."""
+        self._file.close()
+        try:
+            os.remove(self.path + ".new")
+        except OSError:
+            pass
+
+
+def write_plan(path, ops, input_dir, output_dir=None, options=None, order=None):
+    """Write an iterable of RenameOp as a plan file. Returns (count, sha256)."""
+    with PlanWriter(path, input_dir, output_dir, options, order) as writer:
+        for op in ops:
+            writer.add(op)
+    return writer.count, writer.digest
+
+
+class PlanFile:
+    """
+    Streaming reader of a plan file. The header is read on opening;
+    iterating yields PlanEntry for every op, and checks at the end that
+    the file is complete and unmodified (raising PlanFileError).
+    After a full iteration count, digest and approvals are set.
+    input_dir/output_dir: apply the plan to other directories than the
+    ones it was written for; an in-place plan follows input_dir.
+    """
+
+    def __init__(self, path, input_dir=None, output_dir=None):
+        self.path = path
+        with open(path, "rb") as f:
+            first = f.readline()
+        try:
+            header = json.loads(first)
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get("t") != "plan":
+            raise PlanFileError(f"{path} is not a rename plan")
+        if header.get("version") != PLAN_VERSION:
+            raise PlanFileError(f"{path} has an unknown plan version {header.get('version')!r}")
+        self.header = header
+        in_place = header["output_dir"] == header["input_dir"]
+        self.input_dir = os.path.abspath(input_dir) if input_dir else header["input_dir"]
+        if output_dir:
+            self.output_dir = os.path.abspath(output_dir)
+        else:
+            self.output_dir = self.input_dir if in_place else header["output_dir"]
+        self.count = None
+        self.digest = None
+        self.approvals = []
+
+    def __iter__(self):
+        strings = []
+        digest = hashlib.sha256()
+        count = 0
+        end = None
+        self.approvals = []
+        join = os.path.join
+        with open(self.path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    raise PlanFileError(f"{self.path} is damaged (line {number})")
+                kind = record.get("t")
+                if end is not None:
+                    if kind == "approve":
+                        self.approvals.append(record)
+                    continue
+                if kind == "end":
+                    end = record
+                    continue
+                digest.update(line)
+                if kind == "plan":
+                    continue
+                if kind == "str":
+                    if not strings:
+                        # The directories the plan is applied to
+                        record["s"][:2] = self.input_dir, self.output_dir
+                    strings += record["s"]
+                elif kind == "ops":
+                    ops = record["ops"]
+                    for k in range(0, len(ops), STRIDE):
+                        src_dir, src_key, src_rest, dst_dir, dst_key, dst_rest, size, mtime_ns = ops[k:k + STRIDE]
+                        src_name = strings[src_key] + src_rest
+                        dst_name = strings[dst_key] + dst_rest
+                        op = RenameOp(src_name, dst_name, join(strings[src_dir], src_name),
+                                      join(strings[dst_dir], dst_name))
+                        yield PlanEntry(op, size, mtime_ns)
+                    count += len(ops) // STRIDE
+        if end is None:
+            raise PlanFileError(f"{self.path} is incomplete (no end record)")
+        if end.get("count") != count or end.get("sha256") != digest.hexdigest():
+            raise PlanFileError(f"{self.path} was modified after it was written")
+        self.count = count
+        self.digest = end["sha256"]
+
+    @property
+    def ops(self):
+        """Iterate the RenameOps only."""
+        return (entry.op for entry in self)
+
+    def approved(self):
+        """Approvals of this exact file; only valid after a full iteration."""
+        return [a for a in self.approvals if a.get("sha256") == self.digest]
+
+    def verify(self):
+        """Read the whole file (checking its digest) and return it."""
+        for _ in self:
+            pass
+        return self
+
+    def describe(self):
+        header = self.header
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(header.get("created", 0)))
+        where = self.input_dir if self.output_dir == self.input_dir else f"{self.input_dir} -> {self.output_dir}"
+        count = f"{self.count} files" if self.count is not None else "plan"
+        return f"{count} in {where}, written {created} on {header.get('host', '?')}"
+
+
+def read_plan(plan, check_sources=True, size_only=False):
+    """
+    Read every op of a PlanFile into a list, checking on the way that
+    each source still exists unchanged (size and, unless size_only,
+    mtime). The list is the whole plan in memory, see the module
+    docstring. Raises StalePlanError (after reading everything, so all
+    problems are listed), PlanFileError for a damaged file.
+    """
+    ops = []
+    problems = []
+    count = 0
+    stat = os.stat
+    for op, size, mtime_ns in plan:
+        ops.append(op)
+        if not check_sources or size is None:
+            continue
+        try:
+            st = stat(op.src)
+        except OSError as err:
+            reason = err.strerror or str(err)
+        else:
+            if st.st_size != size:
+                reason = f"size {st.st_size}, was {size}"
+            elif not size_only and st.st_mtime_ns != mtime_ns:
+                reason = "modified"
+            else:
+                continue
+        count += 1
+        if len(problems) < StalePlanError.LIMIT:
+            problems.append((op.src, reason))
+    if count:
+        raise StalePlanError(problems, count)
+    return ops
+
+
+def approve_plan(path, by=None):
+    """
+    Check the plan file and append an approval of its digest.
+    Returns the digest. Raises PlanFileError if it is damaged or modified.
+    """
+    plan = PlanFile(path).verify()
+    record = {
+        "t": "approve",
+        "sha256": plan.digest,
+        "by": by or getpass.getuser(),
+        "at": time.time(),
+        "host": socket.gethostname(),
+    }
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return plan.digest
+
+
+def diff_plans(old, new):
+    """
+    Differences between two PlanFiles, matched by source path, as
+    (kind, old op, new op): "changed" (other destination), "removed" (new
+    is None) or "added" (old is None). Both are streamed side by side;
+    only ops not matched yet are held, so plans in the same order diff
+    in constant memory.
+    """
+    waiting_old = {}
+    waiting_new = {}
+    for a, b in zip_longest(old.ops, new.ops):
+        if a is not None:
+            match = waiting_new.pop(a.src, None)
+            if match is None:
+                waiting_old[a.src] = a
+            elif match.dst != a.dst:
+                yield "changed", a, match
+        if b is not None:
+            match = waiting_old.pop(b.src, None)
+            if match is None:
+                waiting_new[b.src] = b
+            elif match.dst != b.dst:
+                yield "changed", match, b
+    for op in waiting_old.values():
+        yield "removed", op, None
+    for op in waiting_new.values():
+        yield "added", None, op
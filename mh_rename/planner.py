@@ -0,0 +1,199 @@
+"""
+mh_tools - Rename Planner
+-------------------------
+Headless rename engine used by both the GUI and the command line.
+Options are read once, compiled into an immutable rule object and the
+whole rename plan is produced in a single batch pass. Renumbering runs
+per frame sequence (see sequences.SequenceIndex), so beauty.####.exr and
+depth.####.exr in one folder each start at the start number. The names
+themselves are built by a compiled rules.Pipeline. No Tk import.
+"""
+
+import os
+from collections import namedtuple
+from dataclasses import dataclass
+
+from mh_rename.rules import Pipeline
+from mh_rename.sequences import SequenceIndex, parse_name
+
+DEFAULT_START_NUMBER = 1001
+DEFAULT_PADDING = 4
+DEFAULT_EXTENSION = "exr"
+
+# One planned rename: bare names plus the full source/destination paths.
+RenameOp = namedtuple("RenameOp", ["src_name", "dst_name", "src", "dst"])
+
+
+@dataclass(frozen=True)
+class RenameOptions:
+    """
+    Raw user options, mirroring the sections of the GUI.
+    Each feature is only applied when its toggle is enabled.
+    steps: extra rules.Step objects, run after Replace and before the
+    extension change.
+    """
+    replace: bool = False
+    find_text: str = ""
+    replace_text: str = ""
+    renumber: bool = False
+    start_number: int = DEFAULT_START_NUMBER
+    keep_offsets: bool = False
+    change_padding: bool = False
+    padding: int = DEFAULT_PADDING
+    change_extension: bool = False
+    extension: str = DEFAULT_EXTENSION
+    steps: tuple = ()
+
+
+@dataclass(frozen=True)
+class RenameRules:
+    """
+    Compiled, immutable form of RenameOptions.
+    Disabled features are reduced to None so the per-file path only
+    does the work that is actually needed.
+    keep_offsets: renumber so that frame - first frame is kept (gaps stay
+    gaps) instead of numbering the files of a sequence consecutively.
+    steps: rules.Step chain between the replace and the extension change.
+    """
+    find_text: str = None
+    replace_text: str = ""
+    start_number: int = None
+    keep_offsets: bool = False
+    pad_width: int = DEFAULT_PADDING
+    new_ext: str = None
+    steps: tuple = ()
+
+    @property
+    def renumber(self):
+        return self.start_number is not None
+
+
+def compile_rules(options):
+    """
+    Turn RenameOptions into RenameRules.
+    Raises ValueError if an enabled numeric option is not an integer or
+    a step does not compile.
+    """
+    find_text = None
+    if options.replace and options.find_text:
+        find_text = options.find_text
+
+    start_number = None
+    pad_width = DEFAULT_PADDING
+    if options.renumber:
+        start_number = int(options.start_number)
+        if options.change_padding:
+            pad_width = int(options.padding)
+
+    new_ext = None
+    if options.change_extension:
+        ext_txt = options.extension.strip()
+        if ext_txt:
+            new_ext = f".{ext_txt}"
+
+    rules = RenameRules(
+        find_text=find_text,
+        replace_text=options.replace_text,
+        start_number=start_number,
+        keep_offsets=bool(options.keep_offsets) and start_number is not None,
+        pad_width=pad_width,
+        new_ext=new_ext,
+        steps=tuple(options.steps)
+    )
+    Pipeline(rules)  # Compile once to surface errors here, not mid-plan
+    return rules
+
+
+def iter_plan(filenames, rules, input_dir, output_dir=None, index=None, entries=None, numbering=None):
+    """
+    Lazily yield a RenameOp for each of filenames. Lets callers consume
+    a huge plan in chunks.
+    When renumbering, every sequence is numbered from the start number on
+    its own, in the order given (or by frame offset with keep_offsets).
+    index: optional SequenceIndex of filenames, to reuse an existing parse.
+    entries: optional os.DirEntry objects of the files (ScanResult.entries)
+    whose cached stat serves {mtime} templates.
+    numbering: optional state carried between calls that plan a directory
+    a few files at a time, see rules.Pipeline.apply.
+    """
+    output_dir = output_dir or input_dir
+    join = os.path.join
+    if index is None:
+        index = SequenceIndex(filenames)
+    new_names = Pipeline(rules).apply(index, input_dir, entries, numbering)
+    for f, new in zip(filenames, new_names):
+        yield RenameOp(f, new, join(input_dir, f), join(output_dir, new))
+
+
+def plan_renames(filenames, rules, input_dir, output_dir=None, index=None, entries=None):
+    """
+    Produce the full rename plan for filenames in one pass.
+    Returns a list of RenameOp, see iter_plan.
+    """
+    return list(iter_plan(filenames, rules, input_dir, output_dir, index, entries))
+
+
+class PlanSummary:
+    """
+    Running summary of a plan, fed one op at a time.
+    Groups destination names into frame sequences (min/max frame and
+    count per name pattern) and counts collisions: destinations written
+    twice or already occupied by a file the plan does not move.
+    occupied: such paths on disk, see collisions.occupied_paths.
+    """
+
+    def __init__(self, occupied=()):
+        self.total = 0
+        self.collisions = 0
+        self.collision_keys = set()
+        self.sequences = {}
+        self._seen = set()
+        self._occupied = {os.path.normcase(path) for path in occupied}
+
+    def add(self, op):
+        self.total += 1
+        dst_name = op.dst_name
+        dst = os.path.normcase(op.dst)
+        if dst in self._seen or dst in self._occupied:
+            self.collisions += 1
+            self.collision_keys.add(dst)
+        self._seen.add(dst)
+
+        prefix, sep, frame, width, ext = parse_name(dst_name)
+        if frame is not None:
+            key = (prefix + sep, ext)
+        else:
+            key = (dst_name, None)
+        seq = self.sequences.get(key)
+        if seq is None:
+            # [first frame, last frame, file count, narrowest padding]
+            self.sequences[key] = [frame, frame, 1, width]
+        else:
+            if frame is not None:
+                if frame < seq[0]:
+                    seq[0] = frame
+                if frame > seq[1]:
+                    seq[1] = frame
+                if width < seq[3]:
+                    seq[3] = width
+            seq[2] += 1
+
+    def update(self, ops):
+        for op in ops:
+            self.add(op)
+
+    def lines(self, limit=None):
+        """Human readable summary rows, largest sequences first."""
+        rows = [f"{self.total} files, {self.collisions} collisions"]
+        items = sorted(self.sequences.items(), key=lambda kv: -kv[1][2])
+        for (head, ext), (first, last, count, width) in items[:limit]:
+            if first is None:
+                rows.append(f"{head}  ({count} files)")
+                continue
+            gaps = (last - first + 1) - count
+            row = f"{head}{'#' * width}{ext}  frames {first}\u2013{last}  ({count} files"
+            row += f", {gaps} missing)" if gaps > 0 else ")"
+            rows.append(row)
+        if limit is not None and len(items) > limit:
+            rows.append(f"... and {len(items) - limit} more")
+        return rows
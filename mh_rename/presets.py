@@ -0,0 +1,86 @@
+"""
+mh_tools - Rename Presets
+-------------------------
+Named rename settings saved as small JSON files, shared by the GUI and
+the command line. A preset holds a whole RenameOptions, rule pipeline
+steps included:
+
+    {"version": 1, "options": {"renumber": true, "start_number": 1001, ...,
+                               "steps": [{"kind": "regex", "text": ..., ...}]}}
+"""
+
+import json
+import os
+from dataclasses import asdict, fields
+
+from mh_rename.planner import RenameOptions
+from mh_rename.rules import Step
+
+PRESET_VERSION = 1
+PRESET_SUFFIX = ".json"
+
+
+def preset_dir():
+    """Where presets live: $MH_RENAME_PRESETS, or the user's config folder."""
+    directory = os.environ.get("MH_RENAME_PRESETS")
+    if directory:
+        return directory
+    if os.name == "nt":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "mh_rename", "presets")
+
+
+def preset_path(name):
+    """File of preset name; a name that is a path to a .json file is used as is."""
+    if name.endswith(PRESET_SUFFIX) and (os.sep in name or "/" in name or os.path.exists(name)):
+        return name
+    if not name.strip() or any(c in name for c in '\\/:*?"<>|'):
+        raise ValueError(f"Invalid preset name {name!r}.")
+    return os.path.join(preset_dir(), name.strip() + PRESET_SUFFIX)
+
+
+def list_presets():
+    """Names of the saved presets, sorted."""
+    try:
+        names = os.listdir(preset_dir())
+    except OSError:
+        return []
+    return sorted(n[:-len(PRESET_SUFFIX)] for n in names if n.endswith(PRESET_SUFFIX))
+
+
+def save_preset(name, options):
+    """Save RenameOptions under name (replacing an existing preset); returns the path."""
+    path = preset_path(name)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    data = {"version": PRESET_VERSION, "options": asdict(options)}
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def load_preset(name):
+    """
+    Load preset name (or a path to a preset file) as RenameOptions.
+    Raises OSError if it cannot be read, ValueError if it is not a preset.
+    """
+    with open(preset_path(name), encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as err:
+            raise ValueError(f"Preset {name!r} is not valid JSON: {err}")
+    if not isinstance(data, dict) or data.get("version") != PRESET_VERSION:
+        raise ValueError(f"Preset {name!r} has an unknown format.")
+    values = data.get("options", {})
+    # Unknown keys (from a newer version) are ignored
+    known = {field.name for field in fields(RenameOptions)}
+    values = {key: value for key, value in values.items() if key in known}
+    step_fields = {field.name for field in fields(Step)}
+    values["steps"] = tuple(
+        Step(**{key: value for key, value in step.items() if key in step_fields})
+        for step in values.get("steps", ())
+    )
+    return RenameOptions(**values)
@@ -0,0 +1,257 @@
+"""
+mh_tools - Rename Preview Window
+--------------------------------
+Virtualized preview of a rename plan. Only the rows in the visible
+viewport exist as Tk items; they are re-filled from the plan as the user
+scrolls. The plan itself is pulled from an iterator in chunks on the Tk
+event loop, so the window opens immediately and stays responsive while
+a large plan is still being computed.
+"""
+
+import itertools
+import os
+import time
+import tkinter as tk
+from tkinter import font as tkfont
+from tkinter import ttk
+
+from mh_rename.planner import PlanSummary
+
+
+class PlanPreview:
+    """
+    Toplevel window showing summary rows and a scrollable src -> dst list.
+    """
+    CHUNK_SIZE = 5000        # Ops pulled from the plan per event-loop slice
+    SUMMARY_INTERVAL = 0.5   # Seconds between summary refreshes while computing
+    SUMMARY_LIMIT = 8        # Sequence rows shown in the summary
+
+    def __init__(self, root, ops, occupied=(), on_apply=None, on_export=None, title="Preview Renames"):
+        """
+        ops: any iterable of RenameOp (typically the lazy iter_plan generator).
+        occupied: existing paths the plan must not overwrite.
+        on_apply: optional callback for the Rename button, called with the
+        list of previewed ops; the button is only enabled once the whole
+        plan is computed and free of collisions.
+        on_export: optional callback for the Export Plan button, likewise.
+        """
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.geometry("760x520")
+
+        self.plan_iter = iter(ops)
+        self.ops = []
+        self.summary = PlanSummary(occupied)
+        self.on_apply = on_apply
+        self.on_export = on_export
+        self.complete = False
+        self.top = 0
+        self.items = []
+        self._after_id = None
+        self._last_summary = 0.0
+
+        linespace = tkfont.nametofont("TkDefaultFont").metrics("linespace")
+        self.row_height = linespace + 4
+        style = ttk.Style(self.window)
+        style.configure("Preview.Treeview", rowheight=self.row_height)
+
+        self.setup_summary()
+        self.setup_buttons()
+        self.setup_list()
+
+        self.window.bind("<Destroy>", self.on_destroy)
+        self._after_id = self.window.after_idle(self.compute_chunk)
+
+    def setup_summary(self):
+        """Create the status line and summary rows."""
+        self.status_label = tk.Label(self.window, text="Computing plan...", anchor="w")
+        self.status_label.pack(fill="x", padx=5, pady=(5, 0))
+
+        self.summary_tree = ttk.Treeview(
+            self.window,
+            columns=("summary",),
+            show="",
+            height=self.SUMMARY_LIMIT + 2,
+            selectmode="none",
+            style="Preview.Treeview"
+        )
+        self.summary_tree.column("summary", width=700, stretch=True)
+        self.summary_tree.pack(fill="x", padx=5, pady=5)
+
+    def setup_buttons(self):
+        """Create the Rename and Export Plan buttons at the bottom of the window."""
+        btn_frame = tk.Frame(self.window)
+        btn_frame.pack(side="bottom", fill="x", pady=5)
+        self.apply_button = tk.Button(
+            btn_frame,
+            text="Rename Files",
+            command=self.apply,
+            bg="light grey",
+            state="disabled"
+        )
+        if self.on_apply is not None:
+            self.apply_button.pack(side="left", expand=True)
+        self.export_button = tk.Button(
+            btn_frame,
+            text="Export Plan...",
+            command=self.export,
+            bg="light grey",
+            state="disabled"
+        )
+        if self.on_export is not None:
+            self.export_button.pack(side="left", expand=True)
+
+    def apply(self):
+        self.window.destroy()
+        self.on_apply(self.ops)
+
+    def export(self):
+        self.on_export(self.ops)
+
+    def setup_list(self):
+        """Create the virtual src -> dst list and its scrollbar."""
+        frame = tk.Frame(self.window)
+        frame.pack(fill="both", expand=True, padx=5, pady=(0, 5))
+
+        self.scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.tree = ttk.Treeview(
+            frame,
+            columns=("src", "dst"),
+            show="headings",
+            selectmode="none",
+            style="Preview.Treeview"
+        )
+        self.tree.heading("src", text="Current name", anchor="w")
+        self.tree.heading("dst", text="New name", anchor="w")
+        self.tree.tag_configure("collision", foreground="red")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        for widget in (self.tree, self.summary_tree):
+            widget.bind("<MouseWheel>", self.on_mousewheel)
+            widget.bind("<Button-4>", lambda e: self.scroll_to(self.top - 3))
+            widget.bind("<Button-5>", lambda e: self.scroll_to(self.top + 3))
+        self.window.bind("<Up>", lambda e: self.scroll_to(self.top - 1))
+        self.window.bind("<Down>", lambda e: self.scroll_to(self.top + 1))
+        self.window.bind("<Prior>", lambda e: self.scroll_to(self.top - len(self.items)))
+        self.window.bind("<Next>", lambda e: self.scroll_to(self.top + len(self.items)))
+        self.window.bind("<Home>", lambda e: self.scroll_to(0))
+        self.window.bind("<End>", lambda e: self.scroll_to(len(self.ops)))
+
+    # ------------------------------------------------------------------
+    # Plan computation
+    # ------------------------------------------------------------------
+    def compute_chunk(self):
+        """Pull the next chunk of the plan, then reschedule until exhausted."""
+        self._after_id = None
+        start = len(self.ops)
+        chunk = list(itertools.islice(self.plan_iter, self.CHUNK_SIZE))
+        self.ops.extend(chunk)
+        self.summary.update(chunk)
+        self.complete = len(chunk) < self.CHUNK_SIZE
+
+        # Only re-render if new rows landed inside the viewport
+        if start < self.top + len(self.items):
+            self.render()
+        else:
+            self.update_scrollbar()
+
+        now = time.monotonic()
+        if self.complete or now - self._last_summary >= self.SUMMARY_INTERVAL:
+            self._last_summary = now
+            self.render_summary()
+
+        if not self.complete:
+            self._after_id = self.window.after(1, self.compute_chunk)
+
+    def on_destroy(self, event):
+        if event.widget is self.window and self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+            self._after_id = None
+
+    # ------------------------------------------------------------------
+    # Rendering
+    # ------------------------------------------------------------------
+    def render_summary(self):
+        """Refresh the status line and summary rows."""
+        if self.complete and self.summary.collisions:
+            status = (f"{len(self.ops)} files - {self.summary.collisions} collisions (red), "
+                      "change the options before renaming")
+        elif self.complete:
+            status = f"{len(self.ops)} files"
+        else:
+            status = f"Computing plan... {len(self.ops)} files so far"
+        self.status_label.config(text=status)
+
+        self.summary_tree.delete(*self.summary_tree.get_children())
+        for line in self.summary.lines(self.SUMMARY_LIMIT):
+            self.summary_tree.insert("", "end", values=(line,))
+
+        if self.complete and not self.summary.collisions:
+            self.apply_button.config(state="normal")
+            self.export_button.config(state="normal")
+        if self.complete and self.summary.collisions:
+            self.render()  # Earlier duplicates are only known now
+
+    def render(self):
+        """Fill the visible item pool from the plan, starting at self.top."""
+        ops = self.ops
+        total = len(ops)
+        collision_keys = self.summary.collision_keys
+        for offset, iid in enumerate(self.items):
+            index = self.top + offset
+            if index < total:
+                op = ops[index]
+                tags = ("collision",) if os.path.normcase(op.dst) in collision_keys else ()
+                self.tree.item(iid, values=(op.src_name, op.dst_name), tags=tags)
+            else:
+                self.tree.item(iid, values=("", ""), tags=())
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        total = len(self.ops)
+        if not total:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        first = self.top / total
+        last = min(1.0, (self.top + len(self.items)) / total)
+        self.scrollbar.set(first, last)
+
+    def scroll_to(self, index):
+        """Move the viewport so that row index is at the top."""
+        max_top = max(0, len(self.ops) - len(self.items))
+        top = min(max(0, int(index)), max_top)
+        if top != self.top:
+            self.top = top
+            self.render()
+        return "break"
+
+    # ------------------------------------------------------------------
+    # Event handlers
+    # ------------------------------------------------------------------
+    def on_resize(self, event):
+        """Rebuild the item pool so it exactly covers the visible area."""
+        rows = max(1, event.height // self.row_height - 1)  # minus heading row
+        if rows == len(self.items):
+            return
+        self.tree.delete(*self.items)
+        self.items = [self.tree.insert("", "end", values=("", "")) for _ in range(rows)]
+        self.scroll_to(self.top)
+        self.render()
+
+    def on_scroll(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'|'pages')."""
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * len(self.ops))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= max(1, len(self.items) - 1)
+            self.scroll_to(self.top + step)
+
+    def on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll_to(self.top - delta * 3)
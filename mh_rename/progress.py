@@ -0,0 +1,111 @@
+"""
+mh_tools - Rename Progress Window
+---------------------------------
+Shows the progress of a RenameWorker: progress bar, files/sec, ETA and a
+Cancel button. The worker's event queue is drained on a root.after timer,
+so the main window never blocks while files are being renamed.
+"""
+
+import queue
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from mh_rename.worker import ERROR, FINISHED, PLANNED, PROGRESS
+
+
+def format_duration(seconds):
+    """Format seconds as H:MM:SS."""
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressWindow:
+    """
+    Toplevel progress dialog for a running RenameWorker.
+    on_finished(result) is called with the ApplyResult once the worker
+    is done; on_error(exception) if planning failed. A PlanWorker is
+    shown the same way until its plan is ready.
+    """
+    POLL_MS = 100
+
+    def __init__(self, root, worker, on_finished, on_error, title="Renaming Files"):
+        self.root = root
+        self.worker = worker
+        self.on_finished = on_finished
+        self.on_error = on_error
+        self.started_at = time.monotonic()
+
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.geometry("420x150")
+        self.window.resizable(False, False)
+        self.window.transient(root)
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.status_label = tk.Label(self.window, text="Planning...", anchor="w")
+        self.status_label.pack(fill="x", padx=10, pady=(10, 5))
+
+        self.progress = ttk.Progressbar(self.window, mode="indeterminate", length=400)
+        self.progress.pack(fill="x", padx=10, pady=5)
+        self.progress.start(10)
+
+        self.rate_label = tk.Label(self.window, text="", anchor="w")
+        self.rate_label.pack(fill="x", padx=10)
+
+        self.cancel_button = tk.Button(
+            self.window,
+            text="Cancel",
+            command=self.cancel,
+            bg="light grey"
+        )
+        self.cancel_button.pack(pady=10)
+
+        self.window.after(self.POLL_MS, self.poll)
+
+    def cancel(self):
+        """Request a clean stop; the worker finishes the current file first."""
+        self.worker.cancel()
+        self.cancel_button.config(state="disabled", text="Cancelling...")
+
+    def poll(self):
+        """Drain all pending worker events, then render the latest state once."""
+        latest = None
+        while True:
+            try:
+                event = self.worker.events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == PLANNED:
+                self.started_at = time.monotonic()
+                self.progress.stop()
+                self.progress.config(mode="determinate", maximum=max(1, event[1]), value=0)
+            elif kind == PROGRESS:
+                latest = event
+            elif kind == FINISHED:
+                self.window.destroy()
+                self.on_finished(event[1])
+                return
+            elif kind == ERROR:
+                self.window.destroy()
+                self.on_error(event[1])
+                return
+
+        if latest is not None:
+            self.show_progress(*latest[1:])
+        self.window.after(self.POLL_MS, self.poll)
+
+    def show_progress(self, done, failed, total):
+        processed = done + failed
+        self.progress.config(value=processed)
+        status = f"{processed} / {total} files"
+        if failed:
+            status += f" ({failed} failed)"
+        self.status_label.config(text=status)
+
+        elapsed = time.monotonic() - self.started_at
+        if processed and elapsed > 0:
+            rate = processed / elapsed
+            eta = (total - processed) / rate
+            self.rate_label.config(text=f"{rate:,.0f} files/sec   ETA {format_duration(eta)}")
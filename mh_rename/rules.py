@@ -0,0 +1,347 @@
+"""
+mh_tools - Rule Pipeline
+------------------------
+Chains of rename steps, compiled once and applied to a whole plan.
+
+Every name is split into base, frame number and extension (see
+sequences.parse_name): "shotA_v003.1001.exr" is base "shotA_v003",
+frame 1001 and ".exr". Text steps change the base and never touch the
+frame number; renumbering (RenameRules.start_number) replaces that. A
+name without a frame number counts as a sequence of one file: it is
+renumbered to the start number.
+
+    replace: FIND => REPLACEMENT      literal replace
+    regex: PATTERN => REPLACEMENT     re.sub, with \\1 or \\g<name> groups
+    case: upper                       upper, lower, title, capitalize, swapcase
+    slice: 0:-4                       base[start:stop], Python slice rules
+    ext: jpg                          new extension
+    template: {prefix}_{mtime:%Y%m%d}.{frame:04d}{ext}
+
+Text steps take options in brackets: regex[i] ignores case, [name] works
+on the whole file name instead of the base. Templates build the whole
+new name from the tokens {prefix} (the base after the steps before it),
+{sep}, {frame}, {ext}, {seq_index} (position in the sequence, from 1),
+{index} (position in the plan, from 1), {name} (the old name) and
+{mtime} (a datetime, from the scan's cached stat where available).
+
+Compilation splits a chain in two. The leading steps that only need the
+base and extension run once per sequence and are cached, since a 100k
+frame sequence has a single base. From the first step that needs the
+individual file ({frame}, {mtime}... or a [name] step) on, the rest run
+per file; a base step among them parses the name built so far again, so
+it still leaves the frame number alone.
+"""
+
+import functools
+import operator
+import os
+import re
+import string
+from dataclasses import dataclass
+from datetime import datetime
+
+from mh_rename.sequences import NO_FRAME, parse_name, split_extension
+
+REPLACE = "replace"
+REGEX = "regex"
+CASE = "case"
+SLICE = "slice"
+EXT = "ext"
+TEMPLATE = "template"
+
+STEP_KINDS = (REPLACE, REGEX, CASE, SLICE, EXT, TEMPLATE)
+CASE_MODES = ("upper", "lower", "title", "capitalize", "swapcase")
+TEMPLATE_TOKENS = ("prefix", "sep", "frame", "ext", "seq_index", "index", "name", "mtime")
+
+BASE = "base"  # Scope: the name without frame number and extension
+NAME = "name"  # Scope: the whole file name
+
+ARROW = " => "  # Separates pattern and replacement in the text form
+
+
+@dataclass(frozen=True)
+class Step:
+    """
+    One step of a rule pipeline.
+    kind: one of STEP_KINDS. text: find text, pattern, case mode,
+    "start:stop", extension or template. replace: replacement for
+    replace/regex. scope: BASE or NAME. ignore_case: regex only.
+    """
+    kind: str
+    text: str = ""
+    replace: str = ""
+    scope: str = BASE
+    ignore_case: bool = False
+
+    def __str__(self):
+        """The one-line text form, see parse_step."""
+        options = []
+        if self.ignore_case:
+            options.append("i")
+        if self.scope == NAME:
+            options.append(NAME)
+        head = f"{self.kind}[{','.join(options)}]" if options else self.kind
+        if self.kind in (REPLACE, REGEX):
+            return f"{head}: {self.text}{ARROW}{self.replace}"
+        return f"{head}: {self.text}"
+
+
+def parse_step(line):
+    """
+    Parse one line of the text form ("regex[i]: (\\w+)_v(\\d+) => \\2_\\1").
+    Raises ValueError with a user-facing message.
+    """
+    head, colon, text = line.partition(":")
+    head = head.strip()
+    if not colon:
+        raise ValueError(f"Rule {line!r} needs a ':' after the step name.")
+    kind, _, options = head.partition("[")
+    kind = kind.strip().lower()
+    if kind not in STEP_KINDS:
+        raise ValueError(f"Unknown rule {kind!r} (use one of {', '.join(STEP_KINDS)}).")
+    options = {o.strip().lower() for o in options.rstrip("]").split(",") if o.strip()}
+    unknown = options - {"i", NAME}
+    if unknown:
+        raise ValueError(f"Unknown option {', '.join(sorted(unknown))!r} in rule {line!r}.")
+    # One space after the colon is syntax; more is part of the text
+    text = text[1:] if text.startswith(" ") else text
+    replace = ""
+    if kind in (REPLACE, REGEX):
+        if ARROW not in text:
+            raise ValueError(f"Rule {line!r} needs '{ARROW.strip()}' between text and replacement.")
+        text, replace = text.split(ARROW, 1)
+    step = Step(kind, text, replace, NAME if NAME in options else BASE, "i" in options)
+    _compile_step(step)  # Validate now rather than halfway through a plan
+    return step
+
+
+def parse_steps(text):
+    """Parse one step per line; blank lines and lines starting with # are skipped."""
+    return tuple(
+        parse_step(line) for line in text.splitlines()
+        if line.strip() and not line.lstrip().startswith("#")
+    )
+
+
+def format_steps(steps):
+    """Text form of steps, one per line."""
+    return "\n".join(str(step) for step in steps)
+
+
+def _parse_slice(text):
+    try:
+        parts = [int(p) if p.strip() else None for p in text.split(":")]
+    except ValueError:
+        parts = []
+    if len(parts) != 2:
+        raise ValueError(f"Slice {text!r} must look like start:stop, e.g. 0:-4 or 3:")
+    return slice(*parts)
+
+
+def _check_groups(regex, replace):
+    """Reject group references the pattern does not define."""
+    for number, name in re.findall(r"\\(\d+)|\\g<(\w+)>", replace):
+        ref = number or name
+        if ref.isdigit() and int(ref) > regex.groups or not ref.isdigit() and ref not in regex.groupindex:
+            raise ValueError(f"Replacement {replace!r} refers to group {ref}, "
+                             f"which {regex.pattern!r} does not have.")
+
+
+def _template_fields(template):
+    """Names of the tokens used in template; raises ValueError for unknown ones."""
+    try:
+        fields = {field.split(".")[0].split("[")[0]
+                  for _, field, _, _ in string.Formatter().parse(template) if field is not None}
+    except ValueError as err:
+        raise ValueError(f"Template {template!r}: {err}")
+    unknown = fields - set(TEMPLATE_TOKENS)
+    if unknown or "" in fields:
+        raise ValueError(f"Template {template!r} uses unknown token(s) "
+                         f"{', '.join(sorted(unknown)) or '{}'}; use {', '.join(TEMPLATE_TOKENS)}.")
+    try:
+        # Catch format specs that do not fit their token, e.g. {prefix:04d}
+        template.format(prefix="a", sep=".", frame=1, ext=".exr", seq_index=1, index=1,
+                        name="a.1.exr", mtime=datetime(2000, 1, 1))
+    except (ValueError, TypeError, IndexError, KeyError, AttributeError) as err:
+        raise ValueError(f"Template {template!r}: {err}")
+    return fields
+
+
+def _compile_step(step):
+    """
+    Compile one step into (kind, argument): a str -> str callable for
+    text steps, the extension for EXT, (template, fields) for TEMPLATE.
+    """
+    kind = step.kind
+    if kind == REPLACE:
+        return kind, operator.methodcaller("replace", step.text, step.replace)
+    if kind == REGEX:
+        try:
+            regex = re.compile(step.text, re.IGNORECASE if step.ignore_case else 0)
+        except re.error as err:
+            raise ValueError(f"Invalid regular expression {step.text!r}: {err}")
+        _check_groups(regex, step.replace)
+        return kind, functools.partial(regex.sub, step.replace)
+    if kind == CASE:
+        mode = step.text.strip().lower()
+        if mode not in CASE_MODES:
+            raise ValueError(f"Unknown case {step.text!r} (use one of {', '.join(CASE_MODES)}).")
+        return kind, operator.methodcaller(mode)
+    if kind == SLICE:
+        return kind, operator.itemgetter(_parse_slice(step.text))
+    if kind == EXT:
+        ext = step.text.strip().lstrip(".")
+        return kind, f".{ext}" if ext else ""
+    if kind == TEMPLATE:
+        return kind, (step.text, _template_fields(step.text))
+    raise ValueError(f"Unknown rule {kind!r}.")
+
+
+def _per_file(step):
+    """True if step needs the individual file rather than its sequence."""
+    return step.kind == TEMPLATE or step.scope == NAME
+
+
+class Pipeline:
+    """
+    A RenameRules compiled into flat operation lists:
+      base_ops  leading steps on (base, ext), run once per sequence
+      file_ops  the remaining steps, run per file on the whole name
+    Built per plan; apply() produces the new names of a SequenceIndex.
+    """
+
+    def __init__(self, rules):
+        steps = list(rules.steps)
+        if rules.find_text is not None:
+            steps.insert(0, Step(REPLACE, rules.find_text, rules.replace_text))
+        if rules.new_ext is not None:
+            steps.append(Step(EXT, rules.new_ext))
+
+        self.start = rules.start_number
+        self.keep_offsets = rules.keep_offsets
+        self.pad_width = rules.pad_width
+        self.base_ops = []
+        self.file_ops = []
+        for step in steps:
+            compiled = _compile_step(step)
+            if self.file_ops or _per_file(step):
+                self.file_ops.append((compiled[0], compiled[1], step.scope))
+            else:
+                self.base_ops.append(compiled)
+        # A leading template builds the name itself; skip assembling it first
+        self.assemble = not (self.file_ops and self.file_ops[0][0] == TEMPLATE)
+        self.fields = set()
+        for kind, arg, _ in self.file_ops:
+            if kind == TEMPLATE:
+                self.fields |= arg[1]
+
+    def _base(self, base, ext):
+        """Run base_ops on one (base, ext)."""
+        for kind, arg in self.base_ops:
+            if kind == EXT:
+                ext = arg
+            else:
+                base = arg(base)
+        return base, ext
+
+    def apply(self, index, directory=None, entries=None, numbering=None):
+        """
+        Yield the new name of every file of index (a SequenceIndex), in order.
+        directory: where the files are, to stat them for {mtime} if needed.
+        entries: optional os.DirEntry objects of the files, in any order
+        (e.g. ScanResult.entries); their cached stat serves {mtime}.
+        numbering: optional dict carried from one call to the next when a
+        directory is planned a few files at a time (watch mode). It maps
+        (prefix, sep, ext) to [first frame, files numbered so far], so
+        counting goes on where the last call stopped and keep_offsets
+        counts from the first frame ever seen rather than this call's.
+        """
+        sequences = index.sequences
+        cache = [None] * len(sequences)  # Per sequence: (base, ext) after base_ops
+        counters = [0] * len(sequences)
+        firsts = [seq.frames.first for seq in sequences]
+        if numbering is not None:
+            for sid, seq in enumerate(sequences):
+                state = numbering.setdefault((seq.prefix, seq.sep, seq.ext), [firsts[sid], 0])
+                if state[0] is None:
+                    state[0] = firsts[sid]
+                firsts[sid], counters[sid] = state
+                state[1] += seq.count
+        start = self.start
+        renumber = start is not None
+        keep_offsets = self.keep_offsets
+        pad_width = self.pad_width
+        file_ops = self.file_ops
+        base_of = self._base
+        assemble = self.assemble
+        mtime_of = self._mtime_lookup(directory, entries) if "mtime" in self.fields else None
+
+        for position, (f, sid, frame) in enumerate(zip(index.names, index.seq_ids, index.frames)):
+            seq = sequences[sid]
+            if seq.prefix is None:
+                # Files without a frame number: the base is their own stem,
+                # and each is a one-file sequence of its own, so unrelated
+                # files of one extension are not numbered as one run
+                base, ext = base_of(f[:len(f) - len(seq.ext)], seq.ext)
+                seq_index = 1
+            else:
+                cached = cache[sid]
+                if cached is None:
+                    cached = cache[sid] = base_of(seq.prefix, seq.ext)
+                base, ext = cached
+                seq_index = counters[sid] + 1
+                counters[sid] = seq_index
+
+            if renumber:
+                if keep_offsets and frame != NO_FRAME:
+                    number = start + frame - firsts[sid]
+                else:
+                    number = start + seq_index - 1
+                digits = str(number).zfill(pad_width)
+            elif frame != NO_FRAME:
+                number = frame
+                digits = f[len(seq.prefix) + len(seq.sep):len(f) - len(seq.ext)]
+            else:
+                number = None
+            if number is None:
+                sep = ""
+                new = base + ext
+            else:
+                # Keep the separator; a bare base gets "."
+                sep = seq.sep or ("." if base else "")
+                new = f"{base}{sep}{digits}{ext}" if assemble else None
+
+            for kind, arg, scope in file_ops:
+                if kind == TEMPLATE:
+                    template, fields = arg
+                    new = template.format(
+                        prefix=base, sep=sep or ".", ext=ext, name=f,
+                        frame=number if number is not None else seq_index,
+                        seq_index=seq_index, index=position + 1,
+                        mtime=mtime_of(f) if mtime_of is not None else None,
+                    )
+                elif kind == EXT:
+                    new = split_extension(new)[0] + arg
+                elif scope == NAME:
+                    new = arg(new)
+                else:
+                    # A base step after a per-file one: parse the name again
+                    # so the frame number stays untouched
+                    prefix, new_sep, new_frame, _, new_ext = parse_name(new)
+                    if new_frame is None:
+                        new = arg(prefix) + new_ext
+                    else:
+                        tail = new[len(prefix) + len(new_sep):]
+                        new = arg(prefix) + new_sep + tail
+            yield new
+
+    @staticmethod
+    def _mtime_lookup(directory, entries):
+        """callable(name) -> datetime of the file's modification time."""
+        by_name = {entry.name: entry for entry in entries} if entries is not None else {}
+
+        def mtime(name):
+            entry = by_name.get(name)
+            st = entry.stat() if entry is not None else os.stat(os.path.join(directory or "", name))
+            return datetime.fromtimestamp(st.st_mtime)
+        return mtime
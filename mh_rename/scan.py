@@ -0,0 +1,107 @@
+"""
+mh_tools - Directory Scanner
+----------------------------
+Single-pass directory enumeration built on os.scandir.
+File type comes from the cached DirEntry information, so on most
+platforms listing a directory costs no per-file stat call.
+"""
+
+import fnmatch
+import os
+import re
+
+# Journals and temporary parking names written by mh_rename itself
+RESERVED_PREFIX = ".mh_rename_"
+
+
+def _compile_pattern(pattern):
+    """Compile a glob pattern once (case-insensitive on Windows)."""
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    return re.compile(fnmatch.translate(pattern), flags).match
+
+
+def _normalize_extensions(extensions):
+    """Turn 'exr', '.EXR' or ['exr', 'dpx'] into a tuple of lowercase '.ext'."""
+    if isinstance(extensions, str):
+        extensions = extensions.split(",")
+    normalized = []
+    for ext in extensions:
+        ext = ext.strip().lower()
+        if ext:
+            normalized.append(ext if ext.startswith(".") else f".{ext}")
+    return tuple(normalized)
+
+
+def iter_files(directory, extensions=None, pattern=None, others=None):
+    """
+    Yield a DirEntry for every file in directory, skipping sub-directories
+    and mh_rename's own journal and temporary files.
+    Optionally keep only the given extensions and/or names matching a glob.
+    Entries are yielded in directory order as they are read.
+    others: optional list that receives the names of skipped entries.
+    """
+    ext_filter = _normalize_extensions(extensions) if extensions else None
+    name_filter = _compile_pattern(pattern) if pattern else None
+
+    with os.scandir(directory) as it:
+        for entry in it:
+            name = entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                # Entry vanished or is unreadable; same as listdir + isdir
+                is_dir = True
+            if (
+                is_dir
+                or name.startswith(RESERVED_PREFIX)
+                or (ext_filter and not name.lower().endswith(ext_filter))
+                or (name_filter and not name_filter(name))
+            ):
+                if others is not None:
+                    others.append(name)
+                continue
+            yield entry
+
+
+class ScanResult:
+    """
+    Sorted file entries of one directory, shared by preview and rename.
+    The directory mtime is remembered so a stale result can be detected
+    with a single stat instead of listing the directory again.
+    others holds the names that were skipped (sub-directories, filtered
+    files): they still occupy names in the directory.
+    """
+
+    def __init__(self, directory, entries, extensions=None, pattern=None, stamp=None, others=None):
+        self.directory = directory
+        self.entries = entries
+        self.others = others if others is not None else []
+        self.extensions = extensions
+        self.pattern = pattern
+        self.stamp = stamp
+
+    @property
+    def names(self):
+        return [entry.name for entry in self.entries]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def is_current(self, directory=None, extensions=None, pattern=None):
+        """True if this result still describes directory with the same filters."""
+        if directory is not None and directory != self.directory:
+            return False
+        if extensions != self.extensions or pattern != self.pattern:
+            return False
+        try:
+            return os.stat(self.directory).st_mtime_ns == self.stamp
+        except OSError:
+            return False
+
+
+def scan_directory(directory, extensions=None, pattern=None):
+    """Scan directory once and return a ScanResult sorted by file name."""
+    stamp = os.stat(directory).st_mtime_ns
+    others = []
+    entries = sorted(iter_files(directory, extensions, pattern, others), key=lambda e: e.name)
+    return ScanResult(directory, entries, extensions, pattern, stamp, others)
@@ -0,0 +1,264 @@
+"""
+mh_tools - Transfer Engine
+--------------------------
+Moves or copies one file as cheaply as the two locations allow, for
+output directories on another volume (scratch -> project store).
+
+Strategies, cheapest first:
+
+    rename           same volume, move mode only
+    reflink          copy-on-write clone (Linux FICLONE: btrfs, XFS, ...)
+    hardlink         copy mode only, and only if asked for
+    copy_file_range  in-kernel copy, no data through Python
+    sendfile         in-kernel copy on older kernels
+    buffered         readinto() with a large reused buffer
+
+A strategy the filesystem does not support is skipped from then on for
+that pair of directories. Copies are written under a reserved name in
+the output directory and swapped in with os.replace, so a destination
+that exists is always complete; size and mtime are then verified. In
+move mode the source is removed only after that.
+
+A Transfer is a callable(src, dst) and plugs into executor.apply_plan as
+its rename function, so the executor's workers, retries and journal
+apply unchanged; the kernel copies release the GIL and run in parallel.
+"""
+
+import errno
+import itertools
+import os
+import secrets
+import stat
+import sys
+import threading
+import time
+
+from mh_rename.scan import RESERVED_PREFIX
+
+RENAME = "rename"
+REFLINK = "reflink"
+HARDLINK = "hardlink"
+COPY_FILE_RANGE = "copy_file_range"
+SENDFILE = "sendfile"
+BUFFERED = "buffered"
+
+PART_PREFIX = RESERVED_PREFIX + "part_"
+BUFFER_SIZE = 8 * 1024 * 1024   # Buffered copy block size
+CHUNK_SIZE = 1 << 30            # Max bytes per copy_file_range/sendfile call
+MTIME_TOLERANCE = 2 * 10**9     # ns; FAT and some SMB servers store 2 s steps
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int), linux/fs.h
+
+# Errors that mean "this filesystem can't do that", not "this file failed"
+UNSUPPORTED_ERRNOS = {
+    getattr(errno, name) for name in (
+        "EXDEV", "ENOSYS", "EOPNOTSUPP", "ENOTSUP", "ENOTTY", "EINVAL", "EPERM", "EMLINK",
+    )
+    if hasattr(errno, name)
+}
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class VerifyError(OSError):
+    """The destination does not match the source after a transfer."""
+
+
+def _unsupported(err):
+    return err.errno in UNSUPPORTED_ERRNOS
+
+
+def _reflink(fsrc, fdst, size):
+    fcntl.ioctl(fdst, FICLONE, fsrc)
+
+
+def _copy_file_range(fsrc, fdst, size):
+    copied = 0
+    while copied < size:
+        n = os.copy_file_range(fsrc, fdst, min(size - copied, CHUNK_SIZE))
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+def _sendfile(fsrc, fdst, size):
+    copied = 0
+    while copied < size:
+        n = os.sendfile(fdst, fsrc, None, min(size - copied, CHUNK_SIZE))
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+def _buffered(fsrc, fdst, size):
+    buf = bytearray(BUFFER_SIZE)
+    view = memoryview(buf)
+    copied = 0
+    with open(fsrc, "rb", buffering=0, closefd=False) as r:
+        while True:
+            n = r.readinto(buf)
+            if not n:
+                break
+            mv = view[:n]
+            while mv:
+                mv = mv[os.write(fdst, mv):]
+            copied += n
+    return copied
+
+
+def _copy_strategies():
+    """Data copying strategies available on this platform, cheapest first."""
+    strategies = []
+    if fcntl is not None and sys.platform.startswith("linux"):
+        strategies.append((REFLINK, _reflink))
+    if hasattr(os, "copy_file_range"):
+        strategies.append((COPY_FILE_RANGE, _copy_file_range))
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        strategies.append((SENDFILE, _sendfile))
+    strategies.append((BUFFERED, _buffered))
+    return strategies
+
+
+class Transfer:
+    """
+    callable(src, dst) moving (or with keep_source, copying) one file.
+    keep_source: copy mode, the source is left in place.
+    hardlink: in copy mode, link instead of copying where possible; the
+    two names then share one file, so edits to either show in both.
+    verify: check size and mtime of the destination after a copy.
+    strategies: optional names of the copy strategies to allow (default
+    every one available here).
+    counts: {strategy: files}, seconds: {strategy: time spent}, bytes:
+    bytes copied through the kernel or Python; read them under lock
+    while workers run.
+    """
+
+    def __init__(self, keep_source=False, hardlink=False, verify=True, strategies=None):
+        self.keep_source = keep_source
+        self.hardlink = hardlink
+        self.verify = verify
+        self.counts = {}
+        self.seconds = {}
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self._strategies = [
+            (name, copy) for name, copy in _copy_strategies()
+            if strategies is None or name in strategies
+        ]
+        self._disabled = {}  # (src dir, dst dir) -> strategies known not to work there
+        self._token = secrets.token_hex(4)
+        self._parts = itertools.count()
+
+    def __call__(self, src, dst):
+        pair = (os.path.dirname(src), os.path.dirname(dst))
+        disabled = self._disabled.setdefault(pair, set())
+        started = time.perf_counter()
+
+        if not self.keep_source and RENAME not in disabled:
+            try:
+                os.rename(src, dst)
+                self._count(RENAME, started)
+                return
+            except OSError as err:
+                if err.errno != errno.EXDEV:
+                    raise
+                disabled.add(RENAME)
+
+        if self.keep_source and self.hardlink and HARDLINK not in disabled:
+            try:
+                os.link(src, dst)
+                self._count(HARDLINK, started)
+                return
+            except OSError as err:
+                if not _unsupported(err):
+                    raise
+                disabled.add(HARDLINK)
+
+        self._copy(src, dst, disabled, started)
+        if not self.keep_source:
+            os.unlink(src)
+
+    def _count(self, strategy, started, size=0):
+        """Count one file done with strategy, started at perf_counter() started."""
+        seconds = time.perf_counter() - started
+        with self.lock:
+            self.counts[strategy] = self.counts.get(strategy, 0) + 1
+            self.seconds[strategy] = self.seconds.get(strategy, 0.0) + seconds
+            self.bytes += size
+
+    def _copy(self, src, dst, disabled, started):
+        """Copy src to dst through a part file, trying each strategy in turn."""
+        part = os.path.join(os.path.dirname(dst), f"{PART_PREFIX}{self._token}_{next(self._parts)}")
+        fsrc = os.open(src, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            st = os.fstat(fsrc)
+            size = st.st_size
+            fdst = os.open(part, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0),
+                           stat.S_IMODE(st.st_mode))
+            try:
+                for name, copy in self._strategies:
+                    if name in disabled:
+                        continue
+                    try:
+                        copy(fsrc, fdst, size)
+                    except OSError as err:
+                        if name == BUFFERED or not _unsupported(err):
+                            raise
+                        # Start over with the next strategy
+                        disabled.add(name)
+                        os.lseek(fsrc, 0, os.SEEK_SET)
+                        os.lseek(fdst, 0, os.SEEK_SET)
+                        os.ftruncate(fdst, 0)
+                        continue
+                    self._count(name, started, 0 if name == REFLINK else size)
+                    break
+            finally:
+                os.close(fdst)
+            os.utime(part, ns=(st.st_atime_ns, st.st_mtime_ns))
+            if self.verify:
+                self._verify(part, st, src)
+            os.replace(part, dst)
+        except BaseException:
+            try:
+                os.unlink(part)
+            except OSError:
+                pass
+            raise
+        finally:
+            os.close(fsrc)
+
+    def _verify(self, path, src_stat, src):
+        st = os.stat(path)
+        if st.st_size != src_stat.st_size:
+            raise VerifyError(errno.EIO, f"size {st.st_size} != {src_stat.st_size} after copy", src)
+        if abs(st.st_mtime_ns - src_stat.st_mtime_ns) > MTIME_TOLERANCE:
+            raise VerifyError(errno.EIO, "modification time was not preserved", src)
+
+    def lines(self):
+        """User-facing summary of the strategies used."""
+        with self.lock:
+            counts = dict(self.counts)
+            size = self.bytes
+        if not counts or set(counts) == {RENAME}:
+            return []
+        used = ", ".join(f"{name} {count}" for name, count in sorted(counts.items()))
+        if size >= 10**9:
+            copied = f"{size / 10**9:.2f} GB"
+        else:
+            copied = f"{size / 10**6:.1f} MB"
+        return [f"Transfer: {used}; {copied} copied."]
+
+
+def discard_copy(copy, original):
+    """
+    Undo one op of a copy-mode batch: remove the copy, but only while the
+    original it was made from still exists.
+    """
+    if not os.path.lexists(original):
+        raise FileNotFoundError(errno.ENOENT, "original is gone, keeping the copy", original)
+    os.unlink(copy)
@@ -0,0 +1,548 @@
+"""
+mh_tools - Watch Mode
+---------------------
+Renames the frames of a render while it is still running: the output
+folder is watched and every file is renamed once the renderer has
+finished writing it, with the same rules as a normal rename.
+
+New names come from inotify on Linux (through ctypes, no extra package)
+and from polling everywhere else, including network shares, where
+inotify does not see files written by other machines. A poll costs one
+stat of the directory while nothing changes; the directory is only
+listed again when its mtime moves, and only names not seen before are
+looked at. A file counts as finished once its size and mtime have held
+still for the settle time, so each check stats the pending files only.
+
+Files are renamed a few at a time as they settle, so numbering has to
+carry over from one batch to the next: when renumbering, every frame
+keeps its offset from the first frame of its sequence (frame N becomes
+start + N - first), whatever order the frames arrive in. The first frame
+is the lowest frame of the first batch unless given with first_frame.
+That is only a guess: a lower frame finishing later would get a number
+below start, so it is held back (left under its name and reported)
+rather than renumbered out of the range.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import struct
+import threading
+import time
+from dataclasses import replace
+
+from mh_rename.batch import NETWORK_FILESYSTEMS, REMOTE, filesystem_type
+from mh_rename.collisions import check_plan, is_temp_move
+from mh_rename.executor import DEFAULT_RETRIES, apply_plan
+from mh_rename.journal import Journal, journal_path
+from mh_rename.metrics import Metrics
+from mh_rename.ordering import NATURAL, sort_order
+from mh_rename.planner import iter_plan
+from mh_rename.scan import RESERVED_PREFIX, _compile_pattern, _normalize_extensions
+from mh_rename.sequences import NO_FRAME, SequenceIndex
+
+DEFAULT_SETTLE = 2.0          # Seconds a file must hold still before it is renamed
+NETWORK_SETTLE = 10.0         # ...on network shares, whose attributes are cached
+DEFAULT_INTERVAL = 1.0        # Seconds between polls
+RESCAN_INTERVAL = 60.0        # Polling: list the directory at least this often
+MTIME_GRANULARITY = 2.0       # Coarsest directory mtime step (FAT); see PollSource
+LISTING_DUTY = 0.02           # Polling: at most this share of the time goes to listing
+
+INOTIFY = "inotify"
+POLLING = "polling"
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then len bytes of name
+
+
+def _list_files(directory):
+    """Names of the non-directory entries of directory."""
+    with os.scandir(directory) as it:
+        names = set()
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    continue
+            except OSError:
+                continue
+            names.add(entry.name)
+    return names
+
+
+def _libc():
+    """libc with the inotify calls, or None where there is none."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1  # AttributeError if missing
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifySource:
+    """
+    New names in one directory from inotify, on Linux.
+    wait() blocks in the kernel until something happens, so an idle
+    watch uses no CPU at all.
+    """
+    method = INOTIFY
+    MASK = (IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+            | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+    def __init__(self, directory, libc):
+        self.directory = directory
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1: {os.strerror(err)}")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch: {os.strerror(err)}", directory)
+        # A pipe to wake wait() from another thread or a signal handler
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._poll = select.poll()
+        self._poll.register(self.fd, select.POLLIN)
+        self._poll.register(self._wake_r, select.POLLIN)
+
+    def list(self):
+        """Every file name in the directory (the watch is already running)."""
+        return _list_files(self.directory)
+
+    def wait(self, timeout):
+        """
+        Wait up to timeout seconds (None: until something happens).
+        Returns (appeared, gone) name lists, or (None, gone) if events were
+        lost and the directory has to be listed again.
+        """
+        ready = self._poll.poll(None if timeout is None else max(0, int(timeout * 1000)))
+        appeared, gone = [], []
+        if any(fd == self._wake_r for fd, _ in ready):
+            try:
+                while os.read(self._wake_r, 512):
+                    pass
+            except BlockingIOError:
+                pass
+        if not any(fd == self.fd for fd, _ in ready):
+            return appeared, gone
+
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    raise FileNotFoundError(f"The watched directory went away: {self.directory}")
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif mask & IN_ISDIR:
+                    continue
+                elif mask & (IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO):
+                    appeared.append(name)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    gone.append(name)
+        return (None if overflow else appeared), gone
+
+    def forget(self, names):
+        """Nothing to do: inotify reports a name that comes back."""
+
+    def wake(self):
+        """Make a waiting wait() return now; safe from signal handlers."""
+        try:
+            os.write(self._wake_w, b"\0")
+        except OSError:
+            pass
+
+    def close(self):
+        for fd in (self.fd, self._wake_r, self._wake_w):
+            os.close(fd)
+
+
+class PollSource:
+    """
+    New names in one directory by polling, for every platform and for
+    network shares. The cursor is the directory mtime and the names seen
+    so far: an unchanged mtime means no file was added or removed, so an
+    idle poll is one stat. When the mtime moves, the directory is listed
+    and only the names missing from the cursor are picked up; listing is
+    throttled to LISTING_DUTY of the time, so a huge folder that changes
+    every second is listed less often rather than all the time.
+    A listing taken less than MTIME_GRANULARITY after the mtime changed
+    may have missed a file created in the same mtime step, so the next
+    poll lists again; and every RESCAN_INTERVAL the directory is listed
+    in full, for shares that are slow to update a directory's mtime.
+    """
+    method = POLLING
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.names = set()
+        self._stamp = None
+        self._racy = True
+        self._next_full = 0.0
+        self._not_before = 0.0
+        self._wake = threading.Event()
+
+    def _stat(self):
+        st = os.stat(self.directory)
+        self._stamp = st.st_mtime_ns
+        self._racy = time.time() - st.st_mtime < MTIME_GRANULARITY
+
+    def list(self):
+        """Every file name in the directory; becomes the cursor."""
+        self._stat()
+        self.names = _list_files(self.directory)
+        self._next_full = time.monotonic() + RESCAN_INTERVAL
+        return set(self.names)
+
+    def wait(self, timeout):
+        """Sleep timeout seconds, then return (appeared, gone) since the last call."""
+        if self._wake.wait(timeout):
+            self._wake.clear()
+            return [], []
+        started = time.monotonic()
+        if started < self._not_before:
+            return [], []
+        if started >= self._next_full:
+            seen = self.names
+            names = self.list()
+            appeared, gone = list(names - seen), list(seen - names)
+        else:
+            if not self._racy and os.stat(self.directory).st_mtime_ns == self._stamp:
+                return [], []
+            self._stat()
+            names = self.names
+            with os.scandir(self.directory) as it:
+                new = [entry for entry in it if entry.name not in names]
+            appeared = []
+            for entry in new:
+                try:
+                    if entry.is_dir():
+                        continue
+                except OSError:
+                    continue
+                appeared.append(entry.name)
+            names.update(appeared)
+            gone = []
+        self._not_before = started + (time.monotonic() - started) / LISTING_DUTY
+        return appeared, gone
+
+    def forget(self, names):
+        """Drop names (moved away by the watch) from the cursor, so they are new if they come back."""
+        self.names.difference_update(names)
+
+    def wake(self):
+        self._wake.set()
+
+    def close(self):
+        pass
+
+
+def open_source(directory, polling=None):
+    """
+    InotifySource for directory where inotify works and sees every
+    writer, else a PollSource. polling: True forces polling, False
+    inotify (raising OSError where unavailable), None picks.
+    """
+    if polling is None:
+        fstype = filesystem_type(directory)
+        polling = fstype == REMOTE or fstype in NETWORK_FILESYSTEMS
+    if not polling:
+        libc = _libc()
+        if libc is not None:
+            try:
+                return InotifySource(directory, libc)
+            except OSError:
+                if polling is False:
+                    raise
+        elif polling is False:
+            raise OSError("inotify is not available on this system.")
+    return PollSource(directory)
+
+
+class WatchBatch:
+    """
+    What one round of watch mode did.
+    renamed: RenameOps that reached their destination; failed: (op, error);
+    skipped: (op, reason) for renames left out of the round, e.g. because
+    the new name is taken.
+    """
+
+    def __init__(self):
+        self.renamed = []
+        self.failed = []
+        self.skipped = []
+
+    def lines(self):
+        """User-facing rows: one per file."""
+        rows = [f"{op.src_name}  ->  {op.dst_name}" for op in self.renamed]
+        rows += [f"FAILED  {op.src_name}  ->  {op.dst_name}: {err}" for op, err in self.failed]
+        rows += [f"SKIPPED {op.src_name}  ->  {op.dst_name}: {reason}" for op, reason in self.skipped]
+        return rows
+
+
+class Watcher:
+    """
+    Watches directory and renames every new file once it has settled.
+    rules: RenameRules; when renumbering, frame offsets are always kept
+    (see the module docstring). output_dir: where renamed files go
+    (default: in place). extensions/pattern: only watch matching files.
+    existing: also rename the files already there when watching starts;
+    by default they are left alone. first_frame: frame that gets the
+    start number, for every sequence. settle: seconds a file's size and
+    mtime must hold still (default by filesystem). rename: callable(src,
+    dst), e.g. a transfer.Transfer. journaled: write a journal per round,
+    so an interrupted round can be resumed; undo reverts the last round.
+    on_batch: callable(WatchBatch) after every round that did something.
+    polling: see open_source. metrics: metrics.Metrics adding up every
+    round (default: a new one, in self.metrics).
+    """
+
+    def __init__(self, directory, rules, output_dir=None, extensions=None, pattern=None,
+                 existing=False, first_frame=None, settle=None, interval=DEFAULT_INTERVAL,
+                 rename=os.rename, journaled=True, workers=1, retries=DEFAULT_RETRIES,
+                 on_batch=None, polling=None, metrics=None):
+        self.directory = directory
+        self.output_dir = output_dir or directory
+        self.in_place = (os.path.normcase(os.path.abspath(self.output_dir))
+                         == os.path.normcase(os.path.abspath(directory)))
+        if rules.renumber:
+            rules = replace(rules, keep_offsets=True)
+        self.rules = rules
+        self.ext_filter = _normalize_extensions(extensions) if extensions else None
+        self.name_filter = _compile_pattern(pattern) if pattern else None
+        self.existing = existing
+        self.first_frame = first_frame
+        if settle is None:
+            fstype = filesystem_type(directory)
+            settle = NETWORK_SETTLE if fstype == REMOTE or fstype in NETWORK_FILESYSTEMS else DEFAULT_SETTLE
+        self.settle = settle
+        self.interval = interval
+        self.rename = rename
+        self.keep_source = getattr(rename, "keep_source", False)
+        self.journaled = journaled
+        self.workers = workers
+        self.retries = retries
+        self.on_batch = on_batch
+        self.polling = polling
+        self.metrics = metrics if metrics is not None else Metrics("watch")
+        self.metrics.info.setdefault("directory", directory)
+
+        self.source = None
+        self.known = set()      # Names not to rename: old files, our own output, failures
+        self.pending = {}       # Name -> (size, mtime_ns, monotonic time it last changed)
+        self.numbering = {}     # Carried between rounds, see rules.Pipeline.apply
+        self.renamed = 0
+        self.failed = 0
+        self.skipped = 0
+        self._stop = threading.Event()
+
+    @property
+    def method(self):
+        """INOTIFY or POLLING, once watching."""
+        return self.source.method if self.source is not None else None
+
+    def wanted(self, name):
+        """True if name is a file this watch renames."""
+        return not (
+            name.startswith(RESERVED_PREFIX)
+            or (self.ext_filter and not name.lower().endswith(self.ext_filter))
+            or (self.name_filter and not self.name_filter(name))
+        )
+
+    def start(self):
+        """Open the source and take the first listing; run() does this itself."""
+        self.source = open_source(self.directory, self.polling)
+        names = self.source.list()
+        if self.existing:
+            self._add(names)
+        else:
+            self.known = names
+
+    def stop(self):
+        """Stop run() after the current round; safe from other threads and signal handlers."""
+        self._stop.set()
+        if self.source is not None:
+            self.source.wake()
+
+    def run(self):
+        """Watch until stop() is called."""
+        if self.source is None:
+            self.start()
+        source = self.source
+        try:
+            while not self._stop.is_set():
+                # Idle: block (inotify) or poll at the interval. With files
+                # pending, wake up often enough to catch them settling.
+                if self.pending:
+                    timeout = min(self.interval, self.settle / 2)
+                else:
+                    timeout = None if source.method == INOTIFY else self.interval
+                appeared, gone = source.wait(timeout)
+                if self._stop.is_set():
+                    break
+                if appeared is None:
+                    appeared = source.list() - self.known
+                for name in gone:
+                    self.pending.pop(name, None)
+                    self.known.discard(name)
+                self._add(appeared)
+                self.step()
+        finally:
+            source.close()
+            self.source = None
+
+    def _add(self, names):
+        pending = self.pending
+        known = self.known
+        for name in names:
+            if name not in known and name not in pending and self.wanted(name):
+                pending[name] = None
+
+    def settled(self, now=None):
+        """Pending names whose size and mtime held still for the settle time."""
+        now = time.monotonic() if now is None else now
+        ready = []
+        pending = self.pending
+        join = os.path.join
+        self.metrics.count("stat_calls", len(pending))
+        for name, seen in list(pending.items()):
+            try:
+                st = os.stat(join(self.directory, name))
+            except OSError:
+                del pending[name]  # Gone again, e.g. a renderer's temporary file
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                del pending[name]
+                self.known.add(name)
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            if seen is None or seen[:2] != signature:
+                pending[name] = signature + (now,)
+            elif now - seen[2] >= self.settle:
+                del pending[name]
+                ready.append(name)
+        return ready
+
+    def step(self, now=None):
+        """Rename whatever has settled. Returns the WatchBatch, or None."""
+        ready = self.settled(now)
+        if not ready:
+            return None
+        return self.rename_files(ready)
+
+    def plan(self, names):
+        """
+        RenameOps for names, numbered on from the earlier rounds.
+        Returns (ops, skipped), skipped holding (op, reason) for frames
+        before the first frame: held back if the first frame was guessed
+        (see the module docstring), else only if their number would be
+        negative.
+        """
+        index = SequenceIndex(names)
+        index = index.reordered(sort_order(index, NATURAL))
+        numbering = self.numbering
+        if self.first_frame is not None:
+            for seq in index.sequences:
+                if seq.numbered:
+                    numbering.setdefault((seq.prefix, seq.sep, seq.ext), [self.first_frame, 0])
+        ops = list(iter_plan(index.names, self.rules, self.directory, self.output_dir,
+                             index, numbering=numbering))
+        skipped = []
+        start = self.rules.start_number
+        if start is not None:
+            lowest = 0 if self.first_frame is not None else start
+            firsts = [numbering[(seq.prefix, seq.sep, seq.ext)][0] for seq in index.sequences]
+            for position, (sid, frame) in enumerate(zip(index.seq_ids, index.frames)):
+                if frame != NO_FRAME and start + frame - firsts[sid] < lowest:
+                    skipped.append((ops[position], f"frame {frame} is before the first frame "
+                                                   f"{firsts[sid]}; set the first frame"))
+                    ops[position] = None
+        return [op for op in ops if op is not None], skipped
+
+    def rename_files(self, names):
+        """Plan and rename names (settled files) in one round."""
+        batch = WatchBatch()
+        metrics = self.metrics
+        metrics.count("rounds")
+        with metrics.phase("plan"):
+            planned, batch.skipped = self.plan(names)
+        for op, _ in batch.skipped:
+            self.known.add(op.src_name)
+        ops = []
+        for op in planned:
+            if op.src == op.dst:
+                self.known.add(op.src_name)  # Already has its new name
+            else:
+                ops.append(op)
+
+        # A name is taken if a file is there, or a file still being
+        # written will get it; none of it is overwritten
+        key = os.path.normcase
+        pending = {key(os.path.join(self.directory, name)) for name in self.pending}
+        with metrics.phase("check"):
+            occupied = [op.dst for op in ops if key(op.dst) in pending or os.path.lexists(op.dst)]
+            report = check_plan(ops, occupied)
+        if not report.ok:
+            bad = {id(op) for op in report.clobbers}
+            for duplicates in report.duplicates.values():
+                bad.update(id(op) for op in duplicates)
+            for op in ops:
+                if id(op) in bad:
+                    batch.skipped.append((op, "the new name is taken"))
+                    self.known.add(op.src_name)
+            ops = [op for op in ops if id(op) not in bad]
+
+        if ops:
+            os.makedirs(self.output_dir, exist_ok=True)
+            journal = None
+            if self.journaled:
+                journal = Journal(journal_path(self.output_dir), keep_source=self.keep_source)
+            moved = []
+            result = apply_plan(ops, self.rename, workers=self.workers, retries=self.retries,
+                                journal=journal, metrics=metrics)
+            for op in result.done:
+                if is_temp_move(op):
+                    continue
+                batch.renamed.append(op)
+                if not self.keep_source:
+                    self.known.discard(op.src_name)
+                    moved.append(op.src_name)
+                if self.in_place:
+                    self.known.add(op.dst_name)
+            if self.source is not None:
+                self.source.forget(moved)
+            for op, err in result.failed:
+                if not is_temp_move(op):
+                    batch.failed.append((op, err))
+                    self.known.add(op.src_name)
+
+        self.renamed += len(batch.renamed)
+        self.failed += len(batch.failed)
+        self.skipped += len(batch.skipped)
+        if self.on_batch is not None and (batch.renamed or batch.failed or batch.skipped):
+            self.on_batch(batch)
+        return batch
@@ -0,0 +1,173 @@
+"""
+mh_tools - Background Rename Worker
+-----------------------------------
+Runs the planning and execution phases of a rename job on a worker
+thread. Progress is reported through a queue in time-based batches, so
+even a 1M-file job only produces a handful of events per second for the
+UI to drain. No Tk import; the GUI polls the queue with root.after.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from mh_rename.collisions import ExecutionPlan
+from mh_rename.executor import apply_plan
+from mh_rename.metrics import Metrics
+
+# Event kinds placed on RenameWorker.events
+PLANNED = "planned"      # (PLANNED, total)
+PROGRESS = "progress"    # (PROGRESS, done, failed, total)
+FINISHED = "finished"    # (FINISHED, ApplyResult)
+ERROR = "error"          # (ERROR, exception) - planning or renaming failed
+WATCHED = "watched"      # (WATCHED, WatchBatch) - a round of watch mode
+
+
+class RenameWorker(threading.Thread):
+    """
+    Worker thread for one rename job.
+    plan: callable returning (ops, journal), where ops is a list of
+    RenameOp or an ExecutionPlan and journal a journal.Journal or None;
+    it runs on the worker, so it may also raise (e.g. CollisionError).
+    Anything raised while planning or renaming is posted as ERROR.
+    workers: parallel renames passed on to the executor.
+    metrics: metrics.Metrics for the execution (default: a new one, in
+    self.metrics); plan can add its own phases to it.
+    """
+    PROGRESS_INTERVAL = 0.1  # Seconds between progress events
+
+    def __init__(self, plan, rename=os.rename, workers=1, metrics=None):
+        super().__init__(name="mh_rename-worker", daemon=True)
+        self.plan = plan
+        self.rename = rename
+        self.workers = workers
+        self.metrics = metrics if metrics is not None else Metrics("rename")
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.total = 0
+        self._next_report = 0.0
+
+    def cancel(self):
+        """Ask the worker to stop before the next file."""
+        self.cancel_event.set()
+
+    def _progress(self, done, failed):
+        now = time.monotonic()
+        if now >= self._next_report:
+            self._next_report = now + self.PROGRESS_INTERVAL
+            self.events.put((PROGRESS, done, failed, self.total))
+
+    def run(self):
+        try:
+            ops, journal = self.plan()
+        except Exception as err:
+            self.events.put((ERROR, err))
+            return
+        self.total = ops.file_count if isinstance(ops, ExecutionPlan) else len(ops)
+        self.events.put((PLANNED, self.total))
+
+        try:
+            result = apply_plan(
+                ops,
+                self.rename,
+                workers=self.workers,
+                cancel=self.cancel_event,
+                progress=self._progress,
+                journal=journal,
+                metrics=self.metrics
+            )
+        except Exception as err:
+            # e.g. the journal cannot be written
+            self.events.put((ERROR, err))
+            return
+        self.events.put((PROGRESS, result.renamed, len(result.failed), self.total))
+        self.events.put((FINISHED, result))
+
+
+class PlanWorker(threading.Thread):
+    """
+    Worker thread that only plans, e.g. for a preview.
+    plan: callable run on the worker; its result is posted with FINISHED,
+    anything it raises as ERROR. Planning is not interrupted by cancel(),
+    but self.cancelled tells the UI to drop the result.
+    """
+
+    def __init__(self, plan, metrics=None):
+        super().__init__(name="mh_rename-plan", daemon=True)
+        self.plan = plan
+        self.metrics = metrics if metrics is not None else Metrics("plan")
+        self.events = queue.Queue()
+        self.cancelled = False
+
+    def cancel(self):
+        """Drop the result once planning is done."""
+        self.cancelled = True
+
+    def run(self):
+        try:
+            result = self.plan()
+        except Exception as err:
+            self.events.put((ERROR, err))
+            return
+        self.events.put((FINISHED, result))
+
+
+class BatchWorker(RenameWorker):
+    """
+    Worker thread for a batch over many directories (see mh_rename.batch).
+    plan: callable returning the list of DirectoryPlans.
+    apply: callable(plans, cancel=, progress=, metrics=) returning a
+    BatchReport, which is posted with FINISHED like an ApplyResult.
+    The planning metrics of every directory are merged into self.metrics.
+    """
+
+    def __init__(self, plan, apply, metrics=None):
+        super().__init__(plan, metrics=metrics)
+        self.name = "mh_rename-batch"
+        self.apply = apply
+
+    def run(self):
+        try:
+            plans = self.plan()
+        except Exception as err:
+            self.events.put((ERROR, err))
+            return
+        self.total = sum(plan.files for plan in plans if plan.runnable)
+        for plan in plans:
+            self.metrics.merge(plan.metrics)
+        self.events.put((PLANNED, self.total))
+
+        try:
+            report = self.apply(plans, cancel=self.cancel_event, progress=self._progress,
+                                metrics=self.metrics)
+        except Exception as err:
+            self.events.put((ERROR, err))
+            return
+        self.events.put((PROGRESS, report.renamed, report.failed, self.total))
+        self.events.put((FINISHED, report))
+
+
+class WatchWorker(threading.Thread):
+    """
+    Worker thread running a watch.Watcher until cancelled.
+    Posts (WATCHED, WatchBatch) for every round that renamed something,
+    (ERROR, exception) if watching failed, and (FINISHED, watcher) last.
+    """
+
+    def __init__(self, watcher):
+        super().__init__(name="mh_rename-watch", daemon=True)
+        self.watcher = watcher
+        self.events = queue.Queue()
+        watcher.on_batch = lambda batch: self.events.put((WATCHED, batch))
+
+    def cancel(self):
+        """Stop watching after the current round."""
+        self.watcher.stop()
+
+    def run(self):
+        try:
+            self.watcher.run()
+        except Exception as err:
+            self.events.put((ERROR, err))
+        self.events.put((FINISHED, self.watcher))
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+
+import pytest
+
+from mh_rename import batch
+from mh_rename.batch import (
+    LOCAL_LIMITS,
+    NETWORK_LIMITS,
+    REMOTE,
+    BatchJob,
+    FilesystemLimits,
+    apply_batch,
+    filesystem_limits,
+    jobs_from_root,
+    plan_batch,
+    read_manifest,
+)
+from mh_rename.planner import RenameOptions, compile_rules
+
+RULES = compile_rules(RenameOptions(renumber=True, start_number=1001))
+
+
+def make_shots(root, names, frames=3):
+    for name in names:
+        (root / name).mkdir(parents=True)
+        for i in range(1, frames + 1):
+            (root / name / f"{os.path.basename(name)}.{i:04d}.exr").touch()
+
+
+def test_manifest_lines(tmp_path):
+    manifest = tmp_path / "shots.txt"
+    manifest.write_text("# delivery\n\nsh010\n  sh020\tout/sh020  \n/abs/sh030\n", encoding="utf-8")
+    assert read_manifest(str(manifest)) == [
+        BatchJob(str(tmp_path / "sh010"), None),
+        BatchJob(str(tmp_path / "sh020"), str(tmp_path / "out" / "sh020")),
+        BatchJob(os.path.normpath("/abs/sh030"), None),
+    ]
+
+
+def test_manifest_with_two_jobs_into_one_directory_is_refused(tmp_path):
+    manifest = tmp_path / "shots.txt"
+    manifest.write_text("sh010\tout\nsh020\n./sh030/../out\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="line 3"):
+        read_manifest(str(manifest))
+    manifest.write_text("sh010\nsh020\tsh010\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="line 2"):
+        read_manifest(str(manifest))
+
+
+def test_output_root_inside_the_root_is_skipped(tmp_path):
+    make_shots(tmp_path, ["sh010", "sh020"])
+    (tmp_path / "renamed" / "sh010").mkdir(parents=True)
+    jobs = jobs_from_root(str(tmp_path), str(tmp_path / "renamed"), include=["sh*"])
+    assert jobs == [
+        BatchJob(str(tmp_path / name), str(tmp_path / "renamed" / name)) for name in ("sh010", "sh020")
+    ]
+
+
+def test_spawn_pool_plans_every_directory(tmp_path):
+    make_shots(tmp_path, ["sh010", "sh020", "sh030"])
+    (tmp_path / "sh030" / "sh030.1001.exr").mkdir()  # Where sh030.0001.exr would go
+    jobs = jobs_from_root(str(tmp_path), include=["sh*"], depth=1)
+    plans = {os.path.basename(plan.directory): plan for plan in plan_batch(jobs, RULES, processes=2)}
+    assert sorted(plans) == ["sh010", "sh020", "sh030"]
+    assert plans["sh010"].runnable and plans["sh010"].files == 3
+    assert plans["sh010"].metrics.counters["files_planned"] == 3
+    assert not plans["sh030"].runnable and plans["sh030"].collisions is not None
+
+    report = apply_batch(list(plans.values()))
+    assert report.renamed == 6 and report.count(batch.COLLISIONS) == 1
+    assert sorted(os.listdir(tmp_path / "sh020")) == [
+        ".mh_rename_journal.jsonl", "sh020.1001.exr", "sh020.1002.exr", "sh020.1003.exr",
+    ]
+
+
+def test_plans_into_one_output_directory_run_once(tmp_path):
+    make_shots(tmp_path, ["a/sh010", "b/sh010"], frames=1)
+    jobs = [BatchJob(str(tmp_path / d / "sh010"), str(tmp_path / "out")) for d in "ab"]
+    report = batch.apply_batch(list(plan_batch(jobs, RULES, processes=1)))
+    assert report.renamed == 1 and report.count(batch.ERROR) == 1
+
+
+@pytest.mark.parametrize("fstype, limits", [
+    ("nfs4", NETWORK_LIMITS), ("cifs", NETWORK_LIMITS), (REMOTE, NETWORK_LIMITS),
+    ("ext4", LOCAL_LIMITS), (None, LOCAL_LIMITS),
+])
+def test_filesystem_limits(monkeypatch, fstype, limits):
+    monkeypatch.setattr(batch, "filesystem_type", lambda path: fstype)
+    assert filesystem_limits("/shots") == limits
+
+
+def test_mount_table_picks_the_longest_mount_point(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch, "_mount_table", lambda: [
+        (str(tmp_path / "share"), "nfs4"), (str(tmp_path), "ext4"), ("/", "overlay"),
+    ])
+    monkeypatch.setattr(batch.sys, "platform", "linux")
+    (tmp_path / "share" / "sh010").mkdir(parents=True)
+    assert batch.filesystem_type(str(tmp_path / "share" / "sh010")) == "nfs4"
+    assert batch.filesystem_type(str(tmp_path / "shares")) == "ext4"
+
+
+def test_directories_in_flight_per_filesystem(tmp_path):
+    make_shots(tmp_path, [f"sh{i:03d}" for i in range(6)], frames=2)
+    plans = list(plan_batch(jobs_from_root(str(tmp_path), include=["sh*"]), RULES, processes=1))
+    for plan in plans:
+        plan.limits = FilesystemLimits(directories=2, workers=1)
+    lock = threading.Lock()
+    active = {}
+    most = [0]
+
+    def rename(src, dst):
+        directory = os.path.dirname(src)
+        with lock:
+            active[directory] = active.get(directory, 0) + 1
+            most[0] = max(most[0], len(active))
+        time.sleep(0.005)
+        os.rename(src, dst)
+        with lock:
+            active[directory] -= 1
+            if not active[directory]:
+                del active[directory]
+
+    report = apply_batch(plans, rename)
+    assert report.ok and report.renamed == 12
+    assert 1 <= most[0] <= 2
@@ -0,0 +1,14 @@
+from mh_rename.cli import main
+
+
+def test_apply_into_an_output_dir_below_a_file_fails_cleanly(tmp_path, capsys):
+    source = tmp_path / "shot"
+    source.mkdir()
+    (source / "a.0001.exr").touch()
+    (tmp_path / "afile").touch()
+    code = main(["apply", str(source), "--start", "1001", "-o", str(tmp_path / "afile" / "out"), "--yes"])
+    assert code == 1
+    err = capsys.readouterr().err
+    assert "Cannot rename into" in err
+    assert "Traceback" not in err
+    assert (source / "a.0001.exr").exists()
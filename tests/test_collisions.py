@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from mh_rename.collisions import (
+    TEMP_PREFIX,
+    CollisionError,
+    build_execution_plan,
+    check_plan,
+    two_phase_plan,
+)
+from mh_rename.executor import apply_plan
+from mh_rename.planner import RenameOp
+
+
+def make_files(directory, contents):
+    for name, text in contents.items():
+        (directory / name).write_text(text)
+
+
+def read_files(directory):
+    return {path.name: path.read_text() for path in directory.iterdir()}
+
+
+def op(directory, src, dst):
+    return RenameOp(src, dst, str(directory / src), str(directory / dst))
+
+
+def test_cycle_is_broken_with_one_parked_file(tmp_path):
+    make_files(tmp_path, {"a": "A", "b": "B", "c": "C"})
+    ops = [op(tmp_path, "a", "c"), op(tmp_path, "b", "a"), op(tmp_path, "c", "b")]
+
+    report = check_plan(ops)
+    assert report.ok
+    assert report.cycles == 1
+    plan = two_phase_plan(ops)
+    assert len(plan.temp_moves) == 1
+    assert plan.file_count == 3
+
+    result = apply_plan(plan)
+    assert result.ok
+    assert read_files(tmp_path) == {"c": "A", "a": "B", "b": "C"}
+
+
+def test_overlapping_shift_runs_back_to_front_without_temp_names(tmp_path):
+    make_files(tmp_path, {f"f.{i:04d}.exr": str(i) for i in range(1, 6)})
+    ops = [op(tmp_path, f"f.{i:04d}.exr", f"f.{i + 1:04d}.exr") for i in range(1, 6)]
+
+    assert check_plan(ops).ok
+    plan = two_phase_plan(ops)
+    assert plan.temp_moves == []
+    assert [o.src_name for o in plan.chains[0]] == [f"f.{i:04d}.exr" for i in range(5, 0, -1)]
+
+    assert apply_plan(plan).ok
+    assert read_files(tmp_path) == {f"f.{i + 1:04d}.exr": str(i) for i in range(1, 6)}
+
+
+def test_long_chain_cut_for_parallel_workers(tmp_path):
+    make_files(tmp_path, {f"f.{i:04d}.exr": str(i) for i in range(1, 21)})
+    ops = [op(tmp_path, f"f.{i:04d}.exr", f"f.{i + 1:04d}.exr") for i in range(1, 21)]
+
+    plan = two_phase_plan(ops, max_chain=4)
+    assert len(plan.chains) > 1
+    assert plan.temp_moves
+    assert plan.file_count == 20
+
+    assert apply_plan(plan, workers=4).ok
+    files = read_files(tmp_path)
+    assert files == {f"f.{i + 1:04d}.exr": str(i) for i in range(1, 21)}
+    assert not any(name.startswith(TEMP_PREFIX) for name in files)
+
+
+def test_duplicates_and_clobbers_stop_the_plan(tmp_path):
+    make_files(tmp_path, {"a": "A", "b": "B", "keep": "K"})
+    ops = [op(tmp_path, "a", "x"), op(tmp_path, "b", "x")]
+    report = check_plan(ops)
+    assert not report.ok
+    assert len(report.duplicates[os.path.normcase(str(tmp_path / "x"))]) == 2
+
+    ops = [op(tmp_path, "a", "keep")]
+    assert check_plan(ops, occupied=[str(tmp_path / "keep")]).clobbers == ops
+    with pytest.raises(CollisionError):
+        build_execution_plan(ops, [str(tmp_path / "keep")])
+    assert read_files(tmp_path) == {"a": "A", "b": "B", "keep": "K"}
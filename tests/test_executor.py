@@ -0,0 +1,103 @@
+import errno
+import os
+import threading
+import time
+
+from mh_rename.collisions import build_execution_plan
+from mh_rename.executor import apply_plan
+from mh_rename.journal import FAILED, Journal, journal_path, load_journal, recovery_plan, recovery_transfer
+from mh_rename.metrics import Metrics
+from mh_rename.planner import RenameOp
+
+
+def make_ops(directory, pairs):
+    for src, _ in pairs:
+        (directory / src).write_text(src)
+    return [RenameOp(src, dst, str(directory / src), str(directory / dst)) for src, dst in pairs]
+
+
+def failing(errors, rename=os.rename):
+    """rename that raises the next of errors (None: rename) on each call."""
+    errors = list(errors)
+
+    def run(src, dst):
+        err = errors.pop(0) if errors else None
+        if err is not None:
+            raise OSError(err, os.strerror(err))
+        rename(src, dst)
+    return run
+
+
+def test_workers_share_the_chains(tmp_path):
+    ops = make_ops(tmp_path, [(f"a.{i:04d}.exr", f"b.{i:04d}.exr") for i in range(40)])
+    threads = set()
+
+    def rename(src, dst):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.002)
+        os.rename(src, dst)
+
+    assert apply_plan(ops, rename, workers=1).ok
+    assert threads == {threading.current_thread().name}
+
+    ops = [RenameOp(op.dst_name, op.src_name, op.dst, op.src) for op in ops]
+    threads.clear()
+    assert apply_plan(ops, rename, workers=4).ok
+    assert 1 < len(threads) <= 4
+    assert sorted(os.listdir(tmp_path)) == [f"a.{i:04d}.exr" for i in range(40)]
+
+
+def test_transient_errors_are_retried(tmp_path):
+    ops = make_ops(tmp_path, [("a", "b")])
+    metrics = Metrics("test")
+    result = apply_plan(ops, failing([errno.EBUSY, errno.EAGAIN]), backoff=0, metrics=metrics)
+    assert result.ok
+    assert metrics.counters["retries"] == 2
+    assert os.listdir(tmp_path) == ["b"]
+
+
+def test_permanent_errors_are_not_retried(tmp_path):
+    ops = make_ops(tmp_path, [("a", "b")])
+    result = apply_plan(ops, failing([errno.EACCES]), backoff=0)
+    assert [err.errno for _, err in result.failed] == [errno.EACCES]
+
+    result = apply_plan(ops, failing([errno.EBUSY] * 3), retries=2, backoff=0)
+    assert [err.errno for _, err in result.failed] == [errno.EBUSY]
+    assert os.listdir(tmp_path) == ["a"]
+
+
+def test_cancel_stops_before_the_next_file(tmp_path):
+    ops = make_ops(tmp_path, [(f"a{i}", f"b{i}") for i in range(10)])
+    cancel = threading.Event()
+
+    def rename(src, dst):
+        os.rename(src, dst)
+        cancel.set()
+
+    result = apply_plan(ops, rename, cancel=cancel)
+    assert result.cancelled and not result.ok
+    assert len(result.done) == 1
+    assert len(result.skipped) == 9
+
+
+def test_a_file_that_cannot_be_put_back_stays_parked(tmp_path):
+    # Two swaps: each parks one file in phase 1
+    ops = make_ops(tmp_path, [("a", "b"), ("b", "a"), ("c", "d"), ("d", "c")])
+    plan = build_execution_plan(ops)
+    assert len(plan.temp_moves) == 2
+    journal = Journal(journal_path(str(tmp_path)))
+    # Park the first, fail to park the second, fail to put the first back
+    result = apply_plan(plan, failing([None, errno.EACCES, errno.EACCES]), journal=journal)
+
+    assert not result.rolled_back
+    assert [op.src_name for op in result.parked] == [plan.temp_moves[0].src_name]
+    assert len(result.failed) == 2
+    assert "could not be put back" in result.report()
+    state = load_journal(str(tmp_path))
+    assert state.status == FAILED and state.needs_recovery
+
+    execution, journal = recovery_plan(state, rollback=True)
+    assert apply_plan(execution, recovery_transfer(state, True), journal=journal).ok
+    assert {p.name: p.read_text() for p in tmp_path.iterdir() if p.name != ".mh_rename_journal.jsonl"} == {
+        "a": "a", "b": "b", "c": "c", "d": "d",
+    }
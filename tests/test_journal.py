@@ -0,0 +1,151 @@
+import itertools
+import json
+import os
+
+import pytest
+
+from mh_rename.collisions import TEMP_PREFIX, build_execution_plan
+from mh_rename.executor import apply_plan
+from mh_rename.journal import (
+    JOURNAL_NAME,
+    Journal,
+    journal_path,
+    load_journal,
+    recovery_plan,
+    recovery_transfer,
+)
+from mh_rename.planner import RenameOp
+
+FRAMES = 100
+
+
+class Crash(BaseException):
+    """Stands in for the process dying: nothing in apply_plan catches it."""
+
+
+def crashing_rename(limit):
+    """os.rename that 'crashes' on call number limit + 1."""
+    calls = itertools.count(1)
+
+    def rename(src, dst):
+        if next(calls) > limit:
+            raise Crash()
+        os.rename(src, dst)
+    return rename
+
+
+def make_batch(directory):
+    """
+    A +1 shift of FRAMES frames (one long chain, cut for workers, so it
+    parks files) plus a three-file cycle. Returns (ops, contents).
+    """
+    contents = {f"f.{i:04d}.exr": f"frame {i}" for i in range(1, FRAMES + 1)}
+    contents.update({"a": "A", "b": "B", "c": "C"})
+    for name, text in contents.items():
+        (directory / name).write_text(text)
+    pairs = [(f"f.{i:04d}.exr", f"f.{i + 1:04d}.exr") for i in range(1, FRAMES + 1)]
+    pairs += [("a", "c"), ("b", "a"), ("c", "b")]
+    ops = [RenameOp(src, dst, str(directory / src), str(directory / dst)) for src, dst in pairs]
+    return ops, contents
+
+
+def files(directory):
+    return {p.name: p.read_text() for p in directory.iterdir() if p.name != JOURNAL_NAME}
+
+
+def renamed(ops, contents):
+    after = dict(contents)
+    for op in ops:
+        del after[op.src_name]
+    for op in ops:
+        after[op.dst_name] = contents[op.src_name]
+    return after
+
+
+def crash(directory, ops, limit, lost_commits):
+    """Run the batch until rename call limit + 1 dies."""
+    journal = Journal(journal_path(str(directory)))
+    plan = build_execution_plan(ops, workers=4)
+    assert plan.temp_moves
+    with pytest.raises(Crash):
+        apply_plan(plan, crashing_rename(limit), journal=journal)
+    journal._file.close()
+    if lost_commits:
+        # Completions not yet fsynced are lost: recovery reads the disk
+        path = journal_path(str(directory))
+        with open(path, encoding="utf-8") as f:
+            lines = [line for line in f if '"t":"done"' not in line.replace(" ", "")]
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+
+
+def recover(directory, rollback):
+    state = load_journal(str(directory))
+    execution, journal = recovery_plan(state, rollback)
+    result = apply_plan(execution, recovery_transfer(state, rollback), journal=journal)
+    assert result.ok, result.report()
+
+
+def assert_no_temp_files(directory):
+    assert not [name for name in os.listdir(directory) if name.startswith(TEMP_PREFIX)]
+
+
+@pytest.mark.parametrize("lost_commits", [False, True])
+@pytest.mark.parametrize("limit", [0, 1, 41, FRAMES])
+def test_resume_after_crash_then_undo(tmp_path, limit, lost_commits):
+    ops, contents = make_batch(tmp_path)
+    crash(tmp_path, ops, limit, lost_commits)
+    state = load_journal(str(tmp_path))
+    assert state.needs_recovery
+
+    recover(tmp_path, rollback=False)
+    assert files(tmp_path) == renamed(ops, contents)
+    assert_no_temp_files(tmp_path)
+    state = load_journal(str(tmp_path))
+    assert not state.needs_recovery
+    assert state.count == len(ops)  # The whole batch, not only what the resume did
+
+    recover(tmp_path, rollback=True)
+    assert files(tmp_path) == contents
+    assert_no_temp_files(tmp_path)
+
+
+@pytest.mark.parametrize("lost_commits", [False, True])
+@pytest.mark.parametrize("limit", [0, 1, 41, FRAMES])
+def test_rollback_after_crash(tmp_path, limit, lost_commits):
+    ops, contents = make_batch(tmp_path)
+    crash(tmp_path, ops, limit, lost_commits)
+
+    recover(tmp_path, rollback=True)
+    assert files(tmp_path) == contents
+    assert_no_temp_files(tmp_path)
+    assert not load_journal(str(tmp_path)).needs_recovery
+
+
+def test_second_crash_during_resume(tmp_path):
+    ops, contents = make_batch(tmp_path)
+    crash(tmp_path, ops, 30, lost_commits=False)
+    state = load_journal(str(tmp_path))
+    execution, journal = recovery_plan(state)
+    with pytest.raises(Crash):
+        apply_plan(execution, crashing_rename(20), journal=journal)
+    journal._file.close()
+
+    recover(tmp_path, rollback=False)
+    assert files(tmp_path) == renamed(ops, contents)
+    assert load_journal(str(tmp_path)).count == len(ops)
+    recover(tmp_path, rollback=True)
+    assert files(tmp_path) == contents
+    assert_no_temp_files(tmp_path)
+
+
+def test_end_is_the_last_record(tmp_path):
+    ops, _ = make_batch(tmp_path)
+    journal = Journal(journal_path(str(tmp_path)))
+    assert apply_plan(build_execution_plan(ops, workers=4), journal=journal).ok
+    with open(journal_path(str(tmp_path)), encoding="utf-8") as f:
+        kinds = [json.loads(line)["t"] for line in f]
+    assert kinds[-1] == "end" and kinds.count("end") == 1
+    assert "done" in kinds
+    state = load_journal(str(tmp_path))
+    assert len(state.done) == len(ops) + len(state.temp_moves)
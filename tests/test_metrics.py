@@ -0,0 +1,130 @@
+import errno
+import json
+import pickle
+import socket
+import threading
+
+import pytest
+
+from mh_rename.metrics import METRICS_ENV, METRICS_VERSION, Histogram, Metrics, send_record
+
+
+def test_histogram_buckets_are_powers_of_two_microseconds():
+    histogram = Histogram()
+    for micros in (0.5, 1, 3, 4, 5, 1000):
+        histogram.add(micros / 1e6)
+    histogram.add(1e9)  # Beyond the last bucket
+    record = histogram.record()
+    assert record["count"] == 7
+    assert record["buckets"] == [[1, 2], [4, 2], [8, 1], [1024, 1], [2 ** 39, 1]]
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    assert histogram.percentile(0.5) == 0.0
+    for _ in range(90):
+        histogram.add(10e-6)
+    for _ in range(10):
+        histogram.add(3e-3)
+    assert histogram.percentile(0.5) == 16e-6  # Upper bound of the bucket
+    assert histogram.percentile(0.9) == 16e-6
+    assert histogram.percentile(0.99) == 3e-3  # Never above the maximum
+    other = Histogram()
+    other.add(1.0)
+    histogram.merge(other)
+    assert histogram.count == 101 and histogram.max == 1.0
+
+
+def test_metrics_record():
+    metrics = Metrics("apply", directory="/shots/sh010")
+    metrics.add_phase("scan", 0.25)
+    metrics.add_phase("scan", 0.25)
+    with metrics.phase("plan"):
+        pass
+    metrics.count("rename_calls", 3)
+    metrics.error(OSError(errno.ENOENT, "gone"))
+    metrics.error(ValueError("bad"))
+    metrics.latency.add(2e-6)
+    metrics.ok = True
+
+    other = pickle.loads(pickle.dumps(metrics))  # As sent back by a batch process
+    metrics.merge(other)
+    record = json.loads(json.dumps(metrics.record()))
+    assert record["version"] == METRICS_VERSION
+    assert record["command"] == "apply" and record["directory"] == "/shots/sh010"
+    assert record["ok"] is True
+    assert record["phases_s"]["scan"] == 1.0
+    assert set(record["phases_s"]) == {"scan", "plan"}
+    assert record["counters"] == {"rename_calls": 6}
+    assert record["errors"] == {"ENOENT": 2, "ValueError": 2}
+    assert record["latency"]["count"] == 2
+    lines = metrics.lines()
+    assert lines[1].split() == ["scan", "1.000", "s"]
+    assert "Errors: ENOENT 2, ValueError 2" in lines
+
+
+def test_send_record_to_a_file(tmp_path, monkeypatch):
+    monkeypatch.delenv(METRICS_ENV, raising=False)
+    send_record({"n": 0})  # No target: nothing to do
+    path = tmp_path / "metrics.jsonl"
+    send_record({"n": 1}, str(path))
+    monkeypatch.setenv(METRICS_ENV, str(path))
+    send_record({"n": 2})
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [{"n": 1}, {"n": 2}]
+
+
+def serve_once(server):
+    """Accept one connection on server and return a function giving what it sent."""
+    received = []
+
+    def run():
+        conn, _ = server.accept()
+        with conn:
+            data = b""
+            while True:
+                block = conn.recv(4096)
+                if not block:
+                    break
+                data += block
+            received.append(data)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    def result():
+        thread.join(5)
+        return json.loads(received[0])
+    return result
+
+
+def test_send_record_over_tcp():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        result = serve_once(server)
+        send_record({"n": 1}, f"tcp://127.0.0.1:{server.getsockname()[1]}")
+        assert result() == {"n": 1}
+
+
+def test_send_record_over_udp():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as server:
+        server.bind(("127.0.0.1", 0))
+        server.settimeout(5)
+        send_record({"n": 1}, f"udp://127.0.0.1:{server.getsockname()[1]}")
+        data, _ = server.recvfrom(65536)
+        assert data.endswith(b"\n") and json.loads(data) == {"n": 1}
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_send_record_over_a_unix_socket(tmp_path):
+    path = str(tmp_path / "metrics.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        server.listen(1)
+        result = serve_once(server)
+        send_record({"n": 1}, f"unix:{path}")
+        assert result() == {"n": 1}
+
+
+def test_send_record_fails_with_oserror_when_nobody_listens(tmp_path):
+    with pytest.raises(OSError):
+        send_record({"n": 1}, f"unix:{tmp_path / 'missing.sock'}")
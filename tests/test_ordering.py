@@ -0,0 +1,64 @@
+import os
+import random
+
+import pytest
+
+from mh_rename.ordering import FRAME, MTIME, NAME, NATURAL, natural_key, sort_order, sort_scan
+from mh_rename.scan import scan_directory
+from mh_rename.sequences import NO_FRAME, SequenceIndex, parse_name
+
+
+def ordered(names, order):
+    return [names[i] for i in sort_order(SequenceIndex(names), order)]
+
+
+def test_natural_order_compares_digit_runs_as_numbers():
+    assert natural_key("a2") < natural_key("a10")
+    names = ["f.10.exr", "a10.txt", "f.9.exr", "f.100.exr", "a2.txt"]
+    assert ordered(names, NATURAL) == ["a2.txt", "a10.txt", "f.9.exr", "f.10.exr", "f.100.exr"]
+    assert ordered(names, NAME) == ["a10.txt", "a2.txt", "f.10.exr", "f.100.exr", "f.9.exr"]
+
+
+def test_frame_order_keeps_sequences_together():
+    names = ["a.2.exr", "notes.txt", "a.1.dpx", "a.1.exr", "a.2.dpx", "b.1.exr"]
+    assert ordered(names, NATURAL) == ["a.1.dpx", "a.1.exr", "a.2.dpx", "a.2.exr", "b.1.exr", "notes.txt"]
+    assert ordered(names, FRAME) == ["a.1.dpx", "a.2.dpx", "a.1.exr", "a.2.exr", "b.1.exr", "notes.txt"]
+
+
+def test_mtime_order_falls_back_to_natural_order_on_ties(tmp_path):
+    stamps = {"f.10.exr": 1, "f.9.exr": 2, "f.2.exr": 2, "f.1.exr": 3}
+    for name, stamp in stamps.items():
+        (tmp_path / name).touch()
+        os.utime(tmp_path / name, ns=(0, stamp * 10**9))
+    scan = scan_directory(str(tmp_path))
+    assert sort_scan(scan, MTIME).names == ["f.10.exr", "f.2.exr", "f.9.exr", "f.1.exr"]
+    with pytest.raises(ValueError):
+        sort_order(SequenceIndex(scan.names), MTIME)
+
+
+def reference_key(name):
+    """The natural order built the plain way: one parse and key per file."""
+    prefix, sep, frame, _, ext = parse_name(name)
+    if frame is None:
+        return natural_key(prefix), NO_FRAME, ext, name
+    return natural_key(prefix + sep), frame, ext, name
+
+
+def test_precomputed_keys_match_a_plain_sort():
+    rng = random.Random(7)
+    names = set()
+    while len(names) < 2000:
+        kind = rng.randrange(5)
+        frame = rng.randrange(1, 300)
+        if kind == 0:
+            names.add(f"notes_{frame}.txt")
+        elif kind == 1:
+            names.add(f"shot{rng.randrange(1, 12)}_plate.{frame:04d}.exr")
+        elif kind == 2:
+            names.add(f"shot{rng.randrange(1, 12)}_plate_{frame}.{rng.choice(['exr', 'dpx'])}")
+        else:
+            names.add(f"shot{rng.randrange(1, 12)}.{frame}")
+    names = list(names)
+    rng.shuffle(names)
+    assert ordered(names, NATURAL) == sorted(names, key=reference_key)
+    assert ordered(names, NAME) == sorted(names)
@@ -0,0 +1,12 @@
+import types
+
+import mh_rename
+
+
+def test_all_lists_exactly_the_re_exported_names():
+    exported = {
+        name for name, value in vars(mh_rename).items()
+        if not name.startswith("_") and not isinstance(value, types.ModuleType)
+    }
+    assert sorted(mh_rename.__all__) == sorted(exported)
+    assert len(set(mh_rename.__all__)) == len(mh_rename.__all__)
@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+from mh_rename.cli import main
+from mh_rename.planfile import (
+    PlanFile,
+    PlanFileError,
+    StalePlanError,
+    approve_plan,
+    diff_plans,
+    read_plan,
+    write_plan,
+)
+from mh_rename.planner import RenameOp, RenameOptions
+
+
+def make_shot(directory, frames=3):
+    directory.mkdir(exist_ok=True)
+    ops = []
+    for i in range(1, frames + 1):
+        src = directory / f"sh010_beauty_v003.{i:04d}.exr"
+        src.write_text(str(i))
+        dst_name = f"sh010_beauty_v003.{i + 1000:04d}.exr"
+        ops.append(RenameOp(src.name, dst_name, str(src), str(directory / dst_name)))
+    return ops
+
+
+def test_round_trip(tmp_path):
+    shot = tmp_path / "sh010"
+    ops = make_shot(shot)
+    ops.append(RenameOp("notes", "notes.txt", str(shot / "notes"), str(tmp_path / "out" / "notes.txt")))
+    (shot / "notes").touch()
+    path = str(tmp_path / "plan.jsonl")
+    count, digest = write_plan(path, ops, str(shot), options=RenameOptions(renumber=True), order="natural")
+    assert count == 4
+
+    plan = PlanFile(path)
+    assert plan.header["options"]["renumber"] is True and plan.header["order"] == "natural"
+    assert read_plan(plan) == ops
+    assert plan.count == 4 and plan.digest == digest
+    assert not os.path.exists(path + ".new")
+
+
+def test_plan_follows_other_directories(tmp_path):
+    ops = make_shot(tmp_path / "sh010")
+    path = str(tmp_path / "plan.jsonl")
+    write_plan(path, ops, str(tmp_path / "sh010"))
+    moved = PlanFile(path, input_dir=str(tmp_path / "copy"))
+    assert [op.dst for op in moved.ops] == [str(tmp_path / "copy" / op.dst_name) for op in ops]
+
+
+def test_edited_or_truncated_plan_is_refused(tmp_path):
+    ops = make_shot(tmp_path / "sh010")
+    path = tmp_path / "plan.jsonl"
+    write_plan(str(path), ops, str(tmp_path / "sh010"))
+    text = path.read_text(encoding="utf-8")
+
+    path.write_text(text.replace("1001.exr", "1009.exr"), encoding="utf-8")
+    with pytest.raises(PlanFileError, match="was modified after it was written"):
+        read_plan(PlanFile(str(path)))
+
+    path.write_text("".join(text.splitlines(keepends=True)[:-1]), encoding="utf-8")
+    with pytest.raises(PlanFileError, match="incomplete"):
+        read_plan(PlanFile(str(path)))
+
+    path.write_text("not a plan\n", encoding="utf-8")
+    with pytest.raises(PlanFileError):
+        PlanFile(str(path))
+
+
+def test_changed_sources_refuse_the_plan(tmp_path, capsys):
+    shot = tmp_path / "sh010"
+    ops = make_shot(shot)
+    path = str(tmp_path / "plan.jsonl")
+    write_plan(path, ops, str(shot))
+    (shot / ops[0].src_name).write_text("re-rendered")
+    (shot / ops[1].src_name).unlink()
+
+    with pytest.raises(StalePlanError) as info:
+        read_plan(PlanFile(path))
+    assert info.value.count == 2
+    assert info.value.problems[0] == (ops[0].src, "size 11, was 1")
+
+    assert main(["apply-plan", path, "--yes"]) == 1
+    assert "2 source files changed" in capsys.readouterr().err
+    assert sorted(os.listdir(shot)) == [ops[0].src_name, ops[2].src_name]
+
+
+def test_apply_needs_an_approval_of_this_exact_file(tmp_path, capsys):
+    shot = tmp_path / "sh010"
+    ops = make_shot(shot)
+    path = str(tmp_path / "plan.jsonl")
+    _, digest = write_plan(path, ops, str(shot))
+    assert main(["apply-plan", path, "--require-approval", "--yes"]) == 1
+    assert "not approved" in capsys.readouterr().err
+
+    assert approve_plan(path, by="supervisor") == digest
+    plan = PlanFile(path).verify()
+    assert [a["by"] for a in plan.approved()] == ["supervisor"]
+    assert main(["apply-plan", path, "--require-approval", "--yes"]) == 0
+    assert sorted(name for name in os.listdir(shot) if not name.startswith(".")) == [op.dst_name for op in ops]
+
+
+def test_diff_and_its_exit_status(tmp_path, capsys):
+    shot = tmp_path / "sh010"
+    ops = make_shot(shot, frames=4)
+    old, new = str(tmp_path / "old.jsonl"), str(tmp_path / "new.jsonl")
+    write_plan(old, ops, str(shot))
+    write_plan(new, ops, str(shot))
+    assert list(diff_plans(PlanFile(old), PlanFile(new))) == []
+    assert main(["plan-diff", old, new]) == 0
+
+    changed = ops[0]._replace(dst_name="other.exr", dst=str(shot / "other.exr"))
+    write_plan(new, [ops[3], ops[2], changed], str(shot))
+    kinds = sorted((kind, (a or b).src_name) for kind, a, b in diff_plans(PlanFile(old), PlanFile(new)))
+    assert kinds == [("changed", ops[0].src_name), ("removed", ops[1].src_name)]
+    capsys.readouterr()
+    assert main(["plan-diff", old, new]) == 1
+    out = capsys.readouterr().out
+    assert "~" in out and "-" in out
@@ -0,0 +1,27 @@
+from mh_rename.collisions import check_plan
+from mh_rename.planner import RenameOptions, compile_rules, plan_renames
+
+
+def new_names(names, **options):
+    ops = plan_renames(names, compile_rules(RenameOptions(**options)), "/shots/sh010")
+    assert check_plan(ops).ok
+    return {op.src_name: op.dst_name for op in ops}
+
+
+def test_each_sequence_is_renumbered_on_its_own():
+    names = ["a.0005.exr", "a.0006.exr", "b.0100.exr", "b.0101.exr"]
+    assert new_names(names, renumber=True, start_number=1001) == {
+        "a.0005.exr": "a.1001.exr",
+        "a.0006.exr": "a.1002.exr",
+        "b.0100.exr": "b.1001.exr",
+        "b.0101.exr": "b.1002.exr",
+    }
+
+
+def test_unrelated_files_without_frame_numbers_are_not_one_run():
+    names = ["notes.txt", "readme.txt", "plate.0001.exr"]
+    assert new_names(names, renumber=True, start_number=1) == {
+        "notes.txt": "notes.0001.txt",
+        "readme.txt": "readme.0001.txt",
+        "plate.0001.exr": "plate.0001.exr",
+    }
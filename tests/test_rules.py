@@ -0,0 +1,29 @@
+from mh_rename.collisions import check_plan
+from mh_rename.planner import RenameOptions, compile_rules, plan_renames
+from mh_rename.rules import parse_steps
+
+
+def new_names(names, rules, **options):
+    options = RenameOptions(steps=parse_steps(rules), **options)
+    ops = plan_renames(names, compile_rules(options), "/shots/sh010")
+    return ops, [op.dst_name for op in ops]
+
+
+def test_base_step_after_a_name_step_keeps_the_frame_numbers():
+    ops, names = new_names(["shot_v1.1001.exr", "shot_v1.1002.exr"],
+                           "replace[name]: shot => SHOT\nslice: 0:-3")
+    assert names == ["SHOT.1001.exr", "SHOT.1002.exr"]
+    assert check_plan(ops).ok
+
+
+def test_base_step_after_a_template_works_on_the_new_base():
+    _, names = new_names(["plate.0001.exr", "notes.txt"],
+                         "template: {prefix}_v2.{frame:04d}{ext}\ncase: upper",
+                         renumber=True, start_number=1001)
+    assert names == ["PLATE_V2.1001.exr", "NOTES_V2.1001.txt"]
+
+
+def test_leading_base_steps_run_per_sequence():
+    _, names = new_names(["shot_v1.1001.exr", "shot_v1.1002.exr", "notes.txt"],
+                         "regex: _v(\\d+) => _v00\\1\ncase: upper")
+    assert names == ["SHOT_V001.1001.exr", "SHOT_V001.1002.exr", "NOTES.txt"]
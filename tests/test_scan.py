@@ -0,0 +1,61 @@
+import os
+import time
+
+import pytest
+
+from mh_rename.scan import iter_files, scan_directory
+
+
+@pytest.fixture
+def shot(tmp_path):
+    for name in ["b.0002.exr", "a.0001.exr", "a.0001.dpx", ".hidden.exr", "notes.txt",
+                 ".mh_rename_journal.jsonl", ".mh_rename_tmp_ab12_0"]:
+        (tmp_path / name).touch()
+    (tmp_path / "sub").mkdir()
+    return tmp_path
+
+
+def test_files_are_sorted_and_skipped_names_kept_in_others(shot):
+    scan = scan_directory(str(shot))
+    assert scan.names == [".hidden.exr", "a.0001.dpx", "a.0001.exr", "b.0002.exr", "notes.txt"]
+    assert len(scan) == 5
+    # Sub-directories and mh_rename's own files still occupy their names
+    assert sorted(scan.others) == [".mh_rename_journal.jsonl", ".mh_rename_tmp_ab12_0", "sub"]
+
+
+def test_filters_move_names_to_others(shot):
+    scan = scan_directory(str(shot), extensions="EXR", pattern="a.*")
+    assert scan.names == ["a.0001.exr"]
+    assert {".hidden.exr", "a.0001.dpx", "b.0002.exr", "notes.txt", "sub"} <= set(scan.others)
+
+
+def test_extension_lists_are_normalized(shot):
+    names = sorted(entry.name for entry in iter_files(str(shot), extensions=[".dpx", " txt "]))
+    assert names == ["a.0001.dpx", "notes.txt"]
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+def test_symlinks(tmp_path):
+    (tmp_path / "real.exr").touch()
+    (tmp_path / "dir").mkdir()
+    os.symlink(tmp_path / "real.exr", tmp_path / "link.exr")
+    os.symlink(tmp_path / "dir", tmp_path / "dirlink")
+    os.symlink(tmp_path / "missing.exr", tmp_path / "broken.exr")
+    scan = scan_directory(str(tmp_path))
+    # Links are renamed like files (the link itself moves); links to
+    # directories are skipped like directories
+    assert scan.names == ["broken.exr", "link.exr", "real.exr"]
+    assert sorted(scan.others) == ["dir", "dirlink"]
+
+
+def test_is_current_follows_the_directory(shot):
+    scan = scan_directory(str(shot))
+    assert scan.is_current(str(shot))
+    assert not scan.is_current(str(shot), extensions="exr")
+    assert not scan.is_current(str(shot / "sub"))
+    stamp = os.stat(shot).st_mtime_ns
+    (shot / "c.0003.exr").touch()
+    if os.stat(shot).st_mtime_ns == stamp:  # Coarse timestamps
+        time.sleep(0.01)
+        os.utime(shot)
+    assert not scan.is_current(str(shot))
@@ -0,0 +1,135 @@
+import errno
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from mh_rename import transfer
+from mh_rename.collisions import build_execution_plan
+from mh_rename.executor import apply_plan
+from mh_rename.journal import Journal, journal_path, load_journal, recovery_plan, recovery_transfer
+from mh_rename.planner import RenameOp
+from mh_rename.transfer import BUFFERED, HARDLINK, RENAME, Transfer
+
+SHM = "/dev/shm"
+
+
+def write(path, data, mtime_ns=1_600_000_000 * 10**9):
+    with open(path, "wb") as f:
+        f.write(data)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def cross_device(monkeypatch):
+    """Make os.rename fail as it does between two filesystems."""
+    def rename(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link", src)
+    monkeypatch.setattr(os, "rename", rename)
+
+
+def test_move_within_a_filesystem_is_a_rename(tmp_path):
+    write(tmp_path / "a", b"data")
+    move = Transfer()
+    move(str(tmp_path / "a"), str(tmp_path / "b"))
+    assert move.counts == {RENAME: 1}
+    assert (tmp_path / "b").read_bytes() == b"data"
+    assert not (tmp_path / "a").exists()
+
+
+def test_cross_device_move_copies_then_removes_the_source(tmp_path, monkeypatch):
+    write(tmp_path / "a", b"x" * 100000)
+    cross_device(monkeypatch)
+    move = Transfer()
+    move(str(tmp_path / "a"), str(tmp_path / "b"))
+    assert RENAME not in move.counts
+    assert sum(move.counts.values()) == 1
+    assert (tmp_path / "b").read_bytes() == b"x" * 100000
+    assert os.stat(tmp_path / "b").st_mtime_ns == 1_600_000_000 * 10**9
+    assert sorted(os.listdir(tmp_path)) == ["b"]
+
+
+def test_unsupported_strategies_fall_back_to_a_buffered_copy(tmp_path, monkeypatch):
+    tried = []
+
+    def unsupported(name, code):
+        def copy(fsrc, fdst, size):
+            tried.append(name)
+            os.write(fdst, b"junk")  # A partial copy is thrown away
+            raise OSError(code, "not here")
+        return copy
+
+    monkeypatch.setattr(transfer, "_copy_strategies", lambda: [
+        (transfer.REFLINK, unsupported(transfer.REFLINK, errno.EOPNOTSUPP)),
+        (transfer.COPY_FILE_RANGE, unsupported(transfer.COPY_FILE_RANGE, errno.EXDEV)),
+        (transfer.SENDFILE, unsupported(transfer.SENDFILE, errno.EINVAL)),
+        (BUFFERED, transfer._buffered),
+    ])
+    cross_device(monkeypatch)
+    for i in range(2):
+        write(tmp_path / f"a{i}", b"frame data")
+    move = Transfer()
+    for i in range(2):
+        move(str(tmp_path / f"a{i}"), str(tmp_path / f"b{i}"))
+
+    # Each strategy is only tried once per directory pair
+    assert tried == [transfer.REFLINK, transfer.COPY_FILE_RANGE, transfer.SENDFILE]
+    assert move.counts == {BUFFERED: 2}
+    assert sorted(os.listdir(tmp_path)) == ["b0", "b1"]
+    assert (tmp_path / "b1").read_bytes() == b"frame data"
+
+
+def test_failing_copy_leaves_the_source_and_no_part_file(tmp_path, monkeypatch):
+    def broken(fsrc, fdst, size):
+        raise OSError(errno.EIO, "read error")
+
+    monkeypatch.setattr(transfer, "_copy_strategies", lambda: [(BUFFERED, broken)])
+    cross_device(monkeypatch)
+    write(tmp_path / "a", b"data")
+    with pytest.raises(OSError):
+        Transfer()(str(tmp_path / "a"), str(tmp_path / "b"))
+    assert sorted(os.listdir(tmp_path)) == ["a"]
+
+
+def test_copy_with_hardlink_keeps_the_source(tmp_path):
+    write(tmp_path / "a", b"data")
+    copy = Transfer(keep_source=True, hardlink=True)
+    copy(str(tmp_path / "a"), str(tmp_path / "b"))
+    assert copy.counts == {HARDLINK: 1}
+    assert os.path.samefile(tmp_path / "a", tmp_path / "b")
+
+
+@pytest.mark.skipif(not os.path.isdir(SHM), reason="needs /dev/shm")
+def test_cross_device_move_and_undo(tmp_path):
+    output = tmp_path / "out"
+    output.mkdir()
+    source = tempfile.mkdtemp(prefix="mh_rename_test_", dir=SHM)
+    try:
+        if os.stat(source).st_dev == os.stat(output).st_dev:
+            pytest.skip("/dev/shm is on the same filesystem")
+        names = [f"plate.{i:04d}.exr" for i in range(1, 6)]
+        for i, name in enumerate(names):
+            write(os.path.join(source, name), bytes([i]) * 5000)
+        ops = [
+            RenameOp(name, f"plate.{i + 1001:04d}.exr", os.path.join(source, name),
+                     str(output / f"plate.{i + 1001:04d}.exr"))
+            for i, name in enumerate(names)
+        ]
+        move = Transfer()
+        result = apply_plan(build_execution_plan(ops), move, journal=Journal(journal_path(str(output))))
+        assert result.ok
+        assert RENAME not in move.counts
+        assert os.listdir(source) == []
+        assert (output / "plate.1003.exr").read_bytes() == bytes([2]) * 5000
+
+        state = load_journal(str(output))
+        assert not state.needs_recovery
+        execution, journal = recovery_plan(state, rollback=True)
+        assert apply_plan(execution, recovery_transfer(state, True), journal=journal).ok
+        assert sorted(os.listdir(source)) == names
+        assert os.listdir(output) == [os.path.basename(journal_path(str(output)))]
+        for i, name in enumerate(names):
+            with open(os.path.join(source, name), "rb") as f:
+                assert f.read() == bytes([i]) * 5000
+    finally:
+        shutil.rmtree(source, ignore_errors=True)
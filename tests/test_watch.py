@@ -0,0 +1,35 @@
+import os
+
+from mh_rename.planner import RenameOptions, compile_rules
+from mh_rename.watch import Watcher
+
+
+def watcher(directory, **kwargs):
+    rules = compile_rules(RenameOptions(renumber=True, start_number=1001))
+    return Watcher(str(directory), rules, settle=0.0, journaled=False, **kwargs)
+
+
+def arrive(directory, frames):
+    names = [f"render.{frame:04d}.exr" for frame in frames]
+    for name in names:
+        (directory / name).touch()
+    return names
+
+
+def test_frames_finishing_out_of_order_never_go_below_the_start(tmp_path):
+    watch = watcher(tmp_path)
+    batch = watch.rename_files(arrive(tmp_path, [3, 4]))
+    assert len(batch.renamed) == 2
+    batch = watch.rename_files(arrive(tmp_path, [1, 2, 5]))
+    assert [op.src_name for op, _ in batch.skipped] == ["render.0001.exr", "render.0002.exr"]
+    assert sorted(os.listdir(tmp_path)) == [
+        "render.0001.exr", "render.0002.exr", "render.1001.exr", "render.1002.exr", "render.1003.exr",
+    ]
+
+
+def test_out_of_order_frames_with_a_first_frame(tmp_path):
+    watch = watcher(tmp_path, first_frame=1)
+    watch.rename_files(arrive(tmp_path, [3, 4]))
+    batch = watch.rename_files(arrive(tmp_path, [1, 2, 5]))
+    assert batch.skipped == []
+    assert sorted(os.listdir(tmp_path)) == [f"render.{frame:04d}.exr" for frame in range(1001, 1006)]
@@ -0,0 +1,56 @@
+import os
+
+from mh_rename.journal import Journal
+from mh_rename.planner import RenameOp
+from mh_rename.worker import ERROR, FINISHED, PLANNED, BatchWorker, PlanWorker, RenameWorker
+
+
+def drain(worker):
+    events = []
+    while not worker.events.empty():
+        events.append(worker.events.get_nowait())
+    return events
+
+
+def test_rename_worker_posts_error_when_the_journal_cannot_be_written(tmp_path):
+    src = tmp_path / "a.0001.exr"
+    src.touch()
+    op = RenameOp("a.0001.exr", "a.1001.exr", str(src), str(tmp_path / "a.1001.exr"))
+    journal = Journal(str(tmp_path / "missing" / "journal.jsonl"))
+    worker = RenameWorker(lambda: ([op], journal))
+    worker.start()
+    worker.join(5)
+    events = drain(worker)
+    assert events[0] == (PLANNED, 1)
+    assert events[-1][0] == ERROR
+    assert isinstance(events[-1][1], OSError)
+    assert os.path.exists(src)
+
+
+def test_batch_worker_posts_error_when_apply_raises():
+    def apply(plans, **kwargs):
+        raise OSError("disk gone")
+
+    worker = BatchWorker(lambda: [], apply)
+    worker.start()
+    worker.join(5)
+    events = drain(worker)
+    assert events[-1][0] == ERROR
+    assert str(events[-1][1]) == "disk gone"
+
+
+def test_plan_worker_posts_the_plan_or_the_error():
+    worker = PlanWorker(lambda: ["planned"])
+    worker.start()
+    worker.join(5)
+    assert drain(worker) == [(FINISHED, ["planned"])]
+
+    def plan():
+        raise ValueError("The selected directory is empty.")
+
+    worker = PlanWorker(plan)
+    worker.start()
+    worker.join(5)
+    events = drain(worker)
+    assert events[-1][0] == ERROR
+    assert str(events[-1][1]) == "The selected directory is empty."